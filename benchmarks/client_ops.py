@@ -0,0 +1,547 @@
+"""
+Offline benchmark of the client operations.
+
+The public methods run against local stand-ins instead of the networks: EVM calls go to an in-process eth-tester chain
+served over HTTP, TRON calls and the IPN API calls go to HTTP stand-ins keeping balances and address lists in memory.
+Every stand-in counts the HTTP requests, JSON-RPC calls and bytes it receives, so the results show the round trips of
+an operation next to its throughput. EVM scenarios need eth-tester with the py-evm backend and are skipped without it:
+
+    pip install "eth-tester[py-evm]"
+    python benchmarks/client_ops.py --iterations 100 --output client_ops.json
+    python benchmarks/client_ops.py --baseline client_ops.json
+
+With --baseline the script exits with status 1 if an operation got slower than the threshold or needs more round
+trips than in the baseline. An operation that raises is reported under errors without stopping the other operations,
+and the script exits with status 1.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ipnpy  # noqa: E402
+
+# Runtime code of a minimal token: balanceOf(address), decimals() returning 6 and transfer(address,uint256), balances
+# are kept in the storage slot of the holder address
+#
+# 00 PUSH1 0 CALLDATALOAD PUSH1 0xe0 SHR                        selector
+# 06 DUP1 PUSH4 balanceOf EQ PUSH1 0x27 JUMPI
+# 10 DUP1 PUSH4 decimals EQ PUSH1 0x34 JUMPI
+# 1a PUSH4 transfer EQ PUSH1 0x3f JUMPI
+# 23 PUSH1 0 DUP1 REVERT
+# 27 JUMPDEST PUSH1 4 CALLDATALOAD SLOAD PUSH1 0 MSTORE PUSH1 32 PUSH1 0 RETURN
+# 34 JUMPDEST PUSH1 6 PUSH1 0 MSTORE PUSH1 32 PUSH1 0 RETURN
+# 3f JUMPDEST CALLER SLOAD PUSH1 0x24 CALLDATALOAD DUP1 DUP3 LT PUSH1 0x63 JUMPI   revert if balance < amount
+# 4b DUP1 DUP3 SUB CALLER SSTORE                                              sender balance - amount
+# 50 PUSH1 4 CALLDATALOAD DUP1 SLOAD DUP3 ADD SWAP1 SSTORE                      recipient balance + amount
+# 59 PUSH1 1 PUSH1 0 MSTORE PUSH1 32 PUSH1 0 RETURN
+# 63 JUMPDEST PUSH1 0 DUP1 REVERT
+TOKEN_CODE = bytes.fromhex(
+    '60003560e01c806370a08231146027578063313ce5671460345763a9059cbb14603f57600080fd'
+    '5b6004355460005260206000f3'
+    '5b600660005260206000f3'
+    '5b33546024358082106063578082033355600435805482019055600160005260206000f3'
+    '5b600080fd'
+)
+TOKEN_ADDRESS = '0x' + '7e' * 20
+TOKEN_SUPPLY = 10 ** 30
+
+WEBHOOK = {
+    'hash': '0x' + 'ab' * 32,
+    'network': 'ethereum',
+    'info': {
+        'project': 'benchmark',
+        'type': 'TR',
+        'rule': 'incoming',
+        'amount': 1,
+        'date': 1700000000.0,
+        'on_site': True,
+        'telegram': False,
+    },
+    'logs': [{
+        'from': '0x' + '11' * 20,
+        'to': '0x' + '22' * 20,
+        'value': '1000000',
+        'address': TOKEN_ADDRESS,
+        'topic': '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef',
+    }],
+}
+
+
+class RecordingServer:
+    def __init__(self, handle: Callable[[str, str, bytes], Tuple[int, Any, int]]) -> None:
+        """
+        A local HTTP server answering with the handler and counting what it receives
+
+        :param handle: called with the HTTP method, the path and the body, returns the status, the JSON response and
+            the number of JSON-RPC calls in the request
+        """
+        self.requests = 0
+        self.calls = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately, without this every response waits for the delayed ACK
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def _respond(self) -> None:
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                with server._lock:
+                    status, response, calls = handle(self.command, self.path, body)
+                    data = json.dumps(response, default=_json_default).encode()
+                    server.requests += 1
+                    server.calls += calls
+                    server.bytes_received += len(body)
+                    server.bytes_sent += len(data)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self._server.server_port}/'
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def counters(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'calls': self.calls,
+                'bytes_received': self.bytes_received,
+                'bytes_sent': self.bytes_sent,
+            }
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray)):
+        return '0x' + bytes(value).hex()
+    if hasattr(value, 'keys'):
+        return dict(value)
+    raise TypeError(f'Cannot serialize {type(value).__name__}')
+
+
+class EvmChain:
+    def __init__(self) -> None:
+        """
+        An eth-tester chain with the sender account funded in ether and in the benchmark token
+        """
+        from eth_tester import EthereumTester, PyEVMBackend
+        from eth_tester.backends.pyevm.main import get_default_account_keys
+        from web3 import EthereumTesterProvider, Web3
+
+        key = get_default_account_keys()[0]
+        self.private_key = key.to_hex()
+        self.address = key.public_key.to_checksum_address()
+
+        state = PyEVMBackend.generate_genesis_state(num_accounts=1)
+        state[bytes.fromhex(TOKEN_ADDRESS[2:])] = {
+            'balance': 0,
+            'nonce': 0,
+            'code': TOKEN_CODE,
+            'storage': {int(self.address, 16): TOKEN_SUPPLY},
+        }
+        # The request passes the middleware of the tester provider, which fills the fields a node would default
+        self._w3 = Web3(EthereumTesterProvider(EthereumTester(PyEVMBackend(genesis_state=state))))
+
+    def handle(self, command: str, path: str, body: bytes) -> Tuple[int, Any, int]:
+        payload = json.loads(body)
+        if isinstance(payload, list):
+            return 200, [self._call(request) for request in payload], len(payload)
+        return 200, self._call(payload), 1
+
+    def _call(self, request: dict) -> dict:
+        try:
+            response = dict(self._w3.manager._make_request(request['method'], request.get('params') or []))
+        except Exception as error:
+            response = {'error': {'code': -32000, 'message': str(error)}}
+        response['id'] = request.get('id')
+        response.setdefault('jsonrpc', '2.0')
+        if 'result' in response:
+            response['result'] = _to_wire(response['result'])
+        return response
+
+
+def _to_wire(value: Any) -> Any:
+    # The tester provider returns decoded values, a node sends quantities as hex strings
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, int):
+        return hex(value)
+    if isinstance(value, (bytes, bytearray)):
+        return '0x' + bytes(value).hex()
+    if isinstance(value, (list, tuple)):
+        return [_to_wire(item) for item in value]
+    if hasattr(value, 'keys'):
+        return {key: _to_wire(item) for key, item in value.items()}
+    return value
+
+
+class TronNode:
+    def __init__(self, sender: str, contract: str) -> None:
+        """
+        A stand-in of the TRON HTTP API keeping TRX and token balances in memory
+
+        :param sender: base58 address funded with TRX and the token
+        :param contract: base58 address of the token
+        """
+        from tronpy import keys
+
+        self._keys = keys
+        self.contract = contract
+        self.block = 1000
+        self.balances: Dict[str, int] = {keys.to_hex_address(sender): 10 ** 15}
+        self.tokens: Dict[str, int] = {keys.to_hex_address(sender): TOKEN_SUPPLY}
+
+    def handle(self, command: str, path: str, body: bytes) -> Tuple[int, Any, int]:
+        params = json.loads(body or b'{}')
+        method = path.lstrip('/')
+        if method == 'wallet/getnowblock':
+            return 200, {'blockID': self._block_id(), 'block_header': {'raw_data': {'number': self.block}}}, 1
+        if method == 'wallet/getnodeinfo':
+            return 200, {'solidityBlock': f'Num:{self.block},ID:{self._block_id()}'}, 1
+        if method == 'wallet/getaccount':
+            address = self._keys.to_hex_address(params['address'])
+            return 200, {'address': params['address'], 'balance': self.balances.get(address, 0)}, 1
+        if method == 'wallet/triggerconstantcontract':
+            if params['function_selector'] == 'decimals()':
+                value = 6
+            else:
+                value = self.tokens.get('41' + params['parameter'][24:64], 0)
+            return 200, {'result': {'result': True}, 'constant_result': [f'{value:064x}']}, 1
+        if method == 'wallet/getsignweight':
+            txid = hashlib.sha256(json.dumps(params['raw_data'], sort_keys=True).encode()).hexdigest()
+            return 200, {'transaction': {'transaction': {'txID': txid}}}, 1
+        if method == 'wallet/broadcasttransaction':
+            self._apply(params['raw_data']['contract'][0])
+            self.block += 1
+            return 200, {'result': True, 'txid': params['txID']}, 1
+        return 404, {'Error': f'{method} is not served by the stand-in'}, 1
+
+    def _apply(self, contract: dict) -> None:
+        value = contract['parameter']['value']
+        if contract['type'] == 'TransferContract':
+            self.balances[value['owner_address']] -= value['amount']
+            self.balances[value['to_address']] = self.balances.get(value['to_address'], 0) + value['amount']
+        elif contract['type'] == 'TriggerSmartContract' and value['data'][:8] == 'a9059cbb':
+            recipient, amount = '41' + value['data'][32:72], int(value['data'][72:136], 16)
+            self.tokens[value['owner_address']] -= amount
+            self.tokens[recipient] = self.tokens.get(recipient, 0) + amount
+
+    def _block_id(self) -> str:
+        return f'{self.block:016x}' + hashlib.sha256(str(self.block).encode()).hexdigest()[16:]
+
+
+class IpnApi:
+    def __init__(self) -> None:
+        """
+        A stand-in of the IPN address list endpoint
+        """
+        self.addresses: List[str] = []
+
+    def handle(self, command: str, path: str, body: bytes) -> Tuple[int, Any, int]:
+        params = json.loads(body)
+        if command == 'PUT':
+            self.addresses.append(params['address'])
+        elif command == 'DELETE' and params['address'] in self.addresses:
+            self.addresses.remove(params['address'])
+        elif command == 'POST':
+            self.addresses = list(params['addresses'])
+        return 200, {'name': 'benchmark', 'body': self.addresses}, 1
+
+
+# A scenario builds fresh clients and returns the operation, called with the iteration number
+Scenario = Callable[[], Callable[[int], Any]]
+
+
+def evm_scenarios(server: RecordingServer, chain: EvmChain) -> Dict[str, Scenario]:
+    from eth_account import Account
+
+    from ipnpy.rpc import EvmJsonRPC
+
+    recipients = [Account.create().address for _ in range(100)]
+
+    def client() -> EvmJsonRPC:
+        return EvmJsonRPC(server.url)
+
+    def get_native_balance() -> Callable[[int], Any]:
+        rpc = client()
+        return lambda i: rpc.get_native_balance(chain.address)
+
+    def get_erc20_balance() -> Callable[[int], Any]:
+        rpc = client()
+        return lambda i: rpc.get_erc20_balance(chain.address, TOKEN_ADDRESS)
+
+    def get_native_balances() -> Callable[[int], Any]:
+        rpc = client()
+        return lambda i: rpc.get_native_balances(recipients)
+
+    def send_native_token() -> Callable[[int], Any]:
+        rpc = client()
+        return lambda i: rpc.send_native_token(chain.private_key, chain.address, recipients[i % 100], 1)
+
+    def send_erc20_token() -> Callable[[int], Any]:
+        rpc = client()
+        return lambda i: rpc.send_erc20_token(chain.private_key, chain.address, recipients[i % 100], 1, TOKEN_ADDRESS)
+
+    return {
+        'evm.get_native_balance': get_native_balance,
+        'evm.get_erc20_balance': get_erc20_balance,
+        'evm.get_native_balances[100]': get_native_balances,
+        'evm.send_native_token': send_native_token,
+        'evm.send_erc20_token': send_erc20_token,
+    }
+
+
+def tron_scenarios(server: RecordingServer, sender: Tuple[str, str], contract: str) -> Dict[str, Scenario]:
+    from tronpy.keys import PrivateKey
+
+    from ipnpy.rpc import TronJsonRPC
+
+    private_key, address = sender
+    recipients = [PrivateKey.random().public_key.to_base58check_address() for _ in range(100)]
+
+    def client() -> TronJsonRPC:
+        return TronJsonRPC(server.url)
+
+    def get_native_balance() -> Callable[[int], Any]:
+        rpc = client()
+        return lambda i: rpc.get_native_balance(address)
+
+    def get_trc20_balance() -> Callable[[int], Any]:
+        rpc = client()
+        return lambda i: rpc.get_trc20_balance(address, contract)
+
+    def send_native_token() -> Callable[[int], Any]:
+        rpc = client()
+        return lambda i: rpc.send_native_token(private_key, address, recipients[i % 100], 1)
+
+    def send_trc20_token() -> Callable[[int], Any]:
+        rpc = client()
+        return lambda i: rpc.send_trc20_token(private_key, address, recipients[i % 100], 1, contract)
+
+    return {
+        'tron.get_native_balance': get_native_balance,
+        'tron.get_trc20_balance': get_trc20_balance,
+        'tron.send_native_token': send_native_token,
+        'tron.send_trc20_token': send_trc20_token,
+    }
+
+
+def ipn_scenarios(server: RecordingServer) -> Dict[str, Scenario]:
+    from ipnpy.ipn import IPNTools
+
+    addresses = ['0x' + os.urandom(20).hex() for _ in range(100)]
+
+    def tools() -> IPNTools:
+        return IPNTools('benchmark', retries=0, api_url=server.url + 'api/upd_addr')
+
+    def add_address() -> Callable[[int], Any]:
+        ipn = tools()
+        return lambda i: ipn.add_address(addresses[i % 100])
+
+    def delete_address() -> Callable[[int], Any]:
+        ipn = tools()
+        return lambda i: ipn.delete_address(addresses[i % 100])
+
+    def replace_address() -> Callable[[int], Any]:
+        ipn = tools()
+        return lambda i: ipn.replace_address(addresses)
+
+    return {
+        'ipn.add_address': add_address,
+        'ipn.delete_address': delete_address,
+        'ipn.replace_address[100]': replace_address,
+    }
+
+
+def local_scenarios() -> Dict[str, Scenario]:
+    from ipnpy.ipn import IPNTools
+    from ipnpy.schemes import WebhookData
+    from ipnpy.utils import to_checksum, to_checksum_many, to_tron_base58_many, to_tron_hex_many
+
+    raw = json.dumps(WEBHOOK).encode()
+    addresses = ['0x' + hashlib.sha256(str(i).encode()).hexdigest()[:40] for i in range(1000)]
+    tron_addresses = to_tron_base58_many(addresses)
+
+    return {
+        'ipn.create_wallet': lambda: lambda i: IPNTools.create_wallet(),
+        'webhook.from_json': lambda: lambda i: WebhookData.from_json(raw),
+        'webhook.from_dict': lambda: lambda i: WebhookData(WEBHOOK),
+        'address.checksum': lambda: lambda i: to_checksum(addresses[i % 100]),
+        'address.checksum_many[1000]': lambda: lambda i: to_checksum_many(addresses),
+        'address.base58_many[1000]': lambda: lambda i: to_tron_base58_many(addresses),
+        'address.tron_hex_many[1000]': lambda: lambda i: to_tron_hex_many(tron_addresses),
+    }
+
+
+def measure(scenario: Scenario, iterations: int, server: Optional[RecordingServer]) -> Dict[str, Any]:
+    """
+    Run the operation once on fresh clients to count the round trips of a cold call, then the given number of times
+    to measure the steady state with warm caches
+
+    :return: throughput, latency and the traffic per operation
+    """
+    before = server.counters() if server is not None else None
+    operation = scenario()
+    operation(0)
+    cold = _difference(server.counters(), before) if server is not None else None
+
+    before = server.counters() if server is not None else None
+    timings = []
+    started = time.perf_counter()
+    for i in range(1, iterations + 1):
+        call_started = time.perf_counter()
+        operation(i)
+        timings.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    result: Dict[str, Any] = {
+        'iterations': iterations,
+        'ops_per_second': iterations / elapsed,
+        'mean_ms': elapsed / iterations * 1000,
+        'p50_ms': timings[len(timings) // 2] * 1000,
+        'p99_ms': timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000,
+    }
+    if server is not None:
+        steady = _difference(server.counters(), before)
+        result.update({
+            'round_trips': steady['requests'] / iterations,
+            'calls': steady['calls'] / iterations,
+            'bytes_sent': steady['bytes_received'] / iterations,
+            'bytes_received': steady['bytes_sent'] / iterations,
+            'cold_round_trips': cold['requests'],
+        })
+    return result
+
+
+def _difference(after: Dict[str, int], before: Dict[str, int]) -> Dict[str, int]:
+    return {key: after[key] - before[key] for key in after}
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """
+    :return: descriptions of the operations slower than the baseline by more than the threshold, or using more round
+        trips
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['ops_per_second'] < base['ops_per_second'] * (1 - threshold):
+            regressions.append(f"{name}: {result['ops_per_second']:.1f} ops/s, baseline {base['ops_per_second']:.1f}")
+        if result.get('round_trips', 0) > base.get('round_trips', 0):
+            regressions.append(f"{name}: {result['round_trips']:.2f} round trips, baseline {base['round_trips']:.2f}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=100, help='measured calls per operation')
+    parser.add_argument('--only', help='run the operations whose name starts with this prefix')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='compare with the results of an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed throughput drop against the baseline')
+    args = parser.parse_args()
+
+    from tronpy.keys import PrivateKey
+
+    tron_key = PrivateKey.random()
+    tron_sender = (tron_key.hex(), tron_key.public_key.to_base58check_address())
+    tron_contract = PrivateKey.random().public_key.to_base58check_address()
+
+    servers: List[RecordingServer] = []
+    suites: List[Tuple[Dict[str, Scenario], Optional[RecordingServer]]] = [(local_scenarios(), None)]
+    skipped: Dict[str, str] = {}
+
+    try:
+        chain = EvmChain()
+    except ImportError as error:
+        skipped['evm'] = f'eth-tester with py-evm is not installed: {error}'
+    else:
+        servers.append(RecordingServer(chain.handle))
+        suites.append((evm_scenarios(servers[-1], chain), servers[-1]))
+
+    servers.append(RecordingServer(TronNode(tron_sender[1], tron_contract).handle))
+    suites.append((tron_scenarios(servers[-1], tron_sender, tron_contract), servers[-1]))
+    servers.append(RecordingServer(IpnApi().handle))
+    suites.append((ipn_scenarios(servers[-1]), servers[-1]))
+
+    results = {}
+    errors: Dict[str, str] = {}
+    try:
+        for scenarios, server in suites:
+            for name, scenario in scenarios.items():
+                if args.only and not name.startswith(args.only):
+                    continue
+                try:
+                    result = results[name] = measure(scenario, args.iterations, server)
+                except Exception as error:
+                    # A broken operation must not lose the measurements of the others
+                    errors[name] = f'{type(error).__name__}: {error}'
+                    print(f'{name:<30} FAILED {errors[name]}')
+                    continue
+                traffic = (f"  {result['round_trips']:5.2f} round trips  {result['calls']:6.2f} calls"
+                           f"  cold {result['cold_round_trips']}") if 'round_trips' in result else ''
+                print(f"{name:<30} {result['ops_per_second']:10.1f} ops/s  {result['mean_ms']:8.3f} ms{traffic}")
+    finally:
+        for server in servers:
+            server.close()
+
+    for suite, reason in skipped.items():
+        print(f'{suite}: skipped, {reason}')
+
+    if args.output:
+        report = {
+            'meta': {
+                'ipnpy': ipnpy.__version__,
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'time': time.time(),
+                'iterations': args.iterations,
+                'skipped': skipped,
+            },
+            'results': results,
+            'errors': errors,
+        }
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+        regressions = compare(results, baseline, args.threshold)
+        regressions.extend(f'{name}: {error}' for name, error in errors.items() if name in baseline)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        return 1 if regressions or errors else 0
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Import-time regression benchmark.
+
+Every scenario is imported in a fresh interpreter, the best wall time of several runs is reported together with the
+heavy dependencies the import pulled in. The script exits with status 1 if a scenario loads a dependency it must not
+need, so it can run in CI:
+
+    python benchmarks/import_time.py --runs 5 --output import_time.json
+"""
+import argparse
+import json
+import subprocess
+import sys
+from typing import Dict, List
+
+HEAVY_MODULES = ['web3', 'eth_account', 'tronpy', 'pydantic', 'requests', 'base58']
+
+# Import statement and the heavy modules it is allowed to load
+SCENARIOS: Dict[str, Dict] = {
+    'ipnpy': {
+        'statement': 'import ipnpy',
+        'allowed': [],
+    },
+    'webhook': {
+        'statement': 'from ipnpy.schemes import WebhookData',
+        'allowed': ['pydantic'],
+    },
+    'rpc_enums': {
+        'statement': 'from ipnpy.rpc.enums import RpcUrl',
+        'allowed': [],
+    },
+    'ipn_tools': {
+        'statement': 'from ipnpy.ipn import IPNTools',
+        'allowed': ['requests', 'base58', 'eth_account', 'pydantic'],
+    },
+    'evm_rpc': {
+        'statement': 'from ipnpy.rpc import EvmJsonRPC',
+        'allowed': HEAVY_MODULES,
+    },
+    'tron_rpc': {
+        'statement': 'from ipnpy.rpc import TronJsonRPC',
+        'allowed': HEAVY_MODULES,
+    },
+}
+
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+
+def measure(statement: str, runs: int) -> Dict:
+    timings: List[float] = []
+    loaded: List[str] = []
+    for _ in range(runs):
+        code = CHILD.format(statement=statement, heavy=HEAVY_MODULES)
+        output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+        result = json.loads(output)
+        timings.append(result['seconds'])
+        loaded = result['loaded']
+    return {'best_seconds': min(timings), 'median_seconds': sorted(timings)[len(timings) // 2], 'loaded': loaded}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per scenario')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    results = {}
+    failed = False
+    for name, scenario in SCENARIOS.items():
+        result = measure(scenario['statement'], args.runs)
+        result['unexpected'] = [module for module in result['loaded'] if module not in scenario['allowed']]
+        failed = failed or bool(result['unexpected'])
+        results[name] = result
+        print(f"{name:<12} {result['best_seconds'] * 1000:8.1f} ms  loaded: {', '.join(result['loaded']) or '-'}"
+              + (f"  UNEXPECTED: {', '.join(result['unexpected'])}" if result['unexpected'] else ''))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
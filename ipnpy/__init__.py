@@ -5,6 +5,8 @@ __version__ = '0.0.1'
 __all__ = [
     'TRC20',
     'ERC20',
+    'AsyncTRC20',
+    'AsyncERC20',
     'ValidationError',
     'ConnectionError',
     'BadRequestError',
@@ -12,7 +14,14 @@ __all__ = [
     'IPNTools'
 ]
 
-from ipnpy.contracts import TRC20, ERC20
+from ipnpy._lazy import lazy_exports
 from ipnpy.exceptions import ValidationError, ConnectionError, BadRequestError
-from ipnpy.ipn import IPNTools
-from ipnpy.schemes import WebhookData
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'TRC20': 'ipnpy.contracts.tron.token',
+    'ERC20': 'ipnpy.contracts.eth.token',
+    'AsyncTRC20': 'ipnpy.contracts.tron.async_token',
+    'AsyncERC20': 'ipnpy.contracts.eth.async_token',
+    'IPNTools': 'ipnpy.ipn.tools',
+    'WebhookData': 'ipnpy.schemes.webhook',
+})
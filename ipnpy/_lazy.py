@@ -0,0 +1,36 @@
+import importlib
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def lazy_exports(module_name: str, exports: Dict[str, str]) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """
+    Build the module __getattr__ and __dir__ functions that import the exported names on first access, so importing
+    a package does not pull in the dependencies of the modules it re-exports
+
+    :param module_name: __name__ of the package
+    :param exports: the module each exported name is imported from
+    :return: __getattr__ and __dir__ functions for the package
+    """
+    namespace = importlib.import_module(module_name).__dict__
+
+    def __getattr__(name: str) -> Any:
+        if name in exports:
+            value = getattr(importlib.import_module(exports[name]), name)
+        elif name.startswith('__'):
+            raise AttributeError(f'module {module_name!r} has no attribute {name!r}')
+        else:
+            # Submodules used to be available as attributes after the eager imports
+            try:
+                value = importlib.import_module(f'{module_name}.{name}')
+            except ModuleNotFoundError as error:
+                if error.name != f'{module_name}.{name}':
+                    raise
+                raise AttributeError(f'module {module_name!r} has no attribute {name!r}') from None
+
+        namespace[name] = value
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(namespace) | set(exports))
+
+    return __getattr__, __dir__
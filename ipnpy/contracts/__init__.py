@@ -1,7 +1,17 @@
 __all__ = [
     'TRC20',
-    'ERC20'
+    'ERC20',
+    'AsyncTRC20',
+    'AsyncERC20',
+    'ContractCache'
 ]
 
-from ipnpy.contracts.eth import ERC20
-from ipnpy.contracts.tron import TRC20
+from ipnpy._lazy import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'TRC20': 'ipnpy.contracts.tron.token',
+    'ERC20': 'ipnpy.contracts.eth.token',
+    'AsyncTRC20': 'ipnpy.contracts.tron.async_token',
+    'AsyncERC20': 'ipnpy.contracts.eth.async_token',
+    'ContractCache': 'ipnpy.contracts.eth.cache',
+})
@@ -1,5 +1,13 @@
 __all__ = [
-    'ERC20'
+    'ERC20',
+    'AsyncERC20',
+    'ContractCache'
 ]
 
-from ipnpy.contracts.eth.token import ERC20
+from ipnpy._lazy import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'ERC20': 'ipnpy.contracts.eth.token',
+    'AsyncERC20': 'ipnpy.contracts.eth.async_token',
+    'ContractCache': 'ipnpy.contracts.eth.cache',
+})
@@ -31,3 +31,13 @@ ERC20_ABI = '''[{"inputs":[{"internalType":"string","name":"_name","type":"strin
     "type":"address"},{"internalType":"address","name":"recipient","type":"address"},{"internalType":"uint256",
     "name":"amount","type":"uint256"}],"name":"transferFrom","outputs":[{"internalType":"bool","name":"",
     "type":"bool"}],"stateMutability":"nonpayable","type":"function"}]'''
+
+MULTICALL3_ABI = '''[{"inputs":[{"components":[{"internalType":"address","name":"target","type":"address"},
+    {"internalType":"bool","name":"allowFailure","type":"bool"},{"internalType":"bytes","name":"callData",
+    "type":"bytes"}],"internalType":"struct Multicall3.Call3[]","name":"calls","type":"tuple[]"}],
+    "name":"aggregate3","outputs":[{"components":[{"internalType":"bool","name":"success","type":"bool"},
+    {"internalType":"bytes","name":"returnData","type":"bytes"}],"internalType":"struct Multicall3.Result[]",
+    "name":"returnData","type":"tuple[]"}],"stateMutability":"payable","type":"function"}]'''
+
+# keccak256 of Transfer(address,address,uint256), topic0 of the Transfer event
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
@@ -0,0 +1,110 @@
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional
+
+from web3 import AsyncWeb3
+
+from ipnpy.contracts.eth.abi import ERC20_ABI
+from ipnpy.contracts.eth.cache import ContractCache, load_abi
+from ipnpy.contracts.eth.utils import raw_transaction
+from ipnpy.utils.address import to_checksum
+
+if TYPE_CHECKING:
+    from ipnpy.rpc.fees import AsyncFeeOracle
+
+
+class AsyncERC20:
+    def __init__(self,
+                 w3: AsyncWeb3,
+                 contract_address: str,
+                 cache: Optional[ContractCache] = None,
+                 chain_id: Optional[int] = None,
+                 fee_oracle: Optional['AsyncFeeOracle'] = None) -> None:
+        """
+        A base class for interacting with contracts implementing the ERC20 interface using asyncio
+
+        :param w3: asynchronous Web3 client
+        :param contract_address: token contract address implementing the ERC20 interface
+        :param cache: if set, decimals, symbol and name are read from the network once and kept in the cache
+        :param chain_id: chain id of the network for the cache keys, read from the network if not set
+        :param fee_oracle: if set, transfers are EIP-1559 transactions with cached fees and gas estimates, otherwise
+            legacy transactions with the gas price read on every transfer
+        """
+        self.contract_address = to_checksum(contract_address)
+        self._w3 = w3
+        self._contract = self._w3.eth.contract(self.contract_address, abi=load_abi(ERC20_ABI))
+        self._functions = self._contract.functions
+        self._cache = cache
+        self._chain_id = chain_id
+        self._fee_oracle = fee_oracle
+
+    async def get_decimals(self) -> int:
+        return await self._get_metadata('decimals', self._functions.decimals().call)
+
+    async def get_symbol(self) -> str:
+        return await self._get_metadata('symbol', self._functions.symbol().call)
+
+    async def get_name(self) -> str:
+        return await self._get_metadata('name', self._functions.name().call)
+
+    async def _get_metadata(self, field: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        if self._cache is None:
+            return await fetch()
+        if self._chain_id is None:
+            self._chain_id = await self._w3.eth.chain_id
+
+        value = self._cache.peek_metadata(self._chain_id, self.contract_address, field)
+        if value is None:
+            value = await fetch()
+            self._cache.set_metadata(self._chain_id, self.contract_address, field, value)
+        return value
+
+    async def transfer(self,
+                       private_key: str,
+                       from_address: str,
+                       to_address: str,
+                       amount: int,
+                       nonce: Optional[int] = None) -> str:
+        """
+        Using the transfer, sends the ERC20 token to another address
+
+        :param private_key: private key from the wallet
+        :param from_address: sender's wallet address
+        :param to_address: recipient's wallet address
+        :param amount: the amount of currency being transferred
+        :param nonce: nonce of the transaction, the pending transaction count of the sender by default
+        :return: address transaction
+        """
+
+        valid_address = to_checksum(from_address)
+        if nonce is None:
+            nonce = await self._w3.eth.get_transaction_count(valid_address, 'pending')
+
+        if self._fee_oracle is None:
+            transaction_info = {
+                'chainId': await self._w3.eth.chain_id,
+                'gas': 100_000,
+                'gasPrice': await self._w3.eth.gas_price,
+            }
+        else:
+            transaction_info = {
+                **await self._fee_oracle.transaction_fields(),
+                'gas': await self._fee_oracle.get_token_transfer_gas(self.contract_address, valid_address, amount),
+            }
+        transaction_info.update({'nonce': nonce, 'from': valid_address})
+
+        transaction = await (
+            self._functions.transfer(to_checksum(to_address), amount)
+            .build_transaction(transaction_info)
+        )
+
+        signed_transaction = self._w3.eth.account.sign_transaction(transaction, private_key)
+        send = await self._w3.eth.send_raw_transaction(raw_transaction(signed_transaction))
+        return AsyncWeb3.to_hex(send)
+
+    async def balance_of(self, address: str) -> int:
+        """
+        Get the balance of the ERC20 token in the EVM network.
+
+        :param address: wallet address
+        :return: the balance of the selected wallet
+        """
+        return await self._functions.balanceOf(to_checksum(address)).call()
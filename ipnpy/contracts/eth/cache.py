@@ -0,0 +1,202 @@
+import json
+import os
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+# Token fields that never change after deployment and are safe to keep between restarts
+METADATA_FIELDS = ('decimals', 'symbol', 'name')
+
+
+@lru_cache(maxsize=None)
+def load_abi(abi: str) -> list:
+    """
+    Parse the ABI once per process. The returned list is shared and must not be modified.
+
+    :param abi: ABI as a JSON string
+    :return: parsed ABI
+    """
+    return json.loads(abi)
+
+
+class ContractCache:
+    def __init__(self, max_size: int = 1024, path: Optional[str] = None) -> None:
+        """
+        A bounded LRU cache of contract instances and immutable token metadata keyed by chain id and contract address.
+        Clients may share one cache: the metadata is shared between them, the contract instances are bound to the
+        client that created them and are kept per client until the client is garbage-collected.
+
+        :param max_size: the maximum number of contracts of every client and of metadata entries kept in memory
+        :param path: if set, the metadata is loaded from this JSON file and saved to it when it changes
+        """
+        self.max_size = max_size
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._contracts: 'OrderedDict[Tuple[int, str], Any]' = OrderedDict()
+        self._owned_contracts: 'weakref.WeakKeyDictionary[Any, OrderedDict[Tuple[int, str], Any]]' = \
+            weakref.WeakKeyDictionary()
+        self._metadata: 'OrderedDict[Tuple[int, str], Dict[str, Any]]' = OrderedDict()
+
+        if self.path and os.path.exists(self.path):
+            self.load()
+
+    def get_contract(self, chain_id: int, address: str, factory: Callable[[], T], owner: Any = None) -> T:
+        """
+        Get the cached contract instance or create it
+
+        :param chain_id: chain id of the network
+        :param address: contract address
+        :param factory: a function creating the contract instance on a miss
+        :param owner: the client the contract instance is bound to, instances of other clients are not returned. The
+            instances are dropped with the client, so they must not reference it
+        :return: the contract instance
+        """
+        key = (chain_id, address.lower())
+        with self._lock:
+            contracts = self._contracts if owner is None else self._owned_contracts.setdefault(owner, OrderedDict())
+            contract = self._get(contracts, key)
+        if contract is not None:
+            return contract
+
+        contract = factory()
+        with self._lock:
+            self._put(contracts, key, contract)
+        return contract
+
+    def get_metadata(self, chain_id: int, address: str, field: str, fetch: Callable[[], Any]) -> Any:
+        """
+        Get the cached token metadata field or fetch it from the network
+
+        :param chain_id: chain id of the network
+        :param address: contract address
+        :param field: one of decimals, symbol or name
+        :param fetch: a function reading the field from the contract on a miss
+        :return: the value of the field
+        """
+        value = self.peek_metadata(chain_id, address, field)
+        if value is None:
+            value = fetch()
+            self.set_metadata(chain_id, address, field, value)
+        return value
+
+    def peek_metadata(self, chain_id: int, address: str, field: str) -> Any:
+        """
+        Get the cached token metadata field without fetching it
+
+        :param chain_id: chain id of the network
+        :param address: contract address
+        :param field: one of decimals, symbol or name
+        :return: the value of the field, or None if it is not cached
+        """
+        key = (chain_id, address.lower())
+        with self._lock:
+            metadata = self._metadata.get(key)
+            if metadata is None or field not in metadata:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._metadata.move_to_end(key)
+            return metadata[field]
+
+    def set_metadata(self, chain_id: int, address: str, field: str, value: Any) -> None:
+        """
+        Store the token metadata field
+
+        :param chain_id: chain id of the network
+        :param address: contract address
+        :param field: one of decimals, symbol or name
+        :param value: the value of the field
+        """
+        if field not in METADATA_FIELDS:
+            raise ValueError(f'Unknown metadata field {field}')
+
+        key = (chain_id, address.lower())
+        with self._lock:
+            metadata = self._metadata.get(key)
+            if metadata is None:
+                metadata = {}
+                self._put(self._metadata, key, metadata)
+            changed = metadata.get(field) != value
+            metadata[field] = value
+
+        if self.path and changed:
+            self.save()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        :return: hit and miss counters and the current sizes of the cache
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'contracts': len(self._contracts) + sum(len(contracts) for contracts in self._owned_contracts.values()),
+                'metadata': len(self._metadata),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._contracts.clear()
+            self._owned_contracts.clear()
+            self._metadata.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def load(self) -> None:
+        """
+        Load the metadata from the file set in path
+        """
+        with open(self.path) as file:
+            entries = json.load(file)
+
+        with self._lock:
+            for entry in entries:
+                metadata = {field: entry[field] for field in METADATA_FIELDS if field in entry}
+                self._put(self._metadata, (entry['chain_id'], entry['address'].lower()), metadata)
+
+    def save(self) -> None:
+        """
+        Save the metadata to the file set in path, the file is replaced atomically
+        """
+        # Saves run one at a time, so an older snapshot never replaces a newer one
+        with self._save_lock:
+            with self._lock:
+                entries = [
+                    {'chain_id': chain_id, 'address': address, **metadata}
+                    for (chain_id, address), metadata in self._metadata.items()
+                ]
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            file = tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tmp', delete=False)
+            try:
+                with file:
+                    json.dump(entries, file)
+                os.replace(file.name, self.path)
+            except BaseException:
+                os.remove(file.name)
+                raise
+
+    def _get(self, entries: OrderedDict, key: tuple) -> Any:
+        value = entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        entries.move_to_end(key)
+        return value
+
+    def _put(self, entries: OrderedDict, key: tuple, value: Any) -> None:
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_size:
+            entries.popitem(last=False)
@@ -0,0 +1,63 @@
+from typing import List, Tuple
+
+from web3 import Web3
+
+from ipnpy.contracts.eth.abi import MULTICALL3_ABI
+from ipnpy.contracts.eth.cache import load_abi
+from ipnpy.utils.address import to_checksum
+
+MULTICALL3_ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'
+
+# ABI-encoded size of one Call3 entry without its calldata: array offset, target, allowFailure,
+# calldata offset and calldata length, 32 bytes each
+_CALL3_OVERHEAD = 5 * 32
+
+
+class Multicall3:
+    def __init__(self,
+                 w3: Web3,
+                 contract_address: str = MULTICALL3_ADDRESS,
+                 max_calldata_size: int = 64_000) -> None:
+        """
+        A class for packing many read-only calls into Multicall3 aggregate3 eth_calls
+
+        :param w3: Web3 client
+        :param contract_address: Multicall3 contract address, the same on most EVM networks
+        :param max_calldata_size: the maximum size in bytes of the calldata of one eth_call, larger batches are
+            split into several eth_calls
+        """
+        self.contract_address = to_checksum(contract_address)
+        self.max_calldata_size = max_calldata_size
+        self._w3 = w3
+        self._contract = self._w3.eth.contract(self.contract_address, abi=load_abi(MULTICALL3_ABI))
+        self._functions = self._contract.functions
+
+    def aggregate3(self, calls: List[Tuple[str, bytes]]) -> List[Tuple[bool, bytes]]:
+        """
+        Execute the calls through aggregate3, allowing every call to fail on its own
+
+        :param calls: pairs of the target contract address and the calldata
+        :return: pairs of the success flag and the return data, in the order of the calls
+        """
+        results = []
+        for chunk in self._chunks(calls):
+            payload = [(target, True, call_data) for target, call_data in chunk]
+            results.extend((success, bytes(data)) for success, data in self._functions.aggregate3(payload).call())
+        return results
+
+    def _chunks(self, calls: List[Tuple[str, bytes]]) -> List[List[Tuple[str, bytes]]]:
+        chunks = []
+        chunk = []
+        size = 0
+        for call in calls:
+            call_size = _CALL3_OVERHEAD + (len(call[1]) + 31) // 32 * 32
+            if chunk and size + call_size > self.max_calldata_size:
+                chunks.append(chunk)
+                chunk = []
+                size = 0
+            chunk.append(call)
+            size += call_size
+
+        if chunk:
+            chunks.append(chunk)
+        return chunks
@@ -1,31 +1,69 @@
-import json
+from typing import TYPE_CHECKING, Any, Callable, Optional
 
+from eth_abi import decode, encode
 from web3 import Web3
 
 from ipnpy.contracts.eth.abi import ERC20_ABI
+from ipnpy.contracts.eth.cache import ContractCache, load_abi
+from ipnpy.contracts.eth.utils import raw_transaction
+from ipnpy.instrumentation.hooks import observe
+from ipnpy.utils.address import to_checksum
+
+if TYPE_CHECKING:
+    from ipnpy.rpc.fees import FeeOracle
+
+BALANCE_OF_SELECTOR = bytes.fromhex('70a08231')
+DECIMALS_SELECTOR = bytes.fromhex('313ce567')
+TRANSFER_SELECTOR = bytes.fromhex('a9059cbb')
 
 
 class ERC20:
-    def __init__(self, w3: Web3, contract_address: str) -> None:
+    def __init__(self,
+                 w3: Web3,
+                 contract_address: str,
+                 cache: Optional[ContractCache] = None,
+                 chain_id: Optional[int] = None,
+                 fee_oracle: Optional['FeeOracle'] = None) -> None:
         """
         A base class for interacting with contracts implementing the ERC20 interface
 
         :param w3: Web3 client
         :param contract_address: token contract address implementing the ERC20 interface
+        :param cache: if set, decimals, symbol and name are read from the network once and kept in the cache
+        :param chain_id: chain id of the network for the cache keys, read from the network if not set
+        :param fee_oracle: if set, transfers are EIP-1559 transactions with cached fees and gas estimates, otherwise
+            legacy transactions with the gas price read on every transfer
         """
-        self.contract_address = w3.to_checksum_address(contract_address)
+        self.contract_address = to_checksum(contract_address)
         self._w3 = w3
-        self._contract = self._w3.eth.contract(self.contract_address, abi=json.loads(ERC20_ABI))
+        self._contract = self._w3.eth.contract(self.contract_address, abi=load_abi(ERC20_ABI))
         self._functions = self._contract.functions
+        self._cache = cache
+        self._chain_id = chain_id
+        self._fee_oracle = fee_oracle
 
     def get_decimals(self) -> int:
-        return self._functions.decimals().call()
+        return self._get_metadata('decimals', self._functions.decimals().call)
+
+    def get_symbol(self) -> str:
+        return self._get_metadata('symbol', self._functions.symbol().call)
+
+    def get_name(self) -> str:
+        return self._get_metadata('name', self._functions.name().call)
+
+    def _get_metadata(self, field: str, fetch: Callable[[], Any]) -> Any:
+        if self._cache is None:
+            return fetch()
+        if self._chain_id is None:
+            self._chain_id = self._w3.eth.chain_id
+        return self._cache.get_metadata(self._chain_id, self.contract_address, field, fetch)
 
     def transfer(self,
                  private_key: str,
                  from_address: str,
                  to_address: str,
-                 amount: int) -> str:
+                 amount: int,
+                 nonce: Optional[int] = None) -> str:
         """
         Using the transfer, sends the ERC20 token to another address
 
@@ -33,28 +71,55 @@ class ERC20:
         :param from_address: sender's wallet address
         :param to_address: recipient's wallet address
         :param amount: the amount of currency being transferred
+        :param nonce: nonce of the transaction, the pending transaction count of the sender by default
         :return: address transaction
         """
+        raw = self.sign_transfer(private_key, from_address, to_address, amount, nonce)
+        send = self._w3.eth.send_raw_transaction(raw)
+        return Web3.to_hex(send)
+
+    def sign_transfer(self,
+                      private_key: str,
+                      from_address: str,
+                      to_address: str,
+                      amount: int,
+                      nonce: Optional[int] = None) -> bytes:
+        """
+        Build and sign the transfer of the ERC20 token without broadcasting it
 
-        valid_address = self._w3.to_checksum_address(from_address)
-        nonce = self._w3.eth.get_transaction_count(valid_address, 'pending')
+        :param private_key: private key from the wallet
+        :param from_address: sender's wallet address
+        :param to_address: recipient's wallet address
+        :param amount: the amount of currency being transferred
+        :param nonce: nonce of the transaction, the pending transaction count of the sender by default
+        :return: signed raw transaction
+        """
+        valid_address = to_checksum(from_address)
+        if nonce is None:
+            nonce = self._w3.eth.get_transaction_count(valid_address, 'pending')
 
-        transaction_info = {
-            'chainId': self._w3.eth.chain_id,
-            'gas': 100_000,
-            'gasPrice': self._w3.eth.gas_price,
-            'nonce': nonce,
-            'from': valid_address,
-        }
+        if self._fee_oracle is None:
+            transaction_info = {
+                'chainId': self._w3.eth.chain_id,
+                'gas': 100_000,
+                'gasPrice': self._w3.eth.gas_price,
+            }
+        else:
+            transaction_info = {
+                **self._fee_oracle.transaction_fields(),
+                'gas': self._fee_oracle.get_token_transfer_gas(self.contract_address, valid_address, amount),
+            }
+        transaction_info.update({'nonce': nonce, 'from': valid_address})
 
         transaction = (
-            self._functions.transfer(self._w3.to_checksum_address(to_address), amount)
+            self._functions.transfer(to_checksum(to_address), amount)
             .build_transaction(transaction_info)
         )
 
-        signed_transaction = self._w3.eth.account.sign_transaction(transaction, private_key)
-        send = self._w3.eth.send_raw_transaction(signed_transaction.rawTransaction)
-        return send.hex()
+        signed_transaction = observe(
+            'evm', 'sign', None, lambda: self._w3.eth.account.sign_transaction(transaction, private_key)
+        )
+        return raw_transaction(signed_transaction)
 
     def balance_of(self, address: str) -> int:
         """
@@ -63,4 +128,33 @@ class ERC20:
         :param address: wallet address
         :return: the balance of the selected wallet
         """
-        return self._functions.balanceOf(self._w3.to_checksum_address(address)).call()
+        return self._functions.balanceOf(to_checksum(address)).call()
+
+    @staticmethod
+    def encode_balance_of(address: str) -> bytes:
+        """
+        Encode the balanceOf call for use in a Multicall3 batch
+
+        :param address: checksum wallet address
+        :return: calldata of the call
+        """
+        return BALANCE_OF_SELECTOR + encode(['address'], [address])
+
+    @staticmethod
+    def encode_transfer(to_address: str, amount: int) -> bytes:
+        """
+        Encode the transfer call to sign the transaction without building it through the contract
+
+        :param to_address: checksum recipient's wallet address
+        :param amount: the amount of currency being transferred
+        :return: calldata of the call
+        """
+        return TRANSFER_SELECTOR + encode(['address', 'uint256'], [to_address, amount])
+
+    @staticmethod
+    def encode_decimals() -> bytes:
+        return DECIMALS_SELECTOR
+
+    @staticmethod
+    def decode_uint(data: bytes) -> int:
+        return decode(['uint256'], data)[0]
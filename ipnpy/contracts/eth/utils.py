@@ -0,0 +1,10 @@
+from typing import Any
+
+
+def raw_transaction(signed_transaction: Any) -> bytes:
+    """
+    :param signed_transaction: transaction signed by eth-account
+    :return: the signed raw transaction, named raw_transaction since eth-account 0.13 and rawTransaction before
+    """
+    raw = getattr(signed_transaction, 'raw_transaction', None)
+    return raw if raw is not None else signed_transaction.rawTransaction
@@ -1,5 +1,11 @@
 __all__ = [
-    'TRC20'
+    'TRC20',
+    'AsyncTRC20'
 ]
 
-from ipnpy.contracts.tron.token import TRC20
+from ipnpy._lazy import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'TRC20': 'ipnpy.contracts.tron.token',
+    'AsyncTRC20': 'ipnpy.contracts.tron.async_token',
+})
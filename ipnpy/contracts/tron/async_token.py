@@ -0,0 +1,83 @@
+import asyncio
+import json
+from typing import Optional, Union
+
+from tronpy import AsyncTron
+from tronpy.async_contract import AsyncContract
+from tronpy.keys import PrivateKey
+from tronpy.tron import TAddress
+
+from ipnpy.contracts.tron.abi import TRC20_ABI
+
+
+class AsyncTRC20:
+    def __init__(self,
+                 client: AsyncTron,
+                 contract_address: Union[str, TAddress],
+                 fetch_contract: bool = True) -> None:
+        """
+        A base class for interacting with contracts implementing the TRC20 interface using asyncio
+
+        :param client: asynchronous tron client
+        :param contract_address: token contract address implementing the TRC20 interface
+        :param fetch_contract: if True, the contract is fetched from the network on the first call, otherwise it is
+            built from the bundled TRC20 ABI
+        """
+        self.contract_address = contract_address
+        self._client = client
+        self._contract: Optional[AsyncContract] = None
+        if not fetch_contract:
+            self._contract = AsyncContract(self.contract_address, abi=json.loads(TRC20_ABI), client=self._client)
+        self._lock = asyncio.Lock()
+        self._decimals: Optional[int] = None
+
+    async def _get_functions(self):
+        async with self._lock:
+            if self._contract is None:
+                contract = await self._client.get_contract(self.contract_address)
+                contract.abi = json.loads(TRC20_ABI)
+                self._contract = contract
+        return self._contract.functions
+
+    async def get_decimals(self) -> int:
+        if self._decimals is None:
+            functions = await self._get_functions()
+            self._decimals = await functions.decimals()
+        return self._decimals
+
+    async def transfer(self,
+                       private_key: str,
+                       from_address: str,
+                       to_address: str,
+                       amount: int) -> str:
+        """
+        Using the transfer, sends the TRC20 token to another address
+
+        :param private_key: private key from the wallet
+        :param from_address: sender's wallet address
+        :param to_address: recipient's wallet address
+        :param amount: the amount of currency being transferred
+        :return: address transaction
+        """
+        functions = await self._get_functions()
+        builder = await functions.transfer(to_address, amount)
+        transaction = await (
+            builder
+            .with_owner(from_address)
+            .fee_limit(30_000_000)
+            .build()
+        )
+        transaction.sign(PrivateKey(bytes.fromhex(private_key.replace('0x', ''))))
+
+        send = await transaction.broadcast()
+        return send['txid']
+
+    async def balance_of(self, address: str) -> int:
+        """
+        Get the balance of the TRC20 token in the tron network.
+
+        :param address: wallet address
+        :return: the balance of the selected wallet
+        """
+        functions = await self._get_functions()
+        return await functions.balanceOf(address)
@@ -1,29 +1,43 @@
 import json
-from typing import Union
+from typing import Optional, Union
 
 from tronpy import Tron
+from tronpy.contract import Contract
 from tronpy.keys import PrivateKey
-from tronpy.tron import TAddress
+from tronpy.tron import TAddress, Transaction
 
 from ipnpy.contracts.tron.abi import TRC20_ABI
+from ipnpy.contracts.tron.utils import build_transaction
+from ipnpy.instrumentation.hooks import observe
 
 
 class TRC20:
-    def __init__(self, client: Tron, contract_address: Union[str, TAddress]) -> None:
+    def __init__(self,
+                 client: Tron,
+                 contract_address: Union[str, TAddress],
+                 fetch_contract: bool = True) -> None:
         """
         A base class for interacting with contracts implementing the TRC20 interface
 
         :param client: tron client
         :param contract_address: token contract address implementing the TRC20 interface
+        :param fetch_contract: if False, the contract is built from the bundled TRC20 ABI without requesting it from
+            the network
         """
         self.contract_address = contract_address
         self._client = client
-        self._contract = self._client.get_contract(self.contract_address)
-        self._contract.abi = json.loads(TRC20_ABI)
+        if fetch_contract:
+            self._contract = self._client.get_contract(self.contract_address)
+            self._contract.abi = json.loads(TRC20_ABI)
+        else:
+            self._contract = Contract(self.contract_address, abi=json.loads(TRC20_ABI), client=self._client)
         self._functions = self._contract.functions
+        self._decimals: Optional[int] = None
 
     def get_decimals(self) -> int:
-        return self._functions.decimals()
+        if self._decimals is None:
+            self._decimals = self._functions.decimals()
+        return self._decimals
 
     def transfer(self,
                  private_key: str,
@@ -40,18 +54,37 @@ class TRC20:
         :return: address transaction
         """
 
-        transaction = (
-            self._functions.transfer(to_address, amount)
-            .with_owner(from_address)
-            .fee_limit(30_000_000)
-            .build()
-            .sign(PrivateKey(
-                bytes.fromhex(private_key.replace('0x', ''))))
-        )
-
+        transaction = self.sign_transfer(private_key, from_address, to_address, amount)
         send = transaction.broadcast()
         return send['txid']
 
+    def sign_transfer(self,
+                      private_key: str,
+                      from_address: str,
+                      to_address: str,
+                      amount: int,
+                      expiration: Optional[int] = None,
+                      ref_block_id: Optional[str] = None) -> Transaction:
+        """
+        Build and sign the transfer of the TRC20 token without broadcasting it
+
+        :param private_key: private key from the wallet
+        :param from_address: sender's wallet address
+        :param to_address: recipient's wallet address
+        :param amount: the amount of currency being transferred
+        :param expiration: milliseconds the transaction stays valid, 60 seconds by default and at most 24 hours
+        :param ref_block_id: id of a recent solid block shared by many transactions, read from the node if None
+        :return: signed transaction
+        """
+        builder = self._functions.transfer(to_address, amount).with_owner(from_address).fee_limit(30_000_000)
+        if expiration is not None:
+            builder = builder.expiration(expiration)
+        transaction = build_transaction(builder, ref_block_id)
+        return observe(
+            'tron', 'sign', None,
+            lambda: transaction.sign(PrivateKey(bytes.fromhex(private_key.replace('0x', ''))))
+        )
+
     def balance_of(self, address: str) -> int:
         """
         Get the balance of the TRC20 token in the tron network.
@@ -0,0 +1,20 @@
+from typing import Optional
+
+from tronpy.tron import Transaction, TransactionBuilder
+
+
+def build_transaction(builder: TransactionBuilder, ref_block_id: Optional[str] = None) -> Transaction:
+    """
+    Build the transaction on a reference block read once for many transactions, so building does not request the
+    node. tronpy computes the id of such a transaction with protobuf, without it the node builds the transaction.
+
+    :param builder: transaction builder of tronpy
+    :param ref_block_id: id of a recent solid block in hex, the latest one is read from the node if None
+    :return: the unsigned transaction
+    """
+    if ref_block_id is not None:
+        try:
+            return builder.build(offline=True, ref_block_id=ref_block_id)
+        except ImportError:
+            pass
+    return builder.build()
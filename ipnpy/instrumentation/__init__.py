@@ -0,0 +1,23 @@
+__all__ = [
+    'Instrument',
+    'Hooks',
+    'add_instrument',
+    'remove_instrument',
+    'is_enabled',
+    'observe',
+    'MemoryCollector',
+    'PrometheusExporter'
+]
+
+from ipnpy._lazy import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'Instrument': 'ipnpy.instrumentation.hooks',
+    'Hooks': 'ipnpy.instrumentation.hooks',
+    'add_instrument': 'ipnpy.instrumentation.hooks',
+    'remove_instrument': 'ipnpy.instrumentation.hooks',
+    'is_enabled': 'ipnpy.instrumentation.hooks',
+    'observe': 'ipnpy.instrumentation.hooks',
+    'MemoryCollector': 'ipnpy.instrumentation.memory',
+    'PrometheusExporter': 'ipnpy.instrumentation.prometheus',
+})
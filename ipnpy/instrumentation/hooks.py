@@ -0,0 +1,141 @@
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from ipnpy.schemes.rpc import CallRecord
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+Hook = Callable[[CallRecord], Any]
+
+# Installed instruments, observe calls nothing while the list is empty
+_instruments: List['Instrument'] = []
+
+
+class Instrument:
+    """
+    Base class of the receivers of call records. before is called when a call starts, after when it ended, with the
+    duration, byte counts and the error filled in. Both run in the calling thread, their exceptions are logged and
+    never reach the call.
+    """
+
+    def before(self, record: CallRecord) -> None:
+        pass
+
+    def after(self, record: CallRecord) -> None:
+        pass
+
+
+class Hooks(Instrument):
+    def __init__(self) -> None:
+        """
+        Pre and post hooks of single methods, for example eth_sendRawTransaction or sign. Hooks registered for '*'
+        receive every call.
+        """
+        self._before: Dict[str, List[Hook]] = {}
+        self._after: Dict[str, List[Hook]] = {}
+
+    def on_before(self, method: str, hook: Hook) -> None:
+        """
+        :param method: the method name, or '*' for every method
+        :param hook: called with the record before the call is sent
+        """
+        self._before.setdefault(method, []).append(hook)
+
+    def on_after(self, method: str, hook: Hook) -> None:
+        """
+        :param method: the method name, or '*' for every method
+        :param hook: called with the completed record
+        """
+        self._after.setdefault(method, []).append(hook)
+
+    def before(self, record: CallRecord) -> None:
+        for hook in self._before.get(record.method, []) + self._before.get('*', []):
+            _notify(hook, record)
+
+    def after(self, record: CallRecord) -> None:
+        for hook in self._after.get(record.method, []) + self._after.get('*', []):
+            _notify(hook, record)
+
+
+def add_instrument(instrument: Instrument) -> None:
+    """
+    Start sending the records of every network call and signature to the instrument
+
+    :param instrument: the receiver of the records
+    """
+    if instrument not in _instruments:
+        _instruments.append(instrument)
+
+
+def remove_instrument(instrument: Instrument) -> None:
+    if instrument in _instruments:
+        _instruments.remove(instrument)
+
+
+def is_enabled() -> bool:
+    return bool(_instruments)
+
+
+def observe(client: str,
+            method: str,
+            endpoint: Optional[str],
+            call: Callable[[], T],
+            request_bytes: Optional[Callable[[], int]] = None,
+            response_bytes: Optional[Callable[[T], int]] = None,
+            response_error: Optional[Callable[[T], Optional[Exception]]] = None) -> T:
+    """
+    Run the call and report it to the installed instruments. Without instruments the call runs directly, the byte
+    counters and the errors of responses are computed only when someone listens. A failing instrument does not change
+    the result of the call.
+
+    :param client: the client making the call, for example evm, tron or ipn
+    :param method: RPC method or operation name
+    :param endpoint: address the call goes to, None for local operations like signing
+    :param call: the call
+    :param request_bytes: returns the size of the request
+    :param response_bytes: returns the size of the response from the result of the call
+    :param response_error: returns the error reported inside a received response, for example a JSON-RPC error
+        object, or None
+    :return: the result of the call
+    """
+    if not _instruments:
+        return call()
+
+    instruments = list(_instruments)
+    record = CallRecord(client, method, endpoint, time.time())
+    for instrument in instruments:
+        _notify(instrument.before, record)
+
+    started = time.perf_counter()
+    try:
+        result = call()
+    except BaseException as error:
+        record.error = error
+        raise
+    else:
+        try:
+            if response_bytes is not None:
+                record.response_bytes = response_bytes(result)
+            if response_error is not None:
+                record.error = response_error(result)
+        except Exception:
+            logger.exception('Reading the response of %s failed', method)
+        return result
+    finally:
+        record.duration = time.perf_counter() - started
+        try:
+            if request_bytes is not None:
+                record.request_bytes = request_bytes()
+        except Exception:
+            logger.exception('Reading the request of %s failed', method)
+        for instrument in instruments:
+            _notify(instrument.after, record)
+
+
+def _notify(hook: Callable[[CallRecord], Any], record: CallRecord) -> None:
+    try:
+        hook(record)
+    except Exception:
+        logger.exception('Instrument hook %r failed for %s', hook, record.method)
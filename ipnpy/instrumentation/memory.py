@@ -0,0 +1,97 @@
+import bisect
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Sequence, Tuple
+
+from ipnpy.instrumentation.hooks import Instrument
+from ipnpy.schemes.rpc import CallRecord
+
+# Upper bounds of the latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class _Histogram:
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, quantile: float) -> float:
+        """
+        :return: the upper bound of the bucket holding the quantile, infinity for the overflow bucket
+        """
+        rank = quantile * self.count
+        total = 0
+        for bound, count in zip(list(self.buckets) + [float('inf')], self.counts):
+            total += count
+            if total >= rank:
+                return bound
+        return float('inf')
+
+
+class MemoryCollector(Instrument):
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        """
+        An in-process collector of latency histograms, error counters and byte counts without dependencies. Install
+        it with add_instrument and read it with snapshot.
+
+        :param buckets: upper bounds of the latency buckets in seconds
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._latency: Dict[Tuple[str, str], _Histogram] = {}
+        self._errors: Dict[Tuple[str, str, str, str], int] = defaultdict(int)
+        self._bytes: Dict[Tuple[str, str], List[int]] = defaultdict(lambda: [0, 0])
+
+    def after(self, record: CallRecord) -> None:
+        key = (record.client, record.method)
+        with self._lock:
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = self._latency[key] = _Histogram(self.buckets)
+            histogram.observe(record.duration)
+
+            counts = self._bytes[key]
+            counts[0] += record.request_bytes
+            counts[1] += record.response_bytes
+
+            if record.error is not None:
+                self._errors[(record.client, record.endpoint or '', record.method, type(record.error).__name__)] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        :return: latency statistics and byte counts by client and method, and error counts by client, endpoint,
+            method and error type
+        """
+        with self._lock:
+            latency = [
+                {
+                    'client': client,
+                    'method': method,
+                    'count': histogram.count,
+                    'sum': histogram.sum,
+                    'p50': histogram.quantile(0.5),
+                    'p99': histogram.quantile(0.99),
+                    'buckets': dict(zip([str(bound) for bound in self.buckets] + ['+Inf'], histogram.counts)),
+                    'request_bytes': self._bytes[(client, method)][0],
+                    'response_bytes': self._bytes[(client, method)][1],
+                }
+                for (client, method), histogram in self._latency.items()
+            ]
+            errors = [
+                {'client': client, 'endpoint': endpoint, 'method': method, 'error': error, 'count': count}
+                for (client, endpoint, method, error), count in self._errors.items()
+            ]
+        return {'latency': latency, 'errors': errors}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._latency.clear()
+            self._errors.clear()
+            self._bytes.clear()
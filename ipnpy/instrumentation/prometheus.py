@@ -0,0 +1,46 @@
+from typing import Any, Optional, Sequence
+
+from ipnpy.instrumentation.hooks import Instrument
+from ipnpy.instrumentation.memory import DEFAULT_BUCKETS
+from ipnpy.schemes.rpc import CallRecord
+
+
+class PrometheusExporter(Instrument):
+    def __init__(self,
+                 registry: Optional[Any] = None,
+                 namespace: str = 'ipnpy',
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        """
+        Exports the call records as Prometheus metrics. Requires the prometheus_client package.
+
+        :param registry: prometheus_client registry, the default registry if not set
+        :param namespace: prefix of the metric names
+        :param buckets: upper bounds of the latency buckets in seconds
+        """
+        try:
+            from prometheus_client import REGISTRY, Counter, Histogram
+        except ImportError:
+            raise ImportError('PrometheusExporter requires prometheus_client: pip install prometheus-client') from None
+
+        registry = registry if registry is not None else REGISTRY
+        self.latency = Histogram(
+            'call_duration_seconds', 'Duration of network calls and signatures',
+            ['client', 'method'], namespace=namespace, buckets=buckets, registry=registry,
+        )
+        self.errors = Counter(
+            'call_errors', 'Failed network calls',
+            ['client', 'endpoint', 'method', 'error'], namespace=namespace, registry=registry,
+        )
+        self.bytes = Counter(
+            'call_bytes', 'Bytes sent and received by network calls',
+            ['client', 'method', 'direction'], namespace=namespace, registry=registry,
+        )
+
+    def after(self, record: CallRecord) -> None:
+        self.latency.labels(record.client, record.method).observe(record.duration)
+        if record.request_bytes:
+            self.bytes.labels(record.client, record.method, 'sent').inc(record.request_bytes)
+        if record.response_bytes:
+            self.bytes.labels(record.client, record.method, 'received').inc(record.response_bytes)
+        if record.error is not None:
+            self.errors.labels(record.client, record.endpoint or '', record.method, type(record.error).__name__).inc()
@@ -1,5 +1,15 @@
 __all__ = [
-    'IPNTools'
+    'IPNTools',
+    'AddressSync',
+    'HDWallet',
+    'HDNode'
 ]
 
-from ipnpy.ipn.tools import IPNTools
+from ipnpy._lazy import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'IPNTools': 'ipnpy.ipn.tools',
+    'AddressSync': 'ipnpy.ipn.sync',
+    'HDWallet': 'ipnpy.ipn.hd',
+    'HDNode': 'ipnpy.ipn.hd',
+})
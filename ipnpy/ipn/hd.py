@@ -0,0 +1,287 @@
+import hashlib
+import hmac
+import struct
+from typing import Dict, Iterator, Optional
+
+import base58
+from Crypto.Hash import RIPEMD160
+from eth_account.hdaccount import seed_from_mnemonic
+from eth_keys import keys
+from eth_keys.backends.native.ecdsa import G, N, decode_public_key, encode_raw_public_key, fast_add, fast_multiply
+
+from ipnpy.exceptions import ValidationError
+from ipnpy.ipn.wallets import tron_address
+from ipnpy.schemes.ipn_api import Wallet
+
+try:
+    import coincurve
+except ImportError:
+    coincurve = None
+
+EVM_COIN_TYPE = 60
+TRON_COIN_TYPE = 195
+
+HARDENED = 0x80000000
+XPRV_VERSION = bytes.fromhex('0488ade4')
+XPUB_VERSION = bytes.fromhex('0488b21e')
+
+
+class HDNode:
+    def __init__(self,
+                 chain_code: bytes,
+                 private_key: Optional[bytes] = None,
+                 public_key: Optional[keys.PublicKey] = None,
+                 depth: int = 0,
+                 parent_fingerprint: bytes = b'\0' * 4,
+                 child_number: int = 0) -> None:
+        """
+        A BIP32 extended key. A node with only the public key derives the public keys of its non-hardened children.
+
+        :param chain_code: 32-byte chain code
+        :param private_key: 32-byte private key, None for a public node
+        :param public_key: the public key, computed from the private key if not set
+        :param depth: the number of derivation steps from the master node
+        :param parent_fingerprint: the first 4 bytes of the hash of the parent public key
+        :param child_number: the index of the node in its parent, hardened indexes include the 0x80000000 flag
+        """
+        if private_key is None and public_key is None:
+            raise ValueError('Either the private or the public key is required')
+
+        self.chain_code = chain_code
+        self.private_key = private_key
+        self.depth = depth
+        self.parent_fingerprint = parent_fingerprint
+        self.child_number = child_number
+        self._public_key = public_key
+        self._compressed: Optional[bytes] = None
+
+    @classmethod
+    def from_seed(cls, seed: bytes) -> 'HDNode':
+        """
+        :param seed: BIP39 seed or any 16 to 64 random bytes
+        :return: the master node
+        """
+        digest = hmac.new(b'Bitcoin seed', seed, hashlib.sha512).digest()
+        return cls(digest[32:], private_key=digest[:32])
+
+    @classmethod
+    def from_extended_key(cls, extended_key: str) -> 'HDNode':
+        """
+        :param extended_key: xprv or xpub string
+        :return: the node encoded in the string
+        """
+        try:
+            data = base58.b58decode_check(extended_key)
+        except ValueError:
+            raise ValidationError('Invalid extended key checksum') from None
+        if len(data) != 78 or data[:4] not in (XPRV_VERSION, XPUB_VERSION):
+            raise ValidationError('Invalid extended key')
+
+        depth, parent_fingerprint, child_number = data[4], data[5:9], struct.unpack('>I', data[9:13])[0]
+        chain_code, key = data[13:45], data[45:]
+        if data[:4] == XPRV_VERSION:
+            return cls(chain_code, private_key=key[1:], depth=depth,
+                       parent_fingerprint=parent_fingerprint, child_number=child_number)
+        return cls(chain_code, public_key=keys.PublicKey.from_compressed_bytes(key), depth=depth,
+                   parent_fingerprint=parent_fingerprint, child_number=child_number)
+
+    @property
+    def public_key(self) -> keys.PublicKey:
+        if self._public_key is None:
+            self._public_key = keys.PrivateKey(self.private_key).public_key
+        return self._public_key
+
+    @property
+    def compressed_public_key(self) -> bytes:
+        if self._compressed is None:
+            self._compressed = self.public_key.to_compressed_bytes()
+        return self._compressed
+
+    @property
+    def fingerprint(self) -> bytes:
+        return RIPEMD160.new(hashlib.sha256(self.compressed_public_key).digest()).digest()[:4]
+
+    @property
+    def xpub(self) -> str:
+        return self._serialize(XPUB_VERSION, self.compressed_public_key)
+
+    @property
+    def xprv(self) -> str:
+        if self.private_key is None:
+            raise ValidationError('The node has no private key')
+        return self._serialize(XPRV_VERSION, b'\0' + self.private_key)
+
+    def neuter(self) -> 'HDNode':
+        """
+        :return: the same node without the private key
+        """
+        return HDNode(self.chain_code, public_key=self.public_key, depth=self.depth,
+                      parent_fingerprint=self.parent_fingerprint, child_number=self.child_number)
+
+    def child(self, index: int) -> 'HDNode':
+        """
+        Derive the child node
+
+        :param index: child index, add HARDENED for a hardened child
+        :return: the child node, public if this node is public
+        """
+        if index >= HARDENED:
+            if self.private_key is None:
+                raise ValidationError('Hardened children can not be derived from a public key')
+            data = b'\0' + self.private_key + struct.pack('>I', index)
+        else:
+            data = self.compressed_public_key + struct.pack('>I', index)
+
+        digest = hmac.new(self.chain_code, data, hashlib.sha512).digest()
+        tweak, chain_code = int.from_bytes(digest[:32], 'big'), digest[32:]
+        if tweak >= N:
+            # Probability below 2^-127, BIP32 skips to the next index
+            return self.child(index + 1)
+
+        if self.private_key is not None:
+            key = (tweak + int.from_bytes(self.private_key, 'big')) % N
+            if key == 0:
+                return self.child(index + 1)
+            return HDNode(chain_code, private_key=key.to_bytes(32, 'big'), depth=self.depth + 1,
+                          parent_fingerprint=self.fingerprint, child_number=index)
+
+        return HDNode(chain_code, public_key=_add_tweak(self, digest[:32]), depth=self.depth + 1,
+                      parent_fingerprint=self.fingerprint, child_number=index)
+
+    def derive(self, path: str) -> 'HDNode':
+        """
+        Derive the node at the path relative to this node
+
+        :param path: path like m/44'/60'/0' from the master node or 0/5 relative to this node
+        :return: the derived node
+        """
+        node = self
+        for part in path.split('/'):
+            if part in ('m', ''):
+                continue
+            hardened = part[-1] in ("'", 'h', 'H')
+            node = node.child(int(part[:-1] if hardened else part) + (HARDENED if hardened else 0))
+        return node
+
+    def wallet(self) -> Wallet:
+        """
+        :return: the paired eth and tron addresses of the node key, the same as IPNTools.create_wallet returns
+        """
+        eth_address = self.public_key.to_address()
+        private_key = '0x' + self.private_key.hex() if self.private_key is not None else None
+        return Wallet(private_key, tron_address(eth_address), eth_address)
+
+    def _serialize(self, version: bytes, key: bytes) -> str:
+        data = (version + bytes([self.depth]) + self.parent_fingerprint + struct.pack('>I', self.child_number)
+                + self.chain_code + key)
+        return base58.b58encode_check(data).decode('utf-8')
+
+
+class HDWallet:
+    def __init__(self, account_node: HDNode, coin_type: int = EVM_COIN_TYPE, account: int = 0) -> None:
+        """
+        Deterministic deposit wallets under the BIP44 account m/44'/coin_type'/account'. The branch nodes are cached,
+        so every next address costs a single derivation step. Created from an account xpub the wallet derives only
+        the addresses, with private_key set to None, which is enough for the web tier.
+
+        :param account_node: the node of the BIP44 account
+        :param coin_type: EVM_COIN_TYPE or TRON_COIN_TYPE, used only to format paths
+        :param account: the account index, used only to format paths
+        """
+        self.coin_type = coin_type
+        self.account = account
+        self._account_node = account_node
+        self._branches: Dict[int, HDNode] = {}
+
+    @classmethod
+    def from_seed(cls, seed: bytes, coin_type: int = EVM_COIN_TYPE, account: int = 0) -> 'HDWallet':
+        """
+        :param seed: BIP39 seed
+        :param coin_type: EVM_COIN_TYPE for m/44'/60', TRON_COIN_TYPE for m/44'/195'
+        :param account: the account index
+        :return: the wallet of the account
+        """
+        node = HDNode.from_seed(seed).derive(f"m/44'/{coin_type}'/{account}'")
+        return cls(node, coin_type, account)
+
+    @classmethod
+    def from_mnemonic(cls,
+                      mnemonic: str,
+                      passphrase: str = '',
+                      coin_type: int = EVM_COIN_TYPE,
+                      account: int = 0) -> 'HDWallet':
+        """
+        :param mnemonic: BIP39 mnemonic phrase
+        :param passphrase: optional BIP39 passphrase
+        :param coin_type: EVM_COIN_TYPE for m/44'/60', TRON_COIN_TYPE for m/44'/195'
+        :param account: the account index
+        :return: the wallet of the account
+        """
+        try:
+            seed = seed_from_mnemonic(mnemonic, passphrase)
+        except Exception as error:
+            raise ValidationError(f'Invalid mnemonic: {error}') from None
+        return cls.from_seed(seed, coin_type, account)
+
+    @classmethod
+    def from_extended_key(cls, extended_key: str, coin_type: int = EVM_COIN_TYPE, account: int = 0) -> 'HDWallet':
+        """
+        :param extended_key: xpub or xprv of the BIP44 account, as returned by xpub and xprv
+        :param coin_type: the coin type of the account, used only to format paths
+        :param account: the account index, used only to format paths
+        :return: the wallet of the account
+        """
+        return cls(HDNode.from_extended_key(extended_key), coin_type, account)
+
+    @property
+    def xpub(self) -> str:
+        return self._account_node.xpub
+
+    @property
+    def xprv(self) -> str:
+        return self._account_node.xprv
+
+    @property
+    def is_public(self) -> bool:
+        return self._account_node.private_key is None
+
+    def path(self, index: int, change: int = 0) -> str:
+        return f"m/44'/{self.coin_type}'/{self.account}'/{change}/{index}"
+
+    def derive(self, index: int, change: int = 0) -> Wallet:
+        """
+        Derive the wallet at m/44'/coin_type'/account'/change/index
+
+        :param index: address index
+        :param change: 0 for deposit addresses, 1 for change addresses
+        :return: the wallet, private_key is None for a wallet created from an xpub
+        """
+        return self._branch(change).child(index).wallet()
+
+    def derive_range(self, start: int, count: int, change: int = 0) -> Iterator[Wallet]:
+        """
+        Derive the wallets of consecutive indexes
+
+        :param start: the first address index
+        :param count: the number of wallets
+        :param change: 0 for deposit addresses, 1 for change addresses
+        :return: an iterator over the wallets in index order
+        """
+        branch = self._branch(change)
+        for index in range(start, start + count):
+            yield branch.child(index).wallet()
+
+    def _branch(self, change: int) -> HDNode:
+        branch = self._branches.get(change)
+        if branch is None:
+            branch = self._branches[change] = self._account_node.child(change)
+        return branch
+
+
+def _add_tweak(node: HDNode, tweak: bytes) -> keys.PublicKey:
+    if coincurve is not None:
+        point = coincurve.PublicKey(node.compressed_public_key).add(tweak)
+        return keys.PublicKey(point.format(compressed=False)[1:])
+
+    point = fast_add(fast_multiply(G, int.from_bytes(tweak, 'big')), decode_public_key(node.public_key.to_bytes()))
+    return keys.PublicKey(encode_raw_public_key(point))
@@ -0,0 +1,226 @@
+import json
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from ipnpy.exceptions import BadRequestError
+from ipnpy.ipn.tools import IPNTools
+from ipnpy.schemes.ipn_api import AddressList, SyncReport
+
+ADD = 'add'
+DELETE = 'delete'
+
+
+class AddressSync:
+    def __init__(self,
+                 ipn: IPNTools,
+                 addresses: Optional[Iterable[str]] = None,
+                 window: float = 1.0,
+                 request_cost: int = 4096,
+                 on_report: Optional[Callable[[SyncReport], None]] = None,
+                 max_retry_delay: float = 60) -> None:
+        """
+        Keeps a local mirror of the IPN address list and sends only the changes. Adds and deletes are coalesced for
+        a short window, then sent either as single-address requests or as one replace of the whole list, whichever
+        is cheaper.
+
+        :param ipn: IPN client
+        :param addresses: the address list currently stored in IPN, for example from a previous replace
+        :param window: seconds to collect changes before they are flushed automatically, 0 disables the timer and
+            changes are sent only by flush
+        :param request_cost: the cost of one request in bytes of payload, used to compare many small requests with
+            one large replace
+        :param on_report: called with the report of every automatic flush
+        :param max_retry_delay: the longest delay in seconds before an automatic flush retries changes that failed,
+            the delay doubles from the window after every failed flush
+        """
+        self.window = window
+        self.request_cost = request_cost
+        self.on_report = on_report
+        self.max_retry_delay = max_retry_delay
+        self._ipn = ipn
+        self._mirror: Set[str] = set(addresses or [])
+        self._pending: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._failed_flushes = 0
+        self._closed = False
+
+    @property
+    def addresses(self) -> Set[str]:
+        """
+        :return: the address list as it will be after the pending changes are sent
+        """
+        with self._lock:
+            addresses = set(self._mirror)
+            for address, operation in self._pending.items():
+                if operation == ADD:
+                    addresses.add(address)
+                else:
+                    addresses.discard(address)
+            return addresses
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def add(self, *addresses: str) -> None:
+        """
+        Schedule adding the addresses to the list
+
+        :param addresses: addresses to add
+        """
+        self._schedule(addresses, ADD)
+
+    def delete(self, *addresses: str) -> None:
+        """
+        Schedule deleting the addresses from the list
+
+        :param addresses: addresses to delete
+        """
+        self._schedule(addresses, DELETE)
+
+    def reset(self, addresses: Iterable[str]) -> None:
+        """
+        Replace the local mirror with the list stored in IPN, pending changes are kept
+
+        :param addresses: the address list currently stored in IPN
+        """
+        with self._lock:
+            self._mirror = set(addresses)
+
+    def flush(self) -> SyncReport:
+        """
+        Send the pending changes using the cheapest set of requests
+
+        :return: what was sent. Addresses rejected by the API are listed in errors and dropped, addresses that failed
+            for other reasons are listed in errors and stay pending
+        """
+        with self._flush_lock:
+            with self._lock:
+                self._cancel_timer()
+                additions = sorted(address for address, operation in self._pending.items()
+                                   if operation == ADD and address not in self._mirror)
+                deletions = sorted(address for address, operation in self._pending.items()
+                                   if operation == DELETE and address in self._mirror)
+                changed = set(additions) | set(deletions)
+                # Changes that match the mirror already need no request
+                for address in list(self._pending):
+                    if address not in changed:
+                        del self._pending[address]
+                target = (self._mirror | set(additions)) - set(deletions)
+
+            report = SyncReport()
+            if not additions and not deletions:
+                return report
+
+            if self._replace_cost(target) < self._delta_cost(additions + deletions):
+                self._replace(sorted(target), additions, deletions, report)
+            else:
+                self._send_delta(additions, deletions, report)
+            return report
+
+    def close(self) -> SyncReport:
+        """
+        Stop the timer and send the pending changes, failed changes are not retried automatically after it
+
+        :return: the report of the last flush
+        """
+        with self._lock:
+            self._closed = True
+        return self.flush()
+
+    def _schedule(self, addresses: Iterable[str], operation: str) -> None:
+        with self._lock:
+            for address in addresses:
+                self._pending[address] = operation
+            if self.window > 0 and self._timer is None and self._pending:
+                self._start_timer(self.window)
+
+    def _flush_by_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+        report = self.flush()
+        with self._lock:
+            if report.errors and self._pending:
+                # Changes that failed for reasons other than a rejection stay pending, retry them with a backoff
+                self._failed_flushes += 1
+                if self._timer is None and not self._closed:
+                    self._start_timer(min(self.max_retry_delay, self.window * 2 ** self._failed_flushes))
+            else:
+                self._failed_flushes = 0
+        if self.on_report is not None:
+            self.on_report(report)
+
+    def _start_timer(self, delay: float) -> None:
+        self._timer = threading.Timer(delay, self._flush_by_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _replace(self, target: List[str], additions: List[str], deletions: List[str], report: SyncReport) -> None:
+        report.requests += 1
+        report.bytes_sent += self._payload_size({'addresses': target, 'secret_key': self._ipn.secret_key})
+        try:
+            result = self._ipn.replace_address(target)
+        except Exception as error:
+            report.errors.update((address, str(error)) for address in additions + deletions)
+            return
+
+        report.replaced = True
+        report.added.extend(additions)
+        report.deleted.extend(deletions)
+        self._apply(result, additions + deletions)
+
+    def _send_delta(self, additions: List[str], deletions: List[str], report: SyncReport) -> None:
+        operations = [(address, ADD) for address in additions] + [(address, DELETE) for address in deletions]
+        for address, operation in operations:
+            report.requests += 1
+            report.bytes_sent += self._payload_size({'address': address, 'secret_key': self._ipn.secret_key})
+            try:
+                if operation == ADD:
+                    result = self._ipn.add_address(address)
+                else:
+                    result = self._ipn.delete_address(address)
+            except BadRequestError as error:
+                # The address is already in the requested state, the mirror was behind
+                report.errors[address] = str(error)
+                with self._lock:
+                    if self._pending.get(address) == operation:
+                        del self._pending[address]
+                        if operation == ADD:
+                            self._mirror.add(address)
+                        else:
+                            self._mirror.discard(address)
+                continue
+            except Exception as error:
+                report.errors[address] = str(error)
+                continue
+
+            (report.added if operation == ADD else report.deleted).append(address)
+            self._apply(result, [address])
+
+    def _apply(self, result: AddressList, sent: List[str]) -> None:
+        with self._lock:
+            self._mirror = set(result.addresses)
+            for address in sent:
+                # Keep changes scheduled again while the request was in flight
+                operation = self._pending.get(address)
+                if operation == ADD and address in self._mirror or operation == DELETE and address not in self._mirror:
+                    del self._pending[address]
+
+    def _delta_cost(self, addresses: List[str]) -> int:
+        return sum(self.request_cost + len(address) for address in addresses)
+
+    def _replace_cost(self, target: Set[str]) -> int:
+        # Quotes, comma and space of every address in the JSON list
+        return self.request_cost + sum(len(address) + 4 for address in target)
+
+    @staticmethod
+    def _payload_size(body: dict) -> int:
+        return len(json.dumps(body))
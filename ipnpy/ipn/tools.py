@@ -1,20 +1,66 @@
-from typing import List
+import json
+import random
+from typing import Iterator, List, Optional, Tuple, Union
 
-import base58
 import requests
 from eth_account import Account
 from eth_utils import encode_hex
 from requests import Response
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from ipnpy.exceptions import ValidationError, ConnectionError, BadRequestError
+from ipnpy.instrumentation.hooks import observe
+from ipnpy.ipn.wallets import iter_wallet_rows, read_encrypted, tron_address, write_encrypted
 from ipnpy.schemes.ipn_api import Wallet, AddressList
 
 API_URL = 'https://ipn.tools/api/upd_addr'
 
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class JitteredRetry(Retry):
+    def get_backoff_time(self) -> float:
+        # Full jitter, so workers retrying after the same failure do not hit the API at the same moment
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff else 0
+
 
 class IPNTools:
-    def __init__(self, secret_key: str) -> None:
+    def __init__(self,
+                 secret_key: str,
+                 timeout: Union[float, Tuple[float, float]] = (5, 30),
+                 retries: int = 3,
+                 backoff_factor: float = 0.5,
+                 pool_size: int = 10,
+                 api_url: str = API_URL) -> None:
+        """
+        A class for interacting with the IPN API. Requests share a keep-alive connection pool, so one instance can be
+        used from many threads.
+
+        :param secret_key: secret key of the IPN project
+        :param timeout: timeout of a request in seconds, or a pair of the connect and read timeouts
+        :param retries: the maximum number of retries on connection errors, 429 and 5xx responses
+        :param backoff_factor: base of the exponential backoff between retries in seconds, randomized by jitter
+        :param pool_size: the maximum number of connections kept open to the API
+        :param api_url: address of the address list endpoint, change it to use a local stand-in of the API
+        """
         self.secret_key = secret_key
+        self.timeout = timeout
+        self.api_url = api_url
+        self._session = self._create_session(retries, backoff_factor, pool_size)
+
+    def __enter__(self) -> 'IPNTools':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close the connections of the session
+        """
+        self._session.close()
 
     @staticmethod
     def create_wallet() -> Wallet:
@@ -28,9 +74,53 @@ class IPNTools:
         private_key = encode_hex(account.key)
         eth_address = account.address.lower()
 
-        ascii_address = f"41{eth_address[2:]}"
-        tron_address = base58.b58encode_check(bytes.fromhex(ascii_address)).decode("utf-8")
-        return Wallet(private_key, tron_address, eth_address)
+        return Wallet(private_key, tron_address(eth_address), eth_address)
+
+    @staticmethod
+    def create_wallets(n: int, processes: Optional[int] = None, chunk_size: int = 1000) -> Iterator[Wallet]:
+        """
+        Create many wallets in a process pool. The wallets are yielded one by one, only a few chunks are kept in
+        memory at a time.
+
+        :param n: the number of wallets
+        :param processes: the number of worker processes, all CPUs by default, 1 creates them in the current process
+        :param chunk_size: the number of wallets created by a worker at once
+        :return: an iterator over the created wallets
+        """
+        for row in iter_wallet_rows(n, processes, chunk_size):
+            yield Wallet(*row)
+
+    @staticmethod
+    def write_wallets(path: str,
+                      n: int,
+                      password: str,
+                      processes: Optional[int] = None,
+                      chunk_size: int = 1000) -> int:
+        """
+        Create many wallets in a process pool and stream them to a file encrypted with the password. Read the file
+        with read_wallets.
+
+        :param path: path of the file, it is overwritten
+        :param n: the number of wallets
+        :param password: password of the file
+        :param processes: the number of worker processes, all CPUs by default, 1 creates them in the current process
+        :param chunk_size: the number of wallets created by a worker at once
+        :return: the number of written wallets
+        """
+        with open(path, 'wb') as file:
+            return write_encrypted(file, iter_wallet_rows(n, processes, chunk_size), password, chunk_size)
+
+    @staticmethod
+    def read_wallets(path: str, password: str) -> Iterator[Wallet]:
+        """
+        Read the wallets written by write_wallets
+
+        :param path: path of the file
+        :param password: password of the file
+        :return: an iterator over the wallets
+        """
+        with open(path, 'rb') as file:
+            yield from read_encrypted(file, password)
 
     def add_address(self, address: str) -> AddressList:
         """
@@ -44,7 +134,7 @@ class IPNTools:
             "secret_key": self.secret_key
         }
 
-        response = requests.put(API_URL, json=body)
+        response = self._send('PUT', 'add_address', body)
         return self._response_analise(response)
 
     def delete_address(self, address: str) -> AddressList:
@@ -59,7 +149,7 @@ class IPNTools:
             "secret_key": self.secret_key
         }
 
-        response = requests.delete(API_URL, json=body)
+        response = self._send('DELETE', 'delete_address', body)
         return self._response_analise(response)
 
     def replace_address(self, addresses: List[str]) -> AddressList:
@@ -74,9 +164,34 @@ class IPNTools:
             "secret_key": self.secret_key
         }
 
-        response = requests.post(API_URL, json=body)
+        response = self._send('POST', 'replace_address', body)
         return self._response_analise(response)
 
+    def _send(self, method: str, name: str, body: dict) -> Response:
+        return observe(
+            'ipn', name, self.api_url,
+            lambda: self._session.request(method, self.api_url, json=body, timeout=self.timeout),
+            lambda: len(json.dumps(body)),
+            lambda response: len(response.content),
+            lambda response: None if response.ok else BadRequestError(f'HTTP {response.status_code}'),
+        )
+
+    @staticmethod
+    def _create_session(retries: int, backoff_factor: float, pool_size: int) -> requests.Session:
+        retry = JitteredRetry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['PUT', 'DELETE', 'POST']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
     @staticmethod
     def _response_analise(response: Response) -> AddressList:
         if response.ok:
@@ -0,0 +1,183 @@
+import hashlib
+import os
+import struct
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from Crypto.Cipher import AES
+from eth_keys import keys
+
+from ipnpy.exceptions import ValidationError
+from ipnpy.schemes.ipn_api import Wallet
+from ipnpy.utils.address import to_tron_base58
+
+# private key, tron address, eth address
+WalletRow = Tuple[str, str, str]
+
+FILE_MAGIC = b'IPNW2'
+SALT_SIZE = 16
+NONCE_SIZE = 12
+TAG_SIZE = 16
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+
+def tron_address(eth_address: str) -> str:
+    """
+    Convert the hex EVM address to the base58check TRON address of the same key
+
+    :param eth_address: hex address with the 0x prefix
+    :return: TRON address
+    """
+    return to_tron_base58(eth_address)
+
+
+def generate_wallet_rows(count: int) -> List[WalletRow]:
+    """
+    Generate wallets as plain tuples, cheap to send between processes
+
+    :param count: the number of wallets
+    :return: private key, tron address and eth address of every wallet
+    """
+    rows = []
+    while len(rows) < count:
+        try:
+            private_key = keys.PrivateKey(os.urandom(32))
+        except Exception:
+            # The random bytes are outside of the secp256k1 key range
+            continue
+
+        eth_address = private_key.public_key.to_address()
+        rows.append((private_key.to_hex(), tron_address(eth_address), eth_address))
+    return rows
+
+
+def iter_wallet_rows(n: int, processes: Optional[int] = None, chunk_size: int = 1000) -> Iterator[WalletRow]:
+    """
+    Generate wallets in a process pool, keeping only a few chunks in memory at a time
+
+    :param n: the number of wallets
+    :param processes: the number of worker processes, all CPUs by default, 1 generates in the current process
+    :param chunk_size: the number of wallets generated by a worker at once
+    :return: an iterator over the generated wallets
+    """
+    chunks = [chunk_size] * (n // chunk_size) + ([n % chunk_size] if n % chunk_size else [])
+
+    if processes == 1:
+        for chunk in chunks:
+            yield from generate_wallet_rows(chunk)
+        return
+
+    workers = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as executor:
+        max_in_flight = 2 * workers
+        remaining = iter(chunks)
+        in_flight = deque()
+        for chunk in remaining:
+            in_flight.append(executor.submit(generate_wallet_rows, chunk))
+            if len(in_flight) >= max_in_flight:
+                break
+
+        while in_flight:
+            rows = in_flight.popleft().result()
+            next_chunk = next(remaining, None)
+            if next_chunk is not None:
+                in_flight.append(executor.submit(generate_wallet_rows, next_chunk))
+            yield from rows
+
+
+def write_encrypted(file: BinaryIO, rows: Iterator[WalletRow], password: str, frame_size: int = 1000) -> int:
+    """
+    Write the wallets as CSV lines encrypted with AES-GCM. The key is derived from the password with scrypt, every
+    frame of lines is sealed separately, so the file is written and read as a stream. The index of the frame and
+    whether it is the last one are authenticated with it, so dropped, reordered and cut off frames are detected.
+
+    :param file: binary file open for writing
+    :param rows: wallets to write
+    :param password: password of the file
+    :param frame_size: the number of wallets in one encrypted frame
+    :return: the number of written wallets
+    """
+    salt = os.urandom(SALT_SIZE)
+    key = _derive_key(password, salt)
+    file.write(FILE_MAGIC + salt)
+
+    count = 0
+    index = 0
+    frame = []
+    # A full frame is written once the next row shows it is not the last one
+    full_frame = None
+    for row in rows:
+        if full_frame is not None:
+            _write_frame(file, key, full_frame, index, False)
+            index += 1
+            full_frame = None
+        frame.append(','.join(row))
+        count += 1
+        if len(frame) >= frame_size:
+            full_frame, frame = frame, []
+
+    # The last frame is written even if it is empty, so the reader knows the file is complete
+    _write_frame(file, key, full_frame if full_frame is not None else frame, index, True)
+    return count
+
+
+def read_encrypted(file: BinaryIO, password: str) -> Iterator[Wallet]:
+    """
+    Read the wallets written by write_encrypted. The wallets of a frame are returned once it is verified, a file
+    missing frames or the last frame raises ValidationError after the wallets read before the damage.
+
+    :param file: binary file open for reading
+    :param password: password of the file
+    :return: an iterator over the wallets
+    """
+    header = file.read(len(FILE_MAGIC) + SALT_SIZE)
+    if not header.startswith(FILE_MAGIC):
+        raise ValidationError('Not an encrypted wallet file')
+    if len(header) < len(FILE_MAGIC) + SALT_SIZE:
+        raise ValidationError('Damaged wallet file')
+    key = _derive_key(password, header[len(FILE_MAGIC):])
+
+    index = 0
+    while True:
+        prefix = file.read(NONCE_SIZE + 5)
+        if len(prefix) < NONCE_SIZE + 5:
+            raise ValidationError('Damaged wallet file')
+        nonce, (last, size) = prefix[:NONCE_SIZE], struct.unpack('>?I', prefix[NONCE_SIZE:])
+        payload = file.read(size)
+        if size < TAG_SIZE or len(payload) < size:
+            raise ValidationError('Damaged wallet file')
+
+        cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+        cipher.update(_frame_header(index, last))
+        try:
+            data = cipher.decrypt_and_verify(payload[:-TAG_SIZE], payload[-TAG_SIZE:])
+        except ValueError:
+            raise ValidationError('Wrong password or damaged wallet file') from None
+
+        for line in data.decode('utf-8').splitlines():
+            yield Wallet(*line.split(','))
+        if last:
+            if file.read(1):
+                raise ValidationError('Damaged wallet file')
+            return
+        index += 1
+
+
+def _derive_key(password: str, salt: bytes) -> bytes:
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, dklen=32)
+
+
+def _frame_header(index: int, last: bool) -> bytes:
+    return struct.pack('>Q?', index, last)
+
+
+def _write_frame(file: BinaryIO, key: bytes, lines: List[str], index: int, last: bool) -> None:
+    nonce = os.urandom(NONCE_SIZE)
+    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+    cipher.update(_frame_header(index, last))
+    ciphertext, tag = cipher.encrypt_and_digest('\n'.join(lines).encode('utf-8'))
+    file.write(nonce + struct.pack('>?I', last, len(ciphertext) + TAG_SIZE) + ciphertext + tag)
+
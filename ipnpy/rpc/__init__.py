@@ -1,7 +1,29 @@
 __all__ = [
     'EvmJsonRPC',
-    'TronJsonRPC'
+    'TronJsonRPC',
+    'AsyncEvmJsonRPC',
+    'AsyncTronJsonRPC',
+    'NonceManager',
+    'FeeOracle',
+    'AsyncFeeOracle',
+    'Portfolio',
+    'TransactionOutbox',
+    'OutboxBroadcaster',
+    'gather_limited'
 ]
 
-from ipnpy.rpc.evm import EvmJsonRPC
-from ipnpy.rpc.tron import TronJsonRPC
+from ipnpy._lazy import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'EvmJsonRPC': 'ipnpy.rpc.evm',
+    'TronJsonRPC': 'ipnpy.rpc.tron',
+    'AsyncEvmJsonRPC': 'ipnpy.rpc.async_evm',
+    'AsyncTronJsonRPC': 'ipnpy.rpc.async_tron',
+    'NonceManager': 'ipnpy.rpc.nonce',
+    'FeeOracle': 'ipnpy.rpc.fees',
+    'AsyncFeeOracle': 'ipnpy.rpc.fees',
+    'Portfolio': 'ipnpy.rpc.portfolio',
+    'TransactionOutbox': 'ipnpy.rpc.outbox',
+    'OutboxBroadcaster': 'ipnpy.rpc.outbox',
+    'gather_limited': 'ipnpy.rpc.utils',
+})
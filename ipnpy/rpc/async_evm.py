@@ -0,0 +1,316 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from web3 import AsyncWeb3
+
+from ipnpy.contracts.eth.async_token import AsyncERC20
+from ipnpy.contracts.eth.cache import ContractCache
+from ipnpy.contracts.eth.utils import raw_transaction
+from ipnpy.exceptions import BadRequestError, ConnectionError
+from ipnpy.rpc.enums import RpcUrl
+from ipnpy.rpc.fees import NATIVE_TRANSFER_GAS, AsyncFeeOracle
+from ipnpy.rpc.nonce import NonceManager
+from ipnpy.rpc.utils import gather_limited
+from ipnpy.schemes.rpc import Balance
+from ipnpy.utils.address import to_checksum
+
+
+class CachingAsyncHTTPProvider(AsyncWeb3.AsyncHTTPProvider):
+    # Responses that never change for a network. The validation middleware of web3 reads the chain id before every
+    # transaction, so it is read once.
+    CACHED_METHODS = ('eth_chainId', 'net_version')
+
+    def __init__(self, endpoint_uri: str) -> None:
+        """
+        A web3 asynchronous HTTP provider reading the constant responses of the network once
+
+        :param endpoint_uri: the address of the RPC
+        """
+        super().__init__(endpoint_uri)
+        self._cached_responses: Dict[str, Any] = {}
+
+    async def make_request(self, method: str, params: Any) -> Any:
+        cached = self._cached_responses.get(method)
+        if cached is not None:
+            return dict(cached)
+
+        response = await super().make_request(method, params)
+        if method in self.CACHED_METHODS and isinstance(response, dict) and 'result' in response:
+            self._cached_responses[method] = response
+        return response
+
+
+class AsyncEvmJsonRPC:
+    def __init__(self,
+                 rpc_url: Union[RpcUrl, str],
+                 concurrency: int = 32,
+                 nonce_manager: Optional[NonceManager] = None,
+                 token_cache: Optional[ContractCache] = None,
+                 fee_oracle: Optional[AsyncFeeOracle] = None) -> None:
+        """
+        A class for interacting with EVM networks using asyncio. The connection is checked when entering the async
+        context manager:
+
+            async with AsyncEvmJsonRPC(RpcUrl.BINANCE) as provider:
+                balance = await provider.get_native_balance(address)
+
+        :param rpc_url: the address to connect to the RPC.
+        :param concurrency: the maximum number of concurrent requests of the bulk methods
+        :param nonce_manager: if set, nonces of sent transactions are allocated locally instead of being fetched
+            before every transaction. Share one manager between the clients sending from the same wallets.
+        :param token_cache: cache of ERC20 contracts and token metadata, a new cache is created for the client by
+            default. Clients of the same network sharing one cache share the token metadata.
+        :param fee_oracle: cache of the chain id, fees and token gas estimates used by sends, a new oracle is created
+            for the client by default
+        """
+        self.concurrency = concurrency
+        self._w3 = AsyncWeb3(CachingAsyncHTTPProvider(str(rpc_url)))
+        self._nonce_manager = nonce_manager
+        self._chain_id: Optional[int] = None
+        self._token_cache = token_cache or ContractCache()
+        self._fee_oracle = fee_oracle or AsyncFeeOracle(self.call_many)
+
+    async def __aenter__(self) -> 'AsyncEvmJsonRPC':
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    async def connect(self) -> None:
+        """
+        Сhecks the connection to the RPC
+
+        :raises ConnectionError: if the RPC is not available
+        """
+        if not await self._w3.is_connected():
+            raise ConnectionError('Error connecting')
+
+    async def close(self) -> None:
+        """
+        Close the HTTP session of the provider
+        """
+        disconnect = getattr(self._w3.provider, 'disconnect', None)
+        if disconnect is not None:
+            await disconnect()
+
+    async def get_erc20_balance(self,
+                                address: str,
+                                contract_address: str,
+                                raw: bool = True
+                                ) -> Union[int, float]:
+        """
+        Get the balance of the ERC20 token in the EVM network.
+
+        :param address: wallet address
+        :param contract_address: token contract address implementing the ERC20 interface
+        :param raw: if True, the function returns the balance in the minimum unit of measurement of the currency
+        :return: float: the balance of the selected wallet
+        """
+        erc20 = await self._get_erc20(contract_address)
+        balance = await erc20.balance_of(address)
+
+        if not raw:
+            decimals = await erc20.get_decimals()
+            balance /= 10 ** decimals
+
+        return balance
+
+    async def get_erc20_balances(self,
+                                 addresses: List[str],
+                                 contract_addresses: List[str],
+                                 raw: bool = True
+                                 ) -> List[Balance]:
+        """
+        Get the balances of several ERC20 tokens for many wallets concurrently
+
+        :param addresses: wallet addresses
+        :param contract_addresses: token contract addresses implementing the ERC20 interface
+        :param raw: if True, the function returns the balances in the minimum unit of measurement of the currency
+        :return: a balance for every pair of contract and wallet, grouped by contract
+        """
+        tokens = [await self._get_erc20(contract_address) for contract_address in contract_addresses]
+        pairs = [(token, address) for token in tokens for address in addresses]
+
+        results = await gather_limited(
+            (token.balance_of(address) for token, address in pairs), self.concurrency, return_exceptions=True
+        )
+
+        decimals = {}
+        if not raw:
+            token_decimals = await gather_limited(
+                (token.get_decimals() for token in tokens), self.concurrency, return_exceptions=True
+            )
+            decimals = dict(zip((token.contract_address for token in tokens), token_decimals))
+
+        balances = []
+        for (token, address), balance in zip(pairs, results):
+            contract = token.contract_address
+            if isinstance(balance, Exception):
+                balances.append(Balance(address, contract, None, str(balance)))
+            elif raw:
+                balances.append(Balance(address, contract, balance))
+            elif isinstance(decimals[contract], Exception):
+                balances.append(Balance(address, contract, None, str(decimals[contract])))
+            else:
+                balances.append(Balance(address, contract, balance / 10 ** decimals[contract]))
+        return balances
+
+    async def get_native_balance(self,
+                                 address: str,
+                                 raw: bool = True
+                                 ) -> Union[int, float]:
+        """
+        Get the native balance in EVM network
+
+        :param address: Wallet address
+        :param raw: If True, the function returns the balance in the minimum unit of measurement of the currency
+        :return: the native balance of the selected wallet
+        """
+        balance = await self._w3.eth.get_balance(to_checksum(address))
+        if not raw:
+            balance /= 10 ** 18
+        return balance
+
+    async def get_native_balances(self,
+                                  addresses: List[str],
+                                  raw: bool = True
+                                  ) -> List[Balance]:
+        """
+        Get the native balances of many wallets concurrently
+
+        :param addresses: wallet addresses
+        :param raw: If True, the function returns the balances in the minimum unit of measurement of the currency
+        :return: a balance for every wallet, a failed request is reported in the error field of its entry
+        """
+        results = await gather_limited(
+            (self.get_native_balance(address, raw) for address in addresses), self.concurrency, return_exceptions=True
+        )
+        return [
+            Balance(address, None, None, str(result)) if isinstance(result, Exception)
+            else Balance(address, None, result)
+            for address, result in zip(addresses, results)
+        ]
+
+    async def send_erc20_token(self,
+                               private_key: str,
+                               from_address: str,
+                               to_address: str,
+                               amount: int,
+                               contract_address: str) -> str:
+        """
+        Using the transfer, sends the ERC20 token to another address
+
+        :param private_key: private key from the wallet
+        :param from_address: sender's wallet address
+        :param to_address: recipient's wallet address
+        :param amount: the amount of currency being transferred
+        :param contract_address: token contract address implementing the ERC20 interface
+        :return: address transaction
+        """
+        erc20 = await self._get_erc20(contract_address)
+        send = await self._send_with_nonce(
+            from_address,
+            lambda nonce: erc20.transfer(private_key, from_address, to_address, amount, nonce)
+        )
+        return send
+
+    async def send_native_token(self,
+                                private_key: str,
+                                from_address: str,
+                                to_address: str,
+                                amount: int) -> str:
+        """
+        Using the transfer, sends the native currency to another address
+
+        :param private_key: private key from the wallet
+        :param from_address: sender's wallet address
+        :param to_address: recipient's wallet address
+        :param amount: the amount of currency being transferred
+        :return: address transaction
+        """
+        valid_from_address = to_checksum(from_address)
+
+        async def send(nonce: Optional[int]) -> str:
+            if nonce is None:
+                nonce = await self._w3.eth.get_transaction_count(valid_from_address, 'pending')
+
+            transaction_info = {
+                **await self._fee_oracle.transaction_fields(),
+                'from': valid_from_address,
+                'to': to_checksum(to_address),
+                'value': amount,
+                'nonce': nonce,
+                'gas': NATIVE_TRANSFER_GAS,
+            }
+
+            signed_transaction = self._w3.eth.account.sign_transaction(transaction_info, private_key)
+            return AsyncWeb3.to_hex(await self._w3.eth.send_raw_transaction(raw_transaction(signed_transaction)))
+
+        return await self._send_with_nonce(valid_from_address, send)
+
+    async def call_many(self, calls: List[Tuple[str, list]]) -> List[Any]:
+        """
+        Send raw JSON-RPC reads in one batch request
+
+        :param calls: pairs of the JSON-RPC method and its params
+        :return: the result of every call in the order of the calls, a failed call is returned as a BadRequestError
+            for errors reported by the node, or a ConnectionError if the request could not be sent
+        """
+        if not calls:
+            return []
+
+        try:
+            responses = await self._w3.provider.make_batch_request(calls)
+        except Exception as error:
+            return [ConnectionError(str(error))] * len(calls)
+
+        if not isinstance(responses, list):
+            # The node rejected the whole batch
+            error = (responses or {}).get('error') or {}
+            return [BadRequestError(error.get('message', 'Unknown error'))] * len(calls)
+
+        results = []
+        for response in responses:
+            if response.get('error'):
+                results.append(BadRequestError(response['error'].get('message', 'Unknown error')))
+            else:
+                results.append(response.get('result'))
+        return results
+
+    async def _get_erc20(self, contract_address: str) -> AsyncERC20:
+        chain_id = await self._get_chain_id()
+        return self._token_cache.get_contract(
+            chain_id,
+            contract_address,
+            lambda: AsyncERC20(self._w3, contract_address, self._token_cache, chain_id, self._fee_oracle),
+            self,
+        )
+
+    async def _get_chain_id(self) -> int:
+        if self._chain_id is None:
+            self._chain_id = await self._fee_oracle.get_chain_id()
+        return self._chain_id
+
+    async def _send_with_nonce(self, from_address: str, send: Callable[[Optional[int]], Awaitable[str]]) -> str:
+        if self._nonce_manager is None:
+            return await send(None)
+
+        chain_id = await self._get_chain_id()
+        valid_address = to_checksum(from_address)
+
+        async def fetch() -> int:
+            return await self._w3.eth.get_transaction_count(valid_address, 'pending')
+
+        for attempt in range(2):
+            nonce = await self._nonce_manager.allocate_async(chain_id, valid_address, fetch)
+            try:
+                return await send(nonce)
+            except Exception as error:
+                if not NonceManager.is_nonce_error(error):
+                    self._nonce_manager.on_failure(chain_id, valid_address, nonce, error)
+                    raise
+
+                # The local state is behind the chain, read the nonce again and retry once
+                self._nonce_manager.resync(chain_id, valid_address)
+                if attempt:
+                    raise
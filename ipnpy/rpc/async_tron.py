@@ -0,0 +1,207 @@
+from decimal import Decimal
+from typing import Dict, List, Union
+
+from tronpy import AsyncTron
+from tronpy.keys import PrivateKey
+from tronpy.providers.async_http import AsyncHTTPProvider
+
+from ipnpy.contracts.tron.async_token import AsyncTRC20
+from ipnpy.exceptions import ConnectionError
+from ipnpy.rpc.enums import RpcUrl
+from ipnpy.rpc.utils import gather_limited
+from ipnpy.schemes.rpc import Balance
+
+
+class AsyncTronJsonRPC:
+    def __init__(self,
+                 rpc_url: Union[RpcUrl, str],
+                 concurrency: int = 32,
+                 fetch_contracts: bool = False) -> None:
+        """
+        A class for interacting with tron networks using asyncio. The connection is checked when entering the async
+        context manager:
+
+            async with AsyncTronJsonRPC(RpcUrl.TRON) as provider:
+                balance = await provider.get_native_balance(address)
+
+        :param rpc_url: the address to connect to the RPC.
+        :param concurrency: the maximum number of concurrent requests of the bulk methods
+        :param fetch_contracts: if True, TRC20 contracts are requested from the network, otherwise they are built from
+            the bundled TRC20 ABI. Contracts and their decimals are cached by the client either way.
+        """
+        self.concurrency = concurrency
+        self._client = AsyncTron(AsyncHTTPProvider(endpoint_uri=str(rpc_url)))
+        self._fetch_contracts = fetch_contracts
+        self._contracts: Dict[str, AsyncTRC20] = {}
+
+    async def __aenter__(self) -> 'AsyncTronJsonRPC':
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    async def connect(self) -> None:
+        """
+        Сhecks the connection to the RPC
+
+        :raises ConnectionError: if the RPC is not available
+        """
+        if not await self.is_connected():
+            await self.close()
+            raise ConnectionError('Error connecting')
+
+    async def close(self) -> None:
+        """
+        Close the HTTP session of the provider
+        """
+        await self._client.close()
+
+    async def is_connected(self) -> bool:
+        """
+        Сhecks the connection to the RPC
+        :return: True if enabled
+        """
+        try:
+            await self._client.get_latest_block()
+            return True
+        except Exception:
+            return False
+
+    async def get_trc20_balance(self,
+                                address: str,
+                                contract_address: str,
+                                raw: bool = True) -> Union[int, float]:
+        """
+        Get the balance of the TRC20 token in the tron network.
+
+        :param address: wallet address
+        :param contract_address: token contract address implementing the TRC20 interface
+        :param raw: if True, the function returns the balance in the minimum unit of measurement of the currency
+        :return: float: the balance of the selected wallet
+        """
+        trc20 = self._get_trc20(contract_address)
+        balance = await trc20.balance_of(address)
+
+        if not raw:
+            decimals = await trc20.get_decimals()
+            balance /= 10 ** decimals
+
+        return balance
+
+    async def get_trc20_balances(self,
+                                 addresses: List[str],
+                                 contract_addresses: List[str],
+                                 raw: bool = True) -> List[Balance]:
+        """
+        Get the balances of several TRC20 tokens for many wallets concurrently
+
+        :param addresses: wallet addresses
+        :param contract_addresses: token contract addresses implementing the TRC20 interface
+        :param raw: if True, the function returns the balances in the minimum unit of measurement of the currency
+        :return: a balance for every pair of contract and wallet, grouped by contract
+        """
+        tokens = [self._get_trc20(contract_address) for contract_address in contract_addresses]
+        pairs = [(token, address) for token in tokens for address in addresses]
+
+        results = await gather_limited(
+            (token.balance_of(address) for token, address in pairs), self.concurrency, return_exceptions=True
+        )
+
+        decimals = {}
+        if not raw:
+            token_decimals = await gather_limited(
+                (token.get_decimals() for token in tokens), self.concurrency, return_exceptions=True
+            )
+            decimals = dict(zip((token.contract_address for token in tokens), token_decimals))
+
+        balances = []
+        for (token, address), balance in zip(pairs, results):
+            contract = token.contract_address
+            if isinstance(balance, Exception):
+                balances.append(Balance(address, contract, None, str(balance)))
+            elif raw:
+                balances.append(Balance(address, contract, balance))
+            elif isinstance(decimals[contract], Exception):
+                balances.append(Balance(address, contract, None, str(decimals[contract])))
+            else:
+                balances.append(Balance(address, contract, balance / 10 ** decimals[contract]))
+        return balances
+
+    async def get_native_balance(self, address: str, raw: bool = True) -> Decimal:
+        """
+        Get the native balance in tron network
+
+        :param address: Wallet address
+        :param raw: If True, the function returns the balance in the minimum unit of measurement of the currency
+        :return: the native balance of the selected wallet
+        """
+        balance = await self._client.get_account_balance(address)
+        if raw:
+            balance = int(balance * 10 ** 6)
+        return balance
+
+    async def get_native_balances(self, addresses: List[str], raw: bool = True) -> List[Balance]:
+        """
+        Get the native balances of many wallets concurrently
+
+        :param addresses: wallet addresses
+        :param raw: If True, the function returns the balances in the minimum unit of measurement of the currency
+        :return: a balance for every wallet, a failed request is reported in the error field of its entry
+        """
+        results = await gather_limited(
+            (self.get_native_balance(address, raw) for address in addresses), self.concurrency, return_exceptions=True
+        )
+        return [
+            Balance(address, None, None, str(result)) if isinstance(result, Exception)
+            else Balance(address, None, result)
+            for address, result in zip(addresses, results)
+        ]
+
+    async def send_trc20_token(self,
+                               private_key: str,
+                               from_address: str,
+                               to_address: str,
+                               amount: int,
+                               contract_address: str) -> str:
+        """
+        Using the transfer, sends the TRC20 token to another address
+
+        :param private_key: private key from the wallet
+        :param from_address: sender's wallet address
+        :param to_address: recipient's wallet address
+        :param amount: the amount of currency being transferred
+        :param contract_address: token contract address implementing the TRC20 interface
+        :return: address transaction
+        """
+        trc20 = self._get_trc20(contract_address)
+        send = await trc20.transfer(private_key, from_address, to_address, amount)
+        return send
+
+    async def send_native_token(self,
+                                private_key: str,
+                                from_address: str,
+                                to_address: str,
+                                amount: int
+                                ) -> str:
+        """
+        Using the transfer, sends the native currency to another address
+
+        :param private_key: private key from the wallet
+        :param from_address: sender's wallet address
+        :param to_address: recipient's wallet address
+        :param amount: the amount of currency being transferred
+        :return: address transaction
+        """
+        transaction = await self._client.trx.transfer(from_address, to_address, amount).build()
+        transaction.sign(PrivateKey(bytes.fromhex(private_key.replace('0x', ''))))
+
+        send = await transaction.broadcast()
+        return send['txid']
+
+    def _get_trc20(self, contract_address: str) -> AsyncTRC20:
+        trc20 = self._contracts.get(contract_address)
+        if trc20 is None:
+            trc20 = AsyncTRC20(self._client, contract_address, self._fetch_contracts)
+            self._contracts[contract_address] = trc20
+        return trc20
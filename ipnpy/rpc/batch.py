@@ -0,0 +1,155 @@
+import json
+from typing import Any, List, Optional, Tuple, Union
+
+import requests
+
+from ipnpy.exceptions import BadRequestError, ConnectionError
+from ipnpy.instrumentation.hooks import observe
+from ipnpy.rpc.pool import EndpointPool, EndpointUnavailable, evm_probe
+
+# Batches accepted at the lowered size limit before a twice larger batch is tried again
+GROW_AFTER = 20
+# Messages of providers rejecting a batch because of its size
+BATCH_SIZE_ERRORS = ('batch', 'too large')
+
+
+class JsonRpcBatch:
+    def __init__(self,
+                 endpoints: Union[str, EndpointPool],
+                 max_batch_size: int = 100,
+                 timeout: float = 30,
+                 session: Optional[requests.Session] = None) -> None:
+        """
+        A class for sending many JSON-RPC reads as array requests. If the provider rejects a batch, it is split in half
+        and retried until single requests are left. A batch rejected for its size lowers the batch size of the later
+        batches, which grows back after GROW_AFTER accepted batches.
+
+        :param endpoints: the address of the JSON-RPC endpoint or a pool of endpoints of the network
+        :param max_batch_size: the maximum number of requests in one HTTP POST
+        :param timeout: timeout of one HTTP POST in seconds
+        :param session: HTTP session to reuse connections, a new one is created by default
+        """
+        if not isinstance(endpoints, EndpointPool):
+            endpoints = EndpointPool([endpoints], evm_probe(timeout))
+        self.pool = endpoints
+        self.max_batch_size = max_batch_size
+        self.timeout = timeout
+        self._session = session or requests.Session()
+        # The largest batch size the provider accepted after a rejection, so later batches skip the split
+        self._batch_limit = max_batch_size
+        self._accepted = 0
+
+    def execute(self, calls: List[Tuple[str, list]], write: bool = False) -> List[Any]:
+        """
+        Send the calls in batches of at most max_batch_size requests
+
+        :param calls: pairs of the JSON-RPC method and its params
+        :param write: if True, the batches go to the sticky write endpoint of the pool, use it for the nonce reads of
+            transactions being sent
+        :return: the result of every call in the order of the calls. A failed call is returned as a BadRequestError
+            for errors reported by the node, or a ConnectionError if the request could not be sent
+        """
+        results = []
+        start = 0
+        while start < len(calls):
+            size = min(self.max_batch_size, self._batch_limit)
+            results.extend(self._send(calls[start:start + size], write))
+            start += size
+        return results
+
+    def _send(self, calls: List[Tuple[str, list]], write: bool) -> List[Any]:
+        payload = [
+            {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}
+            for request_id, (method, params) in enumerate(calls)
+        ]
+
+        try:
+            responses, too_large = self.pool.request(lambda url: self._post(url, payload), write)
+        except ConnectionError as error:
+            return [ConnectionError(str(error)) for _ in calls]
+
+        if responses is None:
+            if len(calls) == 1:
+                return [ConnectionError(f'Request {calls[0][0]} was rejected by the provider')]
+
+            # Other rejections may come from a single bad call, which the split isolates
+            middle = len(calls) // 2
+            if too_large:
+                self._batch_limit = min(self._batch_limit, middle)
+                self._accepted = 0
+            return self._send(calls[:middle], write) + self._send(calls[middle:], write)
+
+        if self._batch_limit < self.max_batch_size and len(calls) >= self._batch_limit:
+            self._accepted += 1
+            if self._accepted >= GROW_AFTER:
+                self._batch_limit = min(self.max_batch_size, self._batch_limit * 2)
+                self._accepted = 0
+
+        results: List[Any] = [ConnectionError('No response from the provider') for _ in calls]
+        for response in responses:
+            if not isinstance(response, dict):
+                continue
+            request_id = response.get('id')
+            if not isinstance(request_id, int) or not 0 <= request_id < len(calls):
+                continue
+            if 'error' in response:
+                results[request_id] = BadRequestError(response['error'].get('message', 'Unknown error'))
+            else:
+                results[request_id] = response.get('result')
+        return results
+
+    def _post(self, url: str, payload: List[dict]) -> Tuple[Optional[List[dict]], bool]:
+        """
+        :return: the responses, or None if the batch was rejected, and whether it was rejected because of its size
+        """
+        def exchange() -> Tuple[requests.Response, Any]:
+            response = self._session.post(url, json=payload, timeout=self.timeout)
+            # Let the pool fail over to another endpoint, other errors mean the batch itself was rejected
+            if response.status_code == 429 or response.status_code >= 500:
+                response.raise_for_status()
+
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+            if EndpointPool.is_rate_limit_response(body) and not self._is_batch_error(body):
+                raise EndpointUnavailable(body['error'].get('message'))
+            return response, body
+
+        response, responses = observe(
+            'evm', payload[0]['method'] if len(payload) == 1 else 'batch', url,
+            exchange,
+            lambda: len(json.dumps(payload)),
+            lambda result: len(result[0].content),
+            lambda result: self._response_error(*result),
+        )
+        # Providers that limit the batch size answer with 413, a single error object or an array of batch errors
+        if response.status_code == 413:
+            return None, True
+        if not response.ok or not isinstance(responses, list):
+            return None, self._is_batch_error(responses)
+        if len(responses) != len(payload):
+            return None, False
+        if len(payload) > 1 and all(self._is_batch_error(item) for item in responses):
+            return None, True
+        return responses, False
+
+    @staticmethod
+    def _response_error(response: requests.Response, body: Any) -> Optional[Exception]:
+        if not response.ok:
+            return BadRequestError(f'HTTP {response.status_code}')
+        if body is None:
+            return BadRequestError('The response is not JSON')
+
+        errors = [item['error'] for item in (body if isinstance(body, list) else [body])
+                  if isinstance(item, dict) and isinstance(item.get('error'), dict)]
+        if errors:
+            return BadRequestError(errors[0].get('message', 'Unknown error'))
+        return None
+
+    @staticmethod
+    def _is_batch_error(response: Any) -> bool:
+        if not isinstance(response, dict) or 'error' not in response:
+            return False
+        message = str(response['error'].get('message', '')).lower()
+        return any(text in message for text in BATCH_SIZE_ERRORS)
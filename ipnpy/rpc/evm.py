@@ -1,25 +1,143 @@
-from typing import Union
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 from web3 import Web3
+from web3.providers import HTTPProvider
 
+from ipnpy.contracts.eth.cache import ContractCache
+from ipnpy.contracts.eth.multicall import MULTICALL3_ADDRESS, Multicall3
 from ipnpy.contracts.eth.token import ERC20
-from ipnpy.exceptions import ConnectionError
+from ipnpy.contracts.eth.utils import raw_transaction
+from ipnpy.exceptions import BadRequestError, ConnectionError
+from ipnpy.instrumentation.hooks import observe
+from ipnpy.rpc.batch import JsonRpcBatch
 from ipnpy.rpc.enums import RpcUrl
+from ipnpy.rpc.fees import NATIVE_TRANSFER_GAS, FeeOracle
+from ipnpy.rpc.nonce import NonceManager
+from ipnpy.rpc.pool import EndpointPool, EndpointUnavailable, evm_probe
+from ipnpy.schemes.rpc import Balance, SignedTransfer, Transfer, TransferResult
+from ipnpy.utils.address import to_checksum, to_checksum_many
+
+
+class PooledHTTPProvider(HTTPProvider):
+    # Nonce reads and broadcasts of one sender go to the same node
+    WRITE_METHODS = ('eth_sendRawTransaction', 'eth_sendTransaction', 'eth_getTransactionCount')
+    # Responses that never change for a network. The validation middleware of web3 reads the chain id before every
+    # eth_call and transaction, so it is read once.
+    CACHED_METHODS = ('eth_chainId', 'net_version')
+
+    def __init__(self, pool: EndpointPool, timeout: float = 10) -> None:
+        """
+        A web3 HTTP provider sending every request through a pool of endpoints
+
+        :param pool: endpoints of the network
+        :param timeout: timeout of one HTTP request in seconds
+        """
+        super().__init__(pool.endpoints[0].url, request_kwargs={'timeout': timeout})
+        self.pool = pool
+        self.timeout = timeout
+        self._providers: Dict[str, HTTPProvider] = {}
+        self._cached_responses: Dict[str, Any] = {}
+
+    def make_request(self, method: str, params: Any) -> Any:
+        cached = self._cached_responses.get(method)
+        if cached is not None:
+            return dict(cached)
+
+        def call(url: str) -> Any:
+            response = self._get_provider(url).make_request(method, params)
+            if EndpointPool.is_rate_limit_response(response):
+                raise EndpointUnavailable(response['error'].get('message'))
+            return response
+
+        def send(url: str) -> Any:
+            return observe(
+                'evm', method, url,
+                lambda: call(url),
+                lambda: len(self._get_provider(url).encode_rpc_request(method, params)),
+                lambda result: len(json.dumps(result, default=str)),
+                self._response_error,
+            )
+
+        response = self.pool.request(send, method in self.WRITE_METHODS)
+        if method in self.CACHED_METHODS and isinstance(response, dict) and 'result' in response:
+            self._cached_responses[method] = response
+        return response
+
+    @staticmethod
+    def _response_error(response: Any) -> Optional[Exception]:
+        """
+        :param response: decoded JSON-RPC response
+        :return: the error reported by the node, or None
+        """
+        if isinstance(response, dict) and isinstance(response.get('error'), dict):
+            return BadRequestError(response['error'].get('message', 'Unknown error'))
+        return None
+
+    def _get_provider(self, url: str) -> HTTPProvider:
+        provider = self._providers.get(url)
+        if provider is None:
+            try:
+                # Failover is handled by the pool, the retries of web3 would only delay it
+                provider = HTTPProvider(url, {'timeout': self.timeout}, exception_retry_configuration=None)
+            except TypeError:
+                provider = HTTPProvider(url, {'timeout': self.timeout})
+            provider = self._providers.setdefault(url, provider)
+        return provider
 
 
 class EvmJsonRPC:
-    def __init__(self, rpc_url: Union[RpcUrl, str]) -> None:
+    def __init__(self,
+                 rpc_url: Union[RpcUrl, str, Sequence[Union[RpcUrl, str]]],
+                 max_batch_size: int = 100,
+                 nonce_manager: Optional[NonceManager] = None,
+                 token_cache: Optional[ContractCache] = None,
+                 timeout: float = 10,
+                 check_interval: float = 30,
+                 fee_oracle: Optional[FeeOracle] = None) -> None:
         """
         A class for interacting with EVM networks. You can use the RPC_URL class to connect, or take the address for
         example https://chainlist.org
 
-        :param rpc_url: the address to connect to the RPC.
+        The client does not use the network until the first request. With several addresses, reads go to the fastest
+        healthy endpoint and fail over to the others, transactions stick to one endpoint.
+
+        :param rpc_url: the address to connect to the RPC, or a list of addresses of the same network.
+        :param max_batch_size: the maximum number of requests in one JSON-RPC batch of the bulk methods
+        :param nonce_manager: if set, nonces of sent transactions are allocated locally instead of being fetched
+            before every transaction. Share one manager between the clients sending from the same wallets.
+        :param token_cache: cache of ERC20 contracts and token metadata, a new cache is created for the client by
+            default. Clients of the same network sharing one cache share the token metadata.
+        :param timeout: timeout of one HTTP request in seconds
+        :param check_interval: seconds between background health checks of the endpoints
+        :param fee_oracle: cache of the chain id, fees and token gas estimates used by sends, a new oracle is created
+            for the client by default
         """
-        web3 = Web3(Web3.HTTPProvider(rpc_url))
-        if web3.is_connected():
-            self._w3 = web3
-        else:
-            raise ConnectionError('Error connecting')
+        urls = [rpc_url] if isinstance(rpc_url, (RpcUrl, str)) else list(rpc_url)
+        self._pool = EndpointPool(urls, evm_probe(timeout), check_interval)
+        self._w3 = Web3(PooledHTTPProvider(self._pool, timeout))
+        self._batch = JsonRpcBatch(self._pool, max_batch_size, timeout)
+        self._nonce_manager = nonce_manager
+        self._chain_id: Optional[int] = None
+        self._token_cache = token_cache or ContractCache()
+        self._fee_oracle = fee_oracle or FeeOracle(self._batch.execute)
+
+    def is_connected(self) -> bool:
+        """
+        Сhecks the connection to the RPC
+        :return: True if any endpoint responds
+        """
+        try:
+            return self._w3.is_connected()
+        except ConnectionError:
+            return False
+
+    def close(self) -> None:
+        """
+        Stop the background health checks of the endpoints
+        """
+        self._pool.close()
 
     def get_erc20_balance(self,
                           address: str,
@@ -34,7 +152,7 @@ class EvmJsonRPC:
         :param raw: if True, the function returns the balance in the minimum unit of measurement of the currency
         :return: float: the balance of the selected wallet
         """
-        erc20 = ERC20(self._w3, contract_address)
+        erc20 = self._get_erc20(contract_address)
         balance = erc20.balance_of(address)
 
         if not raw:
@@ -43,6 +161,63 @@ class EvmJsonRPC:
 
         return balance
 
+    def get_erc20_balances(self,
+                           addresses: List[str],
+                           contract_addresses: List[str],
+                           raw: bool = True,
+                           multicall_address: str = MULTICALL3_ADDRESS,
+                           max_calldata_size: int = 64_000
+                           ) -> List[Balance]:
+        """
+        Get the balances of several ERC20 tokens for many wallets at once. The balanceOf and decimals calls are packed
+        into Multicall3 aggregate3 eth_calls, a failed call is reported in the error field of its entry.
+
+        :param addresses: wallet addresses
+        :param contract_addresses: token contract addresses implementing the ERC20 interface
+        :param raw: if True, the function returns the balances in the minimum unit of measurement of the currency
+        :param multicall_address: Multicall3 contract address
+        :param max_calldata_size: the maximum size in bytes of the calldata of one eth_call
+        :return: a balance for every pair of contract and wallet, grouped by contract
+        """
+        multicall = Multicall3(self._w3, multicall_address, max_calldata_size)
+        valid_addresses = to_checksum_many(addresses)
+        valid_contracts = to_checksum_many(contract_addresses)
+
+        decimals: Dict[str, Optional[int]] = {}
+        if not raw:
+            chain_id = self._get_chain_id()
+            for contract in valid_contracts:
+                decimals[contract] = self._token_cache.peek_metadata(chain_id, contract, 'decimals')
+        missing_decimals = [contract for contract, value in decimals.items() if value is None]
+
+        calls = [(contract, ERC20.encode_decimals()) for contract in missing_decimals]
+        for contract in valid_contracts:
+            calls.extend((contract, ERC20.encode_balance_of(address)) for address in valid_addresses)
+
+        results = iter(multicall.aggregate3(calls))
+
+        for contract in missing_decimals:
+            success, data = next(results)
+            decimals[contract] = self._decode_result(success, data)
+            if decimals[contract] is not None:
+                self._token_cache.set_metadata(chain_id, contract, 'decimals', decimals[contract])
+
+        balances = []
+        for contract in valid_contracts:
+            for address in valid_addresses:
+                success, data = next(results)
+                balance = self._decode_result(success, data)
+                if balance is None:
+                    balances.append(Balance(address, contract, None, 'balanceOf call failed'))
+                elif raw:
+                    balances.append(Balance(address, contract, balance))
+                elif decimals[contract] is None:
+                    balances.append(Balance(address, contract, None, 'decimals call failed'))
+                else:
+                    balances.append(Balance(address, contract, balance / 10 ** decimals[contract]))
+
+        return balances
+
     def get_native_balance(self,
                            address: str,
                            raw: bool = True
@@ -54,11 +229,70 @@ class EvmJsonRPC:
         :param raw: If True, the function returns the balance in the minimum unit of measurement of the currency
         :return: the native balance of the selected wallet
         """
-        balance = self._w3.eth.get_balance(self._w3.to_checksum_address(address))
+        balance = self._w3.eth.get_balance(to_checksum(address))
         if not raw:
             balance /= 10 ** 18
         return balance
 
+    def get_native_balances(self,
+                            addresses: List[str],
+                            raw: bool = True
+                            ) -> List[Balance]:
+        """
+        Get the native balances of many wallets using JSON-RPC batch requests
+
+        :param addresses: wallet addresses
+        :param raw: If True, the function returns the balances in the minimum unit of measurement of the currency
+        :return: a balance for every wallet, a failed request is reported in the error field of its entry
+        """
+        valid_addresses = to_checksum_many(addresses)
+        results = self._batch.execute([('eth_getBalance', [address, 'latest']) for address in valid_addresses])
+
+        balances = []
+        for address, result in zip(valid_addresses, results):
+            if isinstance(result, Exception):
+                balances.append(Balance(address, None, None, str(result)))
+                continue
+
+            balance = int(result, 16)
+            if not raw:
+                balance /= 10 ** 18
+            balances.append(Balance(address, None, balance))
+        return balances
+
+    def get_transaction_counts(self,
+                               addresses: List[str],
+                               block_identifier: str = 'pending'
+                               ) -> Dict[str, int]:
+        """
+        Get the nonces of many wallets using JSON-RPC batch requests
+
+        :param addresses: wallet addresses
+        :param block_identifier: the block to read the nonce at
+        :return: the nonce of every wallet by its checksum address
+        """
+        valid_addresses = to_checksum_many(addresses)
+        results = self._batch.execute(
+            [('eth_getTransactionCount', [address, block_identifier]) for address in valid_addresses]
+        )
+        return {address: self._unwrap(result) for address, result in zip(valid_addresses, results)}
+
+    def get_block_number(self) -> int:
+        """
+        :return: the number of the latest block
+        """
+        return self._unwrap(self._batch.execute([('eth_blockNumber', [])])[0])
+
+    def call_many(self, calls: List[Tuple[str, list]]) -> List[Any]:
+        """
+        Send raw JSON-RPC reads using batch requests
+
+        :param calls: pairs of the JSON-RPC method and its params
+        :return: the result of every call in the order of the calls, a failed call is returned as a BadRequestError
+            for errors reported by the node, or a ConnectionError if the request could not be sent
+        """
+        return self._batch.execute(calls)
+
     def send_erc20_token(self,
                          private_key: str,
                          from_address: str,
@@ -75,8 +309,11 @@ class EvmJsonRPC:
         :param contract_address: token contract address implementing the ERC20 interface
         :return: address transaction
         """
-        erc20 = ERC20(self._w3, contract_address)
-        send = erc20.transfer(private_key, from_address, to_address, amount)
+        erc20 = self._get_erc20(contract_address)
+        send = self._send_with_nonce(
+            from_address,
+            lambda nonce: erc20.transfer(private_key, from_address, to_address, amount, nonce)
+        )
         return send
 
     def send_native_token(self,
@@ -93,19 +330,207 @@ class EvmJsonRPC:
         :param amount: the amount of currency being transferred
         :return: address transaction
         """
-        valid_from_address = self._w3.to_checksum_address(from_address)
-        nonce = self._w3.eth.get_transaction_count(valid_from_address, 'pending')
-
-        transaction_info = {
-            'chainId': self._w3.eth.chain_id,
-            'from': valid_from_address,
-            'to': self._w3.to_checksum_address(to_address),
-            'value': amount,
-            'nonce': nonce,
-            'gasPrice': self._w3.eth.gas_price,
-            'gas': 21000,
-        }
-
-        signed_transaction = self._w3.eth.account.sign_transaction(transaction_info, private_key)
-        send = self._w3.eth.send_raw_transaction(signed_transaction.rawTransaction)
-        return send.hex()
+        valid_from_address = to_checksum(from_address)
+
+        def send(nonce: Optional[int]) -> str:
+            if nonce is None:
+                nonce = self._unwrap(
+                    self._batch.execute([('eth_getTransactionCount', [valid_from_address, 'pending'])], write=True)[0]
+                )
+
+            transaction_info = {
+                **self._fee_oracle.transaction_fields(),
+                'from': valid_from_address,
+                'to': to_checksum(to_address),
+                'value': amount,
+                'nonce': nonce,
+                'gas': NATIVE_TRANSFER_GAS,
+            }
+
+            signed_transaction = self._w3.eth.account.sign_transaction(transaction_info, private_key)
+            return Web3.to_hex(self._w3.eth.send_raw_transaction(raw_transaction(signed_transaction)))
+
+        return self._send_with_nonce(valid_from_address, send)
+
+    def send_many(self, transfers: List[Transfer], max_workers: int = 8) -> Iterator[TransferResult]:
+        """
+        Send many native and ERC20 transfers. The fees and nonces are fetched once for the whole batch, all
+        transactions are signed ahead, then broadcast concurrently for different senders. A failed transfer does not
+        stop the transfers of other senders.
+
+        The transfers of one sender are broadcast one by one in nonce order. After a failed broadcast the later
+        transfers of the sender are not sent and are reported as failed, since they would wait behind the missing
+        nonce forever.
+
+        :param transfers: transfers to send, a transfer with a contract_address sends the ERC20 token
+        :param max_workers: the maximum number of senders broadcasting at the same time
+        :return: an iterator over the results of the transfers, the transfers of a sender are reported together once
+            they were all broadcast
+        """
+        by_sender: Dict[str, List[SignedTransfer]] = {}
+        for signed_transfer in self.sign_many(transfers):
+            if signed_transfer.error is not None:
+                yield TransferResult(signed_transfer.transfer, None, signed_transfer.error)
+            else:
+                by_sender.setdefault(signed_transfer.sender, []).append(signed_transfer)
+        if not by_sender:
+            return
+
+        chain_id = self._get_chain_id()
+        with ThreadPoolExecutor(max_workers) as executor:
+            futures = [
+                executor.submit(self._broadcast_in_order, chain_id, signed_transfers)
+                for signed_transfers in by_sender.values()
+            ]
+            for future in as_completed(futures):
+                yield from future.result()
+
+    def _broadcast_in_order(self, chain_id: int, signed_transfers: List[SignedTransfer]) -> List[TransferResult]:
+        results = []
+        for index, signed_transfer in enumerate(signed_transfers):
+            try:
+                txid = Web3.to_hex(self._w3.eth.send_raw_transaction(signed_transfer.raw_transaction))
+            except Exception as error:
+                results.append(TransferResult(signed_transfer.transfer, None, str(error)))
+                skipped = signed_transfers[index + 1:]
+                results.extend(
+                    TransferResult(
+                        transfer.transfer, None,
+                        f'Not sent, the transfer with nonce {signed_transfer.nonce} of the sender failed'
+                    )
+                    for transfer in skipped
+                )
+                if self._nonce_manager:
+                    self._nonce_manager.on_failure(chain_id, signed_transfer.sender, signed_transfer.nonce, error)
+                    for transfer in reversed(skipped):
+                        self._nonce_manager.release(chain_id, transfer.sender, transfer.nonce)
+                break
+            results.append(TransferResult(signed_transfer.transfer, txid))
+        return results
+
+    def sign_many(self, transfers: List[Transfer]) -> List[SignedTransfer]:
+        """
+        Sign many native and ERC20 transfers without broadcasting them, for example to store them in a
+        TransactionOutbox. The fees and nonces are fetched once for the whole batch, the transfers of one sender get
+        consecutive nonces. Without a nonce manager the nonces start at the pending transaction count, so transfers
+        signed by an earlier call must be broadcast first, set a NonceManager to sign further ahead.
+
+        :param transfers: transfers to sign, a transfer with a contract_address transfers the ERC20 token
+        :return: the signed transfer of every transfer in the order of the transfers, a failed transfer has the error
+            field set
+        """
+        senders = list(dict.fromkeys(to_checksum(transfer.from_address) for transfer in transfers))
+
+        fee_fields = self._fee_oracle.transaction_fields()
+        chain_id = fee_fields['chainId']
+        next_nonces = {}
+        if self._nonce_manager is None:
+            calls = [('eth_getTransactionCount', [sender, 'pending']) for sender in senders]
+            nonces = [self._unwrap(result) for result in self._batch.execute(calls, write=True)]
+            next_nonces = dict(zip(senders, nonces))
+
+        signed = []
+        for transfer in transfers:
+            sender = to_checksum(transfer.from_address)
+            nonce = self._allocate_nonce(sender) if self._nonce_manager else next_nonces[sender]
+            try:
+                raw = self._sign_transfer(transfer, sender, nonce, fee_fields)
+            except Exception as error:
+                if self._nonce_manager:
+                    self._nonce_manager.release(chain_id, sender, nonce)
+                signed.append(SignedTransfer(transfer, None, None, sender, error=str(error)))
+                continue
+
+            if self._nonce_manager is None:
+                next_nonces[sender] += 1
+            txid = Web3.to_hex(Web3.keccak(raw))
+            signed.append(SignedTransfer(transfer, txid, Web3.to_hex(raw), sender, nonce))
+        return signed
+
+    def broadcast_many(self, raw_transactions: List[str]) -> List[Union[str, Exception]]:
+        """
+        Broadcast signed transactions in JSON-RPC batches to the sticky write endpoint
+
+        :param raw_transactions: signed raw transactions in hex
+        :return: the transaction hash of every transaction in the order of the transactions, a rejected transaction
+            is returned as a BadRequestError, a transaction that could not be sent as a ConnectionError
+        """
+        return self._batch.execute(
+            [('eth_sendRawTransaction', [raw_transaction]) for raw_transaction in raw_transactions],
+            write=True,
+        )
+
+    def _sign_transfer(self, transfer: Transfer, sender: str, nonce: int, fee_fields: Dict[str, Any]) -> bytes:
+        transaction_info = {**fee_fields, 'from': sender, 'nonce': nonce}
+
+        to_address = to_checksum(transfer.to_address)
+        if transfer.contract_address is None:
+            transaction_info.update({'to': to_address, 'value': transfer.amount, 'gas': NATIVE_TRANSFER_GAS})
+        else:
+            contract_address = to_checksum(transfer.contract_address)
+            transaction_info.update({
+                'to': contract_address,
+                'value': 0,
+                'data': Web3.to_hex(ERC20.encode_transfer(to_address, transfer.amount)),
+                'gas': self._fee_oracle.get_token_transfer_gas(contract_address, sender, transfer.amount),
+            })
+
+        signed_transaction = observe(
+            'evm', 'sign', None,
+            lambda: self._w3.eth.account.sign_transaction(transaction_info, transfer.private_key)
+        )
+        return raw_transaction(signed_transaction)
+
+    def _get_erc20(self, contract_address: str) -> ERC20:
+        chain_id = self._get_chain_id()
+        return self._token_cache.get_contract(
+            chain_id,
+            contract_address,
+            lambda: ERC20(self._w3, contract_address, self._token_cache, chain_id, self._fee_oracle),
+            self,
+        )
+
+    def _get_chain_id(self) -> int:
+        if self._chain_id is None:
+            self._chain_id = self._fee_oracle.get_chain_id()
+        return self._chain_id
+
+    def _allocate_nonce(self, address: str) -> int:
+        return self._nonce_manager.allocate(
+            self._get_chain_id(),
+            address,
+            lambda: self._w3.eth.get_transaction_count(address, 'pending')
+        )
+
+    def _send_with_nonce(self, from_address: str, send: Callable[[Optional[int]], str]) -> str:
+        if self._nonce_manager is None:
+            return send(None)
+
+        chain_id = self._get_chain_id()
+        valid_address = to_checksum(from_address)
+
+        for attempt in range(2):
+            nonce = self._allocate_nonce(valid_address)
+            try:
+                return send(nonce)
+            except Exception as error:
+                if not NonceManager.is_nonce_error(error):
+                    self._nonce_manager.on_failure(chain_id, valid_address, nonce, error)
+                    raise
+
+                # The local state is behind the chain, read the nonce again and retry once
+                self._nonce_manager.resync(chain_id, valid_address)
+                if attempt:
+                    raise
+
+    @staticmethod
+    def _decode_result(success: bool, data: bytes) -> Optional[int]:
+        if not success or len(data) < 32:
+            return None
+        return ERC20.decode_uint(data)
+
+    @staticmethod
+    def _unwrap(result: Union[str, Exception]) -> int:
+        if isinstance(result, Exception):
+            raise result
+        return int(result, 16)
@@ -0,0 +1,261 @@
+import asyncio
+import os
+import statistics
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from ipnpy.contracts.eth.token import ERC20
+from ipnpy.exceptions import BadRequestError
+from ipnpy.schemes.rpc import FeeData
+
+NATIVE_TRANSFER_GAS = 21000
+# Gas limit of a token transfer when the estimate fails
+DEFAULT_TOKEN_TRANSFER_GAS = 100_000
+# Errors of nodes that do not serve a method, other errors of eth_feeHistory are taken as transient
+UNSUPPORTED_METHOD_ERRORS = ('not found', 'does not exist', 'not supported', 'unsupported', 'not implemented')
+
+Calls = Callable[[List[Tuple[str, list]]], List[Any]]
+AsyncCalls = Callable[[List[Tuple[str, list]]], Awaitable[List[Any]]]
+
+
+class _FeeCache:
+    def __init__(self,
+                 call_many: Union[Calls, AsyncCalls],
+                 ttl: float = 3,
+                 block_count: int = 5,
+                 percentile: float = 50,
+                 base_fee_multiplier: float = 2,
+                 gas_margin: float = 1.2,
+                 estimate_ttl: float = 3600) -> None:
+        """
+        Fees of EVM transactions with a short cache, so sends do not read the chain id and the gas price every time.
+        The priority fee is a percentile of the rewards of recent blocks from eth_feeHistory, the max fee leaves room
+        for the base fee to grow. Networks without EIP-1559 fall back to legacy transactions with eth_gasPrice.
+
+        :param call_many: a function sending JSON-RPC calls in one batch, like EvmJsonRPC.call_many, or a coroutine
+            function like AsyncEvmJsonRPC.call_many for AsyncFeeOracle
+        :param ttl: seconds the fees are reused
+        :param block_count: the number of recent blocks the priority fee is taken from
+        :param percentile: the reward percentile of the transactions in every block
+        :param base_fee_multiplier: the max fee is the next base fee times this plus the priority fee
+        :param gas_margin: the gas estimates of token transfers are multiplied by this
+        :param estimate_ttl: seconds a gas estimate of a token transfer is reused
+        """
+        self.ttl = ttl
+        self.block_count = block_count
+        self.percentile = percentile
+        self.base_fee_multiplier = base_fee_multiplier
+        self.gas_margin = gas_margin
+        self.estimate_ttl = estimate_ttl
+        self._call_many = call_many
+        self._lock = threading.Lock()
+        self._chain_id: Optional[int] = None
+        self._fees: Optional[FeeData] = None
+        self._fees_time = 0.0
+        self._eip1559 = True
+        self._estimates: Dict[Tuple[int, str], Tuple[int, float]] = {}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._fees = None
+            self._estimates.clear()
+
+    def _cached_fees(self) -> Optional[FeeData]:
+        with self._lock:
+            if self._fees is not None and time.monotonic() - self._fees_time < self.ttl:
+                return self._fees
+        return None
+
+    def _store_fees(self, fees: FeeData) -> None:
+        with self._lock:
+            self._fees = fees
+            self._fees_time = time.monotonic()
+
+    def _fee_calls(self) -> List[Tuple[str, list]]:
+        calls = [('eth_feeHistory', [hex(self.block_count), 'latest', [self.percentile]])] if self._eip1559 else []
+        if self._chain_id is None:
+            calls.append(('eth_chainId', []))
+        return calls
+
+    def _parse_fees(self, results: List[Any]) -> Optional[FeeData]:
+        """
+        :return: the EIP-1559 fees, or None if they are not available and eth_gasPrice is needed
+        """
+        if self._chain_id is None:
+            self._chain_id = self._unwrap(results.pop())
+        return self._eip1559_fees(results[0]) if self._eip1559 else None
+
+    def _cached_estimate(self, key: Tuple[int, str]) -> Optional[int]:
+        with self._lock:
+            cached = self._estimates.get(key)
+            if cached is not None and time.monotonic() - cached[1] < self.estimate_ttl:
+                return cached[0]
+        return None
+
+    @staticmethod
+    def _estimate_calls(contract_address: str, from_address: str, amount: int) -> List[Tuple[str, list]]:
+        empty_address = '0x' + os.urandom(20).hex()
+        data = '0x' + ERC20.encode_transfer(empty_address, amount).hex()
+        return [('eth_estimateGas', [{'from': from_address, 'to': contract_address, 'data': data}])]
+
+    def _parse_estimate(self, key: Tuple[int, str], result: Any) -> int:
+        if isinstance(result, Exception):
+            # The sender may lack the balance, do not cache the fallback
+            return DEFAULT_TOKEN_TRANSFER_GAS
+
+        gas = int(int(result, 16) * self.gas_margin)
+        with self._lock:
+            self._estimates[key] = (gas, time.monotonic())
+        return gas
+
+    @staticmethod
+    def _transaction_fields(fees: FeeData) -> Dict[str, Any]:
+        if fees.max_fee is None:
+            return {'chainId': fees.chain_id, 'gasPrice': fees.gas_price}
+        return {
+            'chainId': fees.chain_id,
+            'type': 2,
+            'maxFeePerGas': fees.max_fee,
+            'maxPriorityFeePerGas': fees.max_priority_fee,
+        }
+
+    def _eip1559_fees(self, history: Any) -> Optional[FeeData]:
+        if isinstance(history, BadRequestError):
+            if any(text in str(history).lower() for text in UNSUPPORTED_METHOD_ERRORS):
+                # The node does not serve eth_feeHistory, use legacy transactions from now on
+                self._eip1559 = False
+            return None
+        if isinstance(history, Exception) or not history or not history.get('baseFeePerGas'):
+            return None
+
+        # The last entry is the base fee of the next block
+        base_fee = int(history['baseFeePerGas'][-1], 16)
+        rewards = [int(reward[0], 16) for reward in history.get('reward') or [] if reward]
+        priority_fee = int(statistics.median(rewards)) if rewards else 0
+        if not base_fee and not priority_fee:
+            return None
+
+        max_fee = int(base_fee * self.base_fee_multiplier) + priority_fee
+        return FeeData(self._chain_id, base_fee=base_fee, max_priority_fee=priority_fee, max_fee=max_fee)
+
+    @staticmethod
+    def _unwrap(result: Any) -> int:
+        if isinstance(result, Exception):
+            raise result
+        if result is None:
+            raise BadRequestError('Empty response')
+        return int(result, 16)
+
+
+class FeeOracle(_FeeCache):
+    def __init__(self, call_many: Calls, **kwargs: Any) -> None:
+        super().__init__(call_many, **kwargs)
+        # Held while the fees are read, so the senders waiting for expired fees share one read
+        self._refresh_lock = threading.Lock()
+
+    def get_chain_id(self) -> int:
+        """
+        :return: chain id of the network, read once
+        """
+        if self._chain_id is None:
+            self._chain_id = self._unwrap(self._call_many([('eth_chainId', [])])[0])
+        return self._chain_id
+
+    def get_fees(self) -> FeeData:
+        """
+        :return: the current fees, read from the network at most once per ttl
+        """
+        fees = self._cached_fees()
+        if fees is not None:
+            return fees
+
+        with self._refresh_lock:
+            fees = self._cached_fees()
+            if fees is None:
+                calls = self._fee_calls()
+                fees = self._parse_fees(self._call_many(calls) if calls else [])
+                if fees is None:
+                    gas_price = self._unwrap(self._call_many([('eth_gasPrice', [])])[0])
+                    fees = FeeData(self._chain_id, gas_price=gas_price)
+                self._store_fees(fees)
+            return fees
+
+    def transaction_fields(self) -> Dict[str, Any]:
+        """
+        :return: chain id and fee fields of a transaction, type 2 when the network supports it
+        """
+        return self._transaction_fields(self.get_fees())
+
+    def get_token_transfer_gas(self, contract_address: str, from_address: str, amount: int) -> int:
+        """
+        Get the gas limit of a token transfer. The estimate is a transfer to an address without a balance, the most
+        expensive case for standard tokens, and is reused for every transfer of the token.
+
+        :param contract_address: checksum token contract address
+        :param from_address: checksum address of a sender holding at least the amount
+        :param amount: the amount of the transfer
+        :return: the gas limit
+        """
+        key = (self.get_chain_id(), contract_address.lower())
+        gas = self._cached_estimate(key)
+        if gas is not None:
+            return gas
+        results = self._call_many(self._estimate_calls(contract_address, from_address, amount))
+        return self._parse_estimate(key, results[0])
+
+
+class AsyncFeeOracle(_FeeCache):
+    def __init__(self, call_many: AsyncCalls, **kwargs: Any) -> None:
+        super().__init__(call_many, **kwargs)
+        # Held while the fees are read, so the coroutines waiting for expired fees share one read
+        self._refresh_lock = asyncio.Lock()
+
+    async def get_chain_id(self) -> int:
+        """
+        :return: chain id of the network, read once
+        """
+        if self._chain_id is None:
+            self._chain_id = self._unwrap((await self._call_many([('eth_chainId', [])]))[0])
+        return self._chain_id
+
+    async def get_fees(self) -> FeeData:
+        """
+        :return: the current fees, read from the network at most once per ttl
+        """
+        fees = self._cached_fees()
+        if fees is not None:
+            return fees
+
+        async with self._refresh_lock:
+            fees = self._cached_fees()
+            if fees is None:
+                calls = self._fee_calls()
+                fees = self._parse_fees(await self._call_many(calls) if calls else [])
+                if fees is None:
+                    gas_price = self._unwrap((await self._call_many([('eth_gasPrice', [])]))[0])
+                    fees = FeeData(self._chain_id, gas_price=gas_price)
+                self._store_fees(fees)
+            return fees
+
+    async def transaction_fields(self) -> Dict[str, Any]:
+        """
+        :return: chain id and fee fields of a transaction, type 2 when the network supports it
+        """
+        return self._transaction_fields(await self.get_fees())
+
+    async def get_token_transfer_gas(self, contract_address: str, from_address: str, amount: int) -> int:
+        """
+        Get the gas limit of a token transfer, see FeeOracle.get_token_transfer_gas
+
+        :param contract_address: checksum token contract address
+        :param from_address: checksum address of a sender holding at least the amount
+        :param amount: the amount of the transfer
+        :return: the gas limit
+        """
+        key = (await self.get_chain_id(), contract_address.lower())
+        gas = self._cached_estimate(key)
+        if gas is not None:
+            return gas
+        results = await self._call_many(self._estimate_calls(contract_address, from_address, amount))
+        return self._parse_estimate(key, results[0])
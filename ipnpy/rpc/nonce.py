@@ -0,0 +1,153 @@
+import bisect
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ipnpy.exceptions import BadRequestError, ValidationError
+
+try:
+    from web3.exceptions import Web3RPCError
+except ImportError:
+    # web3 before 7 raises ValueError for the errors returned by the node
+    Web3RPCError = ValueError
+
+NONCE_ERRORS = (
+    'nonce too low',
+    'replacement transaction underpriced',
+    'replacement underpriced',
+)
+
+
+class _NonceState:
+    def __init__(self, next_nonce: int) -> None:
+        self.next_nonce = next_nonce
+        self.released: List[int] = []
+
+
+class NonceManager:
+    def __init__(self) -> None:
+        """
+        A local allocator of transaction nonces for every pair of chain id and sender address. The nonce is read from
+        the chain once, then handed out locally. The manager is safe to share between threads and coroutines.
+        """
+        self._lock = threading.Lock()
+        self._states: Dict[Tuple[int, str], _NonceState] = {}
+
+    def allocate(self, chain_id: int, address: str, fetch: Callable[[], int]) -> int:
+        """
+        Get the next free nonce of the address
+
+        :param chain_id: chain id of the network
+        :param address: sender's wallet address
+        :param fetch: a function returning the pending transaction count of the address, called only when the address
+            has no local state yet
+        :return: the nonce for the next transaction
+        """
+        key = (chain_id, address.lower())
+        nonce = self._next(key)
+        while nonce is None:
+            self._seed(key, fetch())
+            nonce = self._next(key)
+        return nonce
+
+    async def allocate_async(self, chain_id: int, address: str, fetch: Callable[[], Awaitable[int]]) -> int:
+        """
+        Get the next free nonce of the address in a coroutine
+
+        :param chain_id: chain id of the network
+        :param address: sender's wallet address
+        :param fetch: a coroutine function returning the pending transaction count of the address
+        :return: the nonce for the next transaction
+        """
+        key = (chain_id, address.lower())
+        nonce = self._next(key)
+        while nonce is None:
+            self._seed(key, await fetch())
+            nonce = self._next(key)
+        return nonce
+
+    def release(self, chain_id: int, address: str, nonce: int) -> None:
+        """
+        Return the nonce of a transaction that was not broadcast, so the gap is filled by the next allocation
+
+        :param chain_id: chain id of the network
+        :param address: sender's wallet address
+        :param nonce: the unused nonce
+        """
+        key = (chain_id, address.lower())
+        with self._lock:
+            state = self._states.get(key)
+            if state is None or nonce >= state.next_nonce or nonce in state.released:
+                return
+
+            bisect.insort(state.released, nonce)
+            # Released nonces at the end of the sequence are handed out again by the counter
+            while state.released and state.released[-1] == state.next_nonce - 1:
+                state.released.pop()
+                state.next_nonce -= 1
+
+    def resync(self, chain_id: int, address: str) -> None:
+        """
+        Forget the local state of the address, the next allocation reads the nonce from the chain again
+
+        :param chain_id: chain id of the network
+        :param address: sender's wallet address
+        """
+        with self._lock:
+            self._states.pop((chain_id, address.lower()), None)
+
+    def on_failure(self, chain_id: int, address: str, nonce: int, error: Exception) -> None:
+        """
+        Update the local state after sending the transaction with the nonce failed. The nonce is handed out again
+        only if the transaction was surely not accepted, after a network error the node may have accepted it, so the
+        nonce is read from the chain again.
+
+        :param chain_id: chain id of the network
+        :param address: sender's wallet address
+        :param nonce: the nonce of the failed transaction
+        :param error: the error raised while building, signing or broadcasting the transaction
+        """
+        if self.is_rejection(error) and not self.is_nonce_error(error):
+            self.release(chain_id, address, nonce)
+        else:
+            self.resync(chain_id, address)
+
+    @staticmethod
+    def is_rejection(error: Exception) -> bool:
+        """
+        Check whether the transaction was refused for sure, by the node or before it was sent
+
+        :param error: the error raised while building, signing or broadcasting the transaction
+        :return: False for network errors and timeouts, after which the transaction may have been accepted
+        """
+        return isinstance(error, (BadRequestError, ValidationError, Web3RPCError, ValueError))
+
+    @staticmethod
+    def is_nonce_error(error: Exception) -> bool:
+        """
+        Check whether the node rejected a transaction because its nonce is out of sync with the chain
+
+        :param error: the error raised while broadcasting
+        :return: True if the local nonce state should be resynced
+        """
+        message = str(error).lower()
+        return any(text in message for text in NONCE_ERRORS)
+
+    def _seed(self, key: Tuple[int, str], nonce: int) -> None:
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                self._states[key] = _NonceState(nonce)
+            elif not state.released and nonce > state.next_nonce:
+                state.next_nonce = nonce
+
+    def _next(self, key: Tuple[int, str]) -> Optional[int]:
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return None
+            if state.released:
+                return state.released.pop(0)
+
+            nonce = state.next_nonce
+            state.next_nonce += 1
+            return nonce
@@ -0,0 +1,475 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from ipnpy.exceptions import ConnectionError
+from ipnpy.rpc.nonce import NonceManager
+from ipnpy.schemes.enums import OutboxStatus
+from ipnpy.schemes.rpc import OutboxEntry, SignedTransfer
+
+logger = logging.getLogger(__name__)
+
+# Errors of a broadcast of a transaction the node already has
+ALREADY_KNOWN_ERRORS = (
+    'already known',
+    'known transaction',
+    'already imported',
+    'already exists',
+    'dup_transaction',
+)
+
+# Statuses of transactions that will not be mined
+_FINAL_FAILURES = (OutboxStatus.FAILED, OutboxStatus.EXPIRED)
+
+_COLUMNS = 'id, network, txid, raw_transaction, sender, nonce, status, attempts, error, created, updated, expires, ' \
+           'reference'
+
+
+class TransactionOutbox:
+    def __init__(self, path: str, timeout: float = 30) -> None:
+        """
+        A durable queue of signed transactions in a local SQLite database. Transactions are signed ahead and stored
+        with their hash, nonce and expiry, an OutboxBroadcaster sends them later. A transaction is stored once per
+        network, storing the same signed transaction again is ignored.
+
+        :param path: path of the database file, created if missing
+        :param timeout: seconds to wait for a lock held by another process
+        """
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+        with self._connection() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS outbox ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, network TEXT NOT NULL, txid TEXT NOT NULL, '
+                'raw_transaction TEXT NOT NULL, sender TEXT, nonce INTEGER, status TEXT NOT NULL, '
+                'attempts INTEGER NOT NULL DEFAULT 0, error TEXT, created REAL NOT NULL, updated REAL NOT NULL, '
+                'expires REAL, reference TEXT, UNIQUE (network, txid))'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS outbox_status ON outbox (network, status, id)')
+
+    def put(self, network: str, signed_transfer: SignedTransfer, reference: Optional[str] = None) -> bool:
+        """
+        Store a signed transaction
+
+        :param network: name of the network, the key of its client in the broadcaster
+        :param signed_transfer: a transfer signed by sign_many of the client of the network
+        :param reference: an identifier of the payout in the application, for example its database id
+        :return: True if the transaction was stored, False if it was stored before
+        """
+        return self.put_many(network, [signed_transfer], [reference]) == 1
+
+    def put_many(self,
+                 network: str,
+                 signed_transfers: Iterable[SignedTransfer],
+                 references: Optional[Iterable[Optional[str]]] = None) -> int:
+        """
+        Store signed transactions in one database transaction, transfers that failed to sign are skipped
+
+        :param network: name of the network, the key of its client in the broadcaster
+        :param signed_transfers: transfers signed by sign_many of the client of the network
+        :param references: an identifier of every transfer in the application
+        :return: the number of stored transactions
+        """
+        signed_transfers = list(signed_transfers)
+        references = list(references) if references is not None else [None] * len(signed_transfers)
+        now = time.time()
+        rows = [
+            (network, signed.txid, signed.raw_transaction, signed.sender, signed.nonce, OutboxStatus.QUEUED.value,
+             now, now, signed.expires, reference)
+            for signed, reference in zip(signed_transfers, references)
+            if signed.error is None and signed.raw_transaction is not None
+        ]
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            before = connection.total_changes
+            connection.executemany(
+                'INSERT OR IGNORE INTO outbox (network, txid, raw_transaction, sender, nonce, status, created, '
+                'updated, expires, reference) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                rows,
+            )
+            return connection.total_changes - before
+
+    def claim(self, network: str, limit: int) -> List[OutboxEntry]:
+        """
+        Take queued transactions of the network for broadcasting in the order they were stored. They stay in the
+        sending status until complete is called, after a crash recover finds them there. Queued transactions past
+        their expiry are marked expired instead.
+
+        :param network: name of the network
+        :param limit: the maximum number of transactions
+        :return: the claimed transactions
+        """
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute(
+                'UPDATE outbox SET status = ?, updated = ? WHERE network = ? AND status = ? AND expires <= ?',
+                (OutboxStatus.EXPIRED.value, now, network, OutboxStatus.QUEUED.value, now),
+            )
+            rows = connection.execute(
+                f'SELECT {_COLUMNS} FROM outbox WHERE network = ? AND status = ? ORDER BY id LIMIT ?',
+                (network, OutboxStatus.QUEUED.value, limit),
+            ).fetchall()
+            connection.executemany(
+                'UPDATE outbox SET status = ?, attempts = attempts + 1, updated = ? WHERE id = ?',
+                [(OutboxStatus.SENDING.value, now, row[0]) for row in rows],
+            )
+        return [self._entry(row, OutboxStatus.SENDING, attempts=row[7] + 1) for row in rows]
+
+    def complete(self, entry_id: int, status: OutboxStatus, error: Optional[str] = None) -> None:
+        """
+        Record the result of a broadcast, QUEUED puts the transaction back to be broadcast again
+
+        :param entry_id: id of the entry
+        :param status: the new status
+        :param error: the error of a failed broadcast
+        """
+        with self._connection() as connection:
+            connection.execute(
+                'UPDATE outbox SET status = ?, error = ?, updated = ? WHERE id = ?',
+                (status.value, error, time.time(), entry_id),
+            )
+
+    def fail_after(self, network: str, sender: str, nonce: int, error: str) -> List[OutboxEntry]:
+        """
+        Fail the queued and sent transactions of the sender with a higher nonce, they can not be mined while the
+        nonce is missing
+
+        :param network: name of the network
+        :param sender: address of the sender as stored
+        :param nonce: the nonce that will not be used
+        :param error: the error stored with the failed transactions
+        :return: the failed entries
+        """
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            rows = connection.execute(
+                f'SELECT {_COLUMNS} FROM outbox WHERE network = ? AND sender = ? AND nonce > ? AND status IN (?, ?) '
+                'ORDER BY id',
+                (network, sender, nonce, OutboxStatus.QUEUED.value, OutboxStatus.SENT.value),
+            ).fetchall()
+            connection.executemany(
+                'UPDATE outbox SET status = ?, error = ?, updated = ? WHERE id = ?',
+                [(OutboxStatus.FAILED.value, error, now, row[0]) for row in rows],
+            )
+        entries = [self._entry(row, OutboxStatus.FAILED) for row in rows]
+        for entry in entries:
+            entry.error = error
+        return entries
+
+    def get(self, network: str, txid: str) -> Optional[OutboxEntry]:
+        row = self._connection().execute(
+            f'SELECT {_COLUMNS} FROM outbox WHERE network = ? AND txid = ?', (network, txid)
+        ).fetchone()
+        return self._entry(row) if row is not None else None
+
+    def entries(self,
+                network: Optional[str] = None,
+                status: Optional[OutboxStatus] = None,
+                limit: int = 1000) -> List[OutboxEntry]:
+        """
+        :param network: name of the network, every network if None
+        :param status: status of the entries, every status if None
+        :param limit: the maximum number of entries
+        :return: the entries in the order they were stored
+        """
+        conditions, params = [], []
+        if network is not None:
+            conditions.append('network = ?')
+            params.append(network)
+        if status is not None:
+            conditions.append('status = ?')
+            params.append(status.value)
+        where = f'WHERE {" AND ".join(conditions)} ' if conditions else ''
+        rows = self._connection().execute(
+            f'SELECT {_COLUMNS} FROM outbox {where}ORDER BY id LIMIT ?', (*params, limit)
+        ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def counts(self, network: Optional[str] = None) -> Dict[OutboxStatus, int]:
+        """
+        :param network: name of the network, every network if None
+        :return: the number of entries in every status
+        """
+        query = 'SELECT status, COUNT(*) FROM outbox '
+        query += 'WHERE network = ? GROUP BY status' if network is not None else 'GROUP BY status'
+        rows = self._connection().execute(query, (network,) if network is not None else ()).fetchall()
+        counts = {status: 0 for status in OutboxStatus}
+        counts.update({OutboxStatus(status): count for status, count in rows})
+        return counts
+
+    def networks(self) -> List[str]:
+        return [row[0] for row in self._connection().execute('SELECT DISTINCT network FROM outbox').fetchall()]
+
+    def close(self) -> None:
+        connection: Optional[sqlite3.Connection] = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    @staticmethod
+    def _entry(row: tuple, status: Optional[OutboxStatus] = None, attempts: Optional[int] = None) -> OutboxEntry:
+        return OutboxEntry(
+            row[0], row[1], row[2], row[3], row[4], row[5],
+            status or OutboxStatus(row[6]),
+            row[7] if attempts is None else attempts,
+            *row[8:],
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can not be shared between threads, and must not be inherited by forked processes
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # A stored transaction must survive a power loss before it is reported as stored
+            connection.execute('PRAGMA synchronous=FULL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+
+class _EvmTarget:
+    def __init__(self, rpc: Any) -> None:
+        self.rpc = rpc
+
+    def broadcast(self, entries: List[OutboxEntry]) -> List[Union[str, Exception]]:
+        return self.rpc.broadcast_many([entry.raw_transaction for entry in entries])
+
+    def lookup(self, txids: List[str]) -> Dict[str, bool]:
+        results = self.rpc.call_many([('eth_getTransactionByHash', [txid]) for txid in txids])
+        return {
+            txid: transaction is not None
+            for txid, transaction in zip(txids, results) if not isinstance(transaction, Exception)
+        }
+
+
+class _TronTarget:
+    def __init__(self, rpc: Any) -> None:
+        self.rpc = rpc
+
+    def broadcast(self, entries: List[OutboxEntry]) -> List[Union[str, Exception]]:
+        results: List[Union[str, Exception]] = []
+        for entry in entries:
+            try:
+                results.append(self.rpc.broadcast(entry.raw_transaction))
+            except Exception as error:
+                results.append(error)
+        return results
+
+    def lookup(self, txids: List[str]) -> Dict[str, bool]:
+        found = {}
+        for txid in txids:
+            try:
+                found[txid] = bool(self.rpc.get_transaction(txid))
+            except Exception:
+                continue
+        return found
+
+
+class OutboxBroadcaster:
+    def __init__(self,
+                 outbox: TransactionOutbox,
+                 clients: Dict[str, Any],
+                 rate: float = 10,
+                 batch_size: int = 50,
+                 poll_interval: float = 1,
+                 on_result: Optional[Callable[[OutboxEntry], Any]] = None,
+                 max_attempts: int = 20) -> None:
+        """
+        Drains a TransactionOutbox at a controlled rate. Every network has its own token bucket of rate transactions
+        per second, EVM transactions are broadcast in JSON-RPC batches.
+
+        Broadcasting the same signed transaction twice is harmless, so after a crash the transactions left in the
+        sending status are looked up on the chain: the ones found are marked sent, the others are queued again. A
+        rejected broadcast is marked failed only once a lookup tells that the transaction is not on the chain. The
+        transactions of the same sender with higher nonces can not be mined after it and are failed too.
+
+        :param outbox: the outbox to drain
+        :param clients: EvmJsonRPC or TronJsonRPC clients by the network names used in the outbox
+        :param rate: the maximum number of broadcasts per second on every network
+        :param batch_size: the maximum number of transactions claimed at once
+        :param poll_interval: seconds between polls of an empty outbox
+        :param on_result: called with every entry after the status of all entries of its batch was stored
+        :param max_attempts: a transaction still unresolved after this many broadcasts, because the node was not
+            reached or the lookup failed, is marked failed instead of queued again
+        """
+        self.outbox = outbox
+        self.rate = rate
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.on_result = on_result
+        self.max_attempts = max_attempts
+        # TronJsonRPC reads blocks in ranges, EvmJsonRPC broadcasts in batches
+        self._targets = {
+            network: _TronTarget(client) if hasattr(client, 'get_blocks') else _EvmTarget(client)
+            for network, client in clients.items()
+        }
+        self._tokens = {network: float(min(batch_size, rate)) for network in clients}
+        self._refilled = {network: time.monotonic() for network in clients}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def recover(self) -> int:
+        """
+        Resolve the transactions left in the sending status by a crash, call it before the first drain
+
+        :return: the number of transactions found on the chain
+        """
+        found = 0
+        for network, target in self._targets.items():
+            entries = self.outbox.entries(network, OutboxStatus.SENDING, limit=2 ** 31)
+            for start in range(0, len(entries), self.batch_size):
+                chunk = entries[start:start + self.batch_size]
+                on_chain = target.lookup([entry.txid for entry in chunk])
+                for entry in chunk:
+                    if on_chain.get(entry.txid):
+                        found += 1
+                        self.outbox.complete(entry.id, OutboxStatus.SENT)
+                    else:
+                        self.outbox.complete(entry.id, OutboxStatus.QUEUED, entry.error)
+        return found
+
+    def drain_once(self) -> List[OutboxEntry]:
+        """
+        Broadcast the queued transactions the rate allows now
+
+        :return: the broadcast entries with their new status
+        """
+        results = []
+        for network, target in self._targets.items():
+            limit = min(self.batch_size, int(self._refill(network)))
+            if limit <= 0:
+                continue
+            entries = self.outbox.claim(network, limit)
+            if not entries:
+                continue
+
+            self._tokens[network] -= len(entries)
+            results.extend(self._broadcast(target, entries))
+        return results
+
+    def start(self) -> None:
+        """
+        Recover and drain the outbox in a background thread until stop is called
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='ipnpy-outbox-broadcaster', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _broadcast(self, target: Union[_EvmTarget, _TronTarget], entries: List[OutboxEntry]) -> List[OutboxEntry]:
+        try:
+            results = target.broadcast(entries)
+        except Exception as error:
+            results = [error] * len(entries)
+
+        # A rejection such as a low nonce may come from an earlier broadcast of the same transaction
+        rejected = [
+            entry.txid for entry, result in zip(entries, results)
+            if isinstance(result, Exception) and not isinstance(result, ConnectionError)
+        ]
+        try:
+            found = target.lookup(rejected) if rejected else {}
+        except Exception:
+            found = {}
+
+        for entry, result in zip(entries, results):
+            entry.status, entry.error = self._status(entry, result, found)
+
+        gaps = self._nonce_gaps(entries, results)
+        for entry in entries:
+            gap = gaps.get(entry.sender)
+            if gap is not None and entry.nonce > gap and entry.status not in _FINAL_FAILURES:
+                entry.status, entry.error = OutboxStatus.FAILED, self._gap_error(gap)
+            elif entry.status is OutboxStatus.QUEUED and entry.attempts >= self.max_attempts:
+                # The transaction may be on the chain, so it leaves no known gap
+                entry.status = OutboxStatus.FAILED
+                entry.error = f'Gave up after {entry.attempts} attempts: {entry.error}'
+            self.outbox.complete(entry.id, entry.status, entry.error)
+
+        # Transactions of the senders stored in other batches, queued or sent already
+        for sender, gap in gaps.items():
+            entries = entries + self.outbox.fail_after(entries[0].network, sender, gap, self._gap_error(gap))
+
+        if self.on_result is not None:
+            for entry in entries:
+                try:
+                    self.on_result(entry)
+                except Exception:
+                    logger.exception('on_result failed for the outbox entry %s', entry.id)
+        return entries
+
+    @staticmethod
+    def _nonce_gaps(entries: List[OutboxEntry], results: List[Union[str, Exception]]) -> Dict[str, int]:
+        # The lowest nonce of every sender that will not be mined, a nonce already used leaves no gap
+        gaps: Dict[str, int] = {}
+        for entry, result in zip(entries, results):
+            if entry.status not in _FINAL_FAILURES or entry.nonce is None:
+                continue
+            if isinstance(result, Exception) and NonceManager.is_nonce_error(result):
+                continue
+            gaps[entry.sender] = min(gaps.get(entry.sender, entry.nonce), entry.nonce)
+        return gaps
+
+    @staticmethod
+    def _gap_error(nonce: int) -> str:
+        return f'Not mined, the transaction with nonce {nonce} of the sender failed'
+
+    @staticmethod
+    def _status(entry: OutboxEntry, result: Union[str, Exception], found: Dict[str, bool]) -> tuple:
+        if not isinstance(result, Exception):
+            return OutboxStatus.SENT, None
+
+        message = str(result)
+        if found.get(entry.txid) or any(text in message.lower() for text in ALREADY_KNOWN_ERRORS):
+            return OutboxStatus.SENT, None
+        if isinstance(result, ConnectionError) or entry.txid not in found:
+            # The node was not reached, or the transaction may be on the chain already, broadcast it again later
+            return OutboxStatus.QUEUED, message
+        if 'expir' in message.lower() or (entry.expires is not None and entry.expires <= time.time()):
+            return OutboxStatus.EXPIRED, message
+        return OutboxStatus.FAILED, message
+
+    def _refill(self, network: str) -> float:
+        now = time.monotonic()
+        capacity = max(1.0, float(min(self.batch_size, self.rate)))
+        self._tokens[network] = min(capacity, self._tokens[network] + (now - self._refilled[network]) * self.rate)
+        self._refilled[network] = now
+        return self._tokens[network]
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.recover()
+                break
+            except Exception:
+                # The nodes are not reachable yet, nothing is broadcast before the recovery
+                self._stop.wait(self.poll_interval)
+
+        while not self._stop.is_set():
+            try:
+                sent = self.drain_once()
+            except Exception:
+                sent = []
+            if sent:
+                continue
+            # Wait for the rate limit if a bucket is empty, otherwise the outbox is empty
+            throttled = any(tokens < 1 for tokens in self._tokens.values())
+            self._stop.wait(1 / self.rate if throttled and self.rate else self.poll_interval)
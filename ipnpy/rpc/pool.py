@@ -0,0 +1,221 @@
+import threading
+import time
+from typing import Any, Callable, List, Optional, Sequence, TypeVar, Union
+from urllib.parse import urljoin
+
+import requests
+
+from ipnpy.exceptions import ConnectionError
+from ipnpy.rpc.enums import RpcUrl
+
+T = TypeVar('T')
+
+# JSON-RPC error codes and messages of providers that are over their request limits
+RATE_LIMIT_CODES = (429, -32005)
+RATE_LIMIT_MESSAGES = ('rate limit', 'too many requests')
+
+
+class EndpointUnavailable(Exception):
+    pass
+
+
+class Endpoint:
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.latency: Optional[float] = None
+        self.healthy = True
+        self.failures = 0
+
+    def __repr__(self) -> str:
+        return f'<Endpoint {self.url} healthy={self.healthy} latency={self.latency}>'
+
+
+class EndpointPool:
+    def __init__(self,
+                 urls: Sequence[Union[RpcUrl, str]],
+                 probe: Callable[[str], Any],
+                 check_interval: float = 30,
+                 max_failures: int = 3,
+                 smoothing: float = 0.3) -> None:
+        """
+        A pool of RPC endpoints of one network. Reads go to the healthy endpoint with the lowest latency and fail over
+        to the next one on timeouts, connection errors, 429 and 5xx responses. Writes stick to one endpoint until it
+        fails, so the transactions of a nonce sequence reach the same node. The endpoints are checked in a background
+        thread started on the first request, the constructor does not use the network.
+
+        :param urls: addresses of the endpoints, the first one is preferred until latencies are measured
+        :param probe: a function sending a cheap request to the endpoint and raising on failure
+        :param check_interval: seconds between background health checks
+        :param max_failures: consecutive failures after which an endpoint is marked unhealthy
+        :param smoothing: weight of the newest sample in the moving average of the latency
+        """
+        if not urls:
+            raise ValueError('At least one endpoint is required')
+
+        self.endpoints = [Endpoint(str(url)) for url in dict.fromkeys(str(url) for url in urls)]
+        self.check_interval = check_interval
+        self.max_failures = max_failures
+        self.smoothing = smoothing
+        self._probe = probe
+        self._lock = threading.Lock()
+        self._write_endpoint: Optional[Endpoint] = None
+        self._stop = threading.Event()
+        self._checker: Optional[threading.Thread] = None
+
+    def request(self, send: Callable[[str], T], write: bool = False) -> T:
+        """
+        Send the request to the best endpoint, failing over to the others
+
+        :param send: a function sending the request to the given endpoint address
+        :param write: if True, the request goes to the sticky write endpoint first
+        :return: the result of send
+        :raises ConnectionError: if the request failed on every endpoint
+        """
+        self._start_checker()
+
+        errors = []
+        for endpoint in self._ordered(write):
+            started = time.perf_counter()
+            try:
+                result = send(endpoint.url)
+            except Exception as error:
+                if not self.is_retryable(error):
+                    self.report_success(endpoint, time.perf_counter() - started)
+                    raise
+                self.report_failure(endpoint)
+                errors.append(f'{endpoint.url}: {error}')
+                continue
+
+            self.report_success(endpoint, time.perf_counter() - started)
+            if write:
+                self._write_endpoint = endpoint
+            return result
+
+        raise ConnectionError(f'Request failed on every endpoint: {"; ".join(errors)}')
+
+    def check(self) -> None:
+        """
+        Probe every endpoint once and update its health and latency
+        """
+        for endpoint in self.endpoints:
+            started = time.perf_counter()
+            try:
+                self._probe(endpoint.url)
+            except Exception:
+                self.report_failure(endpoint)
+            else:
+                self.report_success(endpoint, time.perf_counter() - started)
+
+    def report_success(self, endpoint: Endpoint, latency: float) -> None:
+        with self._lock:
+            endpoint.failures = 0
+            endpoint.healthy = True
+            if endpoint.latency is None:
+                endpoint.latency = latency
+            else:
+                endpoint.latency += self.smoothing * (latency - endpoint.latency)
+
+    def report_failure(self, endpoint: Endpoint) -> None:
+        with self._lock:
+            endpoint.failures += 1
+            if endpoint.failures >= self.max_failures:
+                endpoint.healthy = False
+            if endpoint is self._write_endpoint:
+                self._write_endpoint = None
+
+    def close(self) -> None:
+        """
+        Stop the background health checks
+        """
+        self._stop.set()
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """
+        Check whether the request may succeed on another endpoint
+
+        :param error: the error raised while sending the request
+        :return: True for timeouts, connection errors, 429 and 5xx responses
+        """
+        if isinstance(error, EndpointUnavailable):
+            return True
+        if isinstance(error, requests.HTTPError):
+            status = error.response.status_code if error.response is not None else None
+            return status is None or status == 429 or status >= 500
+        return isinstance(error, (requests.Timeout, requests.ConnectionError))
+
+    @staticmethod
+    def is_rate_limit_response(response: Any) -> bool:
+        """
+        Check whether a JSON-RPC response is a rate limit error
+
+        :param response: decoded JSON-RPC response
+        :return: True if the provider refused the request because of its limits
+        """
+        if not isinstance(response, dict) or not isinstance(response.get('error'), dict):
+            return False
+        error = response['error']
+        message = str(error.get('message', '')).lower()
+        return error.get('code') in RATE_LIMIT_CODES or any(text in message for text in RATE_LIMIT_MESSAGES)
+
+    def _ordered(self, write: bool) -> List[Endpoint]:
+        with self._lock:
+            healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+            unhealthy = [endpoint for endpoint in self.endpoints if not endpoint.healthy]
+            # Endpoints without measurements keep their configured order in front of the slower measured ones
+            healthy.sort(key=lambda endpoint: 0 if endpoint.latency is None else endpoint.latency)
+            ordered = healthy + unhealthy
+
+            if write and self._write_endpoint is not None:
+                ordered.remove(self._write_endpoint)
+                ordered.insert(0, self._write_endpoint)
+            return ordered
+
+    def _start_checker(self) -> None:
+        if self._checker is not None or len(self.endpoints) == 1:
+            return
+
+        with self._lock:
+            if self._checker is None:
+                self._checker = threading.Thread(target=self._run_checker, name='ipnpy-endpoint-pool', daemon=True)
+                self._checker.start()
+
+    def _run_checker(self) -> None:
+        while not self._stop.is_set():
+            self.check()
+            self._stop.wait(self.check_interval)
+
+
+def evm_probe(timeout: float = 5) -> Callable[[str], Any]:
+    """
+    :param timeout: timeout of the probe in seconds
+    :return: a probe requesting the latest block number from an EVM endpoint
+    """
+    session = requests.Session()
+
+    def probe(url: str) -> Any:
+        payload = {'jsonrpc': '2.0', 'id': 1, 'method': 'eth_blockNumber', 'params': []}
+        response = session.post(url, json=payload, timeout=timeout)
+        response.raise_for_status()
+        result = response.json()
+        if 'result' not in result:
+            raise EndpointUnavailable(str(result.get('error')))
+        return result['result']
+
+    return probe
+
+
+def tron_probe(timeout: float = 5) -> Callable[[str], Any]:
+    """
+    :param timeout: timeout of the probe in seconds
+    :return: a probe requesting the latest block from a tron endpoint
+    """
+    session = requests.Session()
+
+    def probe(url: str) -> Any:
+        response = session.post(urljoin(url, 'wallet/getnowblock'), json={}, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    return probe
+
@@ -0,0 +1,202 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from ipnpy.exceptions import ValidationError
+from ipnpy.rpc.enums import RpcUrl
+from ipnpy.schemes.ipn_api import Wallet
+from ipnpy.schemes.rpc import PortfolioSnapshot
+from ipnpy.utils.address import to_evm, to_tron_base58
+
+# Network and token of a column, the token is None for the native currency
+Asset = Tuple[Union[RpcUrl, str], Optional[str]]
+# Row, column, raw amount or None, error
+CellResult = Tuple[int, int, Optional[int], Optional[str]]
+
+
+class Portfolio:
+    def __init__(self,
+                 wallets: Sequence[Union[Wallet, str]],
+                 assets: Sequence[Asset],
+                 clients: Optional[Dict[Union[RpcUrl, str], Any]] = None,
+                 max_workers: Optional[int] = None,
+                 tron_workers: int = 8) -> None:
+        """
+        Native and token balances of the same wallets on many networks. Every network is read concurrently, EVM
+        networks in one JSON-RPC batch for the native balances and Multicall3 calls for the tokens, TRON with
+        tron_workers parallel requests. The amounts are kept in a columnar PortfolioSnapshot, and refresh can read
+        only the cells older than a given age.
+
+        :param wallets: wallets, or addresses in EVM hex or TRON base58 form. A wallet has the same key on every
+            network, its EVM and TRON addresses are derived from each other.
+        :param assets: pairs of the network and the token contract address, None for the native currency. A network
+            is a RpcUrl, the name of a RpcUrl member, or a key of clients.
+        :param clients: EvmJsonRPC or TronJsonRPC clients by network, the missing clients of RpcUrl networks are
+            created and closed by the portfolio
+        :param max_workers: the maximum number of networks read at the same time, every network by default
+        :param tron_workers: the number of parallel requests to a TRON network, which has no batch requests
+        """
+        self._clients: Dict[str, Any] = {}
+        self._own_clients: List[Any] = []
+        self._networks: Dict[str, Union[RpcUrl, str]] = {}
+        clients = clients or {}
+        for network, client in clients.items():
+            self._clients[self._network_name(network)] = client
+
+        columns = []
+        for network, token in assets:
+            name = self._network_name(network)
+            if name not in self._clients and not isinstance(self._resolve(network), RpcUrl):
+                raise ValidationError(f'No client for the network {network}')
+            self._networks.setdefault(name, self._resolve(network))
+            columns.append((name, token))
+
+        self._evm_addresses: List[str] = []
+        self._tron_addresses: List[str] = []
+        for wallet in wallets:
+            evm_address, tron = self._addresses(wallet)
+            self._evm_addresses.append(evm_address)
+            self._tron_addresses.append(tron)
+
+        self.tron_workers = tron_workers
+        self.snapshot = PortfolioSnapshot.empty(list(self._evm_addresses), columns)
+        self._executor = ThreadPoolExecutor(max_workers or max(1, len(self._networks)), 'ipnpy-portfolio')
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'Portfolio':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Stop the worker threads and close the clients created by the portfolio
+        """
+        self._executor.shutdown()
+        for client in self._own_clients:
+            client.close()
+
+    def refresh(self, max_age: Optional[float] = None) -> PortfolioSnapshot:
+        """
+        Read the balances of the cells older than max_age and of the cells failed on the last refresh. A failed read
+        keeps the previous amount of the cell and records the error in snapshot.errors.
+
+        :param max_age: seconds a read amount stays fresh, every cell is read if None
+        :return: the updated snapshot
+        """
+        with self._lock:
+            snapshot = self.snapshot
+            now = time.time()
+            work: Dict[str, List[Tuple[int, List[int]]]] = {}
+            for column, (network, _) in enumerate(snapshot.assets):
+                rows = snapshot.stale_rows(column, max_age, now)
+                if rows:
+                    work.setdefault(network, []).append((column, rows))
+
+            futures = [self._executor.submit(self._read_network, network, columns) for network, columns in work.items()]
+            for future, (network, columns) in zip(futures, work.items()):
+                try:
+                    results = future.result()
+                except Exception as error:
+                    results = [(row, column, None, str(error)) for column, rows in columns for row in rows]
+
+                updated = time.time()
+                for row, column, amount, error in results:
+                    if amount is None:
+                        snapshot.errors[(row, column)] = error or 'No balance'
+                    else:
+                        snapshot.set(row, column, amount, updated)
+            return snapshot
+
+    def _read_network(self, network: str, columns: List[Tuple[int, List[int]]]) -> List[CellResult]:
+        client = self._client(network)
+        if hasattr(client, 'get_trc20_balance'):
+            return self._read_tron(client, columns)
+        return self._read_evm(client, columns)
+
+    def _read_evm(self, client: Any, columns: List[Tuple[int, List[int]]]) -> List[CellResult]:
+        results: List[CellResult] = []
+        # Token columns with the same stale rows share the Multicall3 calls
+        token_groups: Dict[Tuple[int, ...], List[int]] = {}
+        for column, rows in columns:
+            token = self.snapshot.assets[column][1]
+            if token is not None:
+                token_groups.setdefault(tuple(rows), []).append(column)
+                continue
+
+            try:
+                balances = client.get_native_balances([self._evm_addresses[row] for row in rows])
+            except Exception as error:
+                results.extend((row, column, None, str(error)) for row in rows)
+                continue
+            results.extend((row, column, balance.balance, balance.error) for row, balance in zip(rows, balances))
+
+        for rows, group in token_groups.items():
+            tokens = [self.snapshot.assets[column][1] for column in group]
+            try:
+                balances = iter(client.get_erc20_balances([self._evm_addresses[row] for row in rows], tokens))
+            except Exception as error:
+                results.extend((row, column, None, str(error)) for column in group for row in rows)
+                continue
+            # Balances are grouped by contract in the order of the tokens
+            for column in group:
+                results.extend((row, column, balance.balance, balance.error) for row, balance in zip(rows, balances))
+        return results
+
+    def _read_tron(self, client: Any, columns: List[Tuple[int, List[int]]]) -> List[CellResult]:
+        from tronpy.exceptions import AddressNotFound
+
+        def read(cell: Tuple[int, int]) -> CellResult:
+            row, column = cell
+            token = self.snapshot.assets[column][1]
+            try:
+                if token is None:
+                    amount = int(client.get_native_balance(self._tron_addresses[row]))
+                else:
+                    amount = int(client.get_trc20_balance(self._tron_addresses[row], token))
+            except AddressNotFound:
+                # Accounts are created on the first transfer to them, an account not activated yet holds nothing
+                return row, column, 0, None
+            except Exception as error:
+                return row, column, None, str(error) or type(error).__name__
+            return row, column, amount, None
+
+        cells = [(row, column) for column, rows in columns for row in rows]
+        with ThreadPoolExecutor(min(self.tron_workers, len(cells)), 'ipnpy-portfolio-tron') as executor:
+            return list(executor.map(read, cells))
+
+    def _client(self, network: str) -> Any:
+        client = self._clients.get(network)
+        if client is not None:
+            return client
+
+        # Created in the worker of the network only, so no other thread creates the same client
+        url = self._networks[network]
+        if url is RpcUrl.TRON:
+            from ipnpy.rpc.tron import TronJsonRPC
+            client = TronJsonRPC(url)
+        else:
+            from ipnpy.rpc.evm import EvmJsonRPC
+            client = EvmJsonRPC(url)
+        self._clients[network] = client
+        self._own_clients.append(client)
+        return client
+
+    @staticmethod
+    def _resolve(network: Union[RpcUrl, str]) -> Union[RpcUrl, str]:
+        if isinstance(network, RpcUrl):
+            return network
+        return RpcUrl.__members__.get(network.upper(), network)
+
+    @classmethod
+    def _network_name(cls, network: Union[RpcUrl, str]) -> str:
+        network = cls._resolve(network)
+        return network.name.lower() if isinstance(network, RpcUrl) else network
+
+    @staticmethod
+    def _addresses(wallet: Union[Wallet, str]) -> Tuple[str, str]:
+        if isinstance(wallet, Wallet):
+            return wallet.eth_address, wallet.tron_address
+        return to_evm(wallet), to_tron_base58(wallet)
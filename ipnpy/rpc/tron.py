@@ -1,25 +1,96 @@
-from typing import Union
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
 
 from _decimal import Decimal
 from tronpy import Tron
+from tronpy.exceptions import TransactionNotFound
 from tronpy.keys import PrivateKey
 from tronpy.providers import HTTPProvider
+from tronpy.tron import Transaction
 
 from ipnpy.contracts.tron.token import TRC20
-from ipnpy.exceptions import ConnectionError
+from ipnpy.contracts.tron.utils import build_transaction
+from ipnpy.exceptions import BadRequestError
+from ipnpy.instrumentation.hooks import observe
 from ipnpy.rpc.enums import RpcUrl
+from ipnpy.rpc.pool import EndpointPool, tron_probe
+from ipnpy.schemes.rpc import SignedTransfer, Transfer, TransferResult
+
+
+class PooledTronProvider(HTTPProvider):
+    WRITE_METHODS = ('wallet/broadcasttransaction',)
+
+    def __init__(self, pool: EndpointPool, timeout: float = 10) -> None:
+        """
+        A tronpy HTTP provider sending every request through a pool of endpoints
+
+        :param pool: endpoints of the network
+        :param timeout: timeout of one HTTP request in seconds
+        """
+        super().__init__(endpoint_uri=pool.endpoints[0].url, timeout=timeout)
+        self.pool = pool
+        self._providers: Dict[str, HTTPProvider] = {}
+
+    def make_request(self, method: str, params: Any = None) -> dict:
+        return self.pool.request(
+            lambda url: observe(
+                'tron', method, url,
+                lambda: self._get_provider(url).make_request(method, params),
+                lambda: len(json.dumps(params)) if params is not None else 0,
+                lambda result: len(json.dumps(result, default=str)),
+                self._response_error,
+            ),
+            method in self.WRITE_METHODS
+        )
+
+    @staticmethod
+    def _response_error(response: Any) -> Optional[Exception]:
+        """
+        :param response: decoded response of the node
+        :return: the error reported by the node, or None
+        """
+        if not isinstance(response, dict):
+            return None
+        if 'Error' in response:
+            return BadRequestError(str(response['Error']))
+        # Contract calls nest the status in result, broadcasts report it next to the transaction id
+        status = response['result'] if isinstance(response.get('result'), dict) else response
+        if 'code' in status and status.get('result') is not True:
+            return BadRequestError(str(status['code']))
+        return None
+
+    def _get_provider(self, url: str) -> HTTPProvider:
+        provider = self._providers.get(url)
+        if provider is None:
+            provider = self._providers.setdefault(url, HTTPProvider(endpoint_uri=url, timeout=self.timeout))
+        return provider
 
 
 class TronJsonRPC:
-    def __init__(self, rpc_url: Union[RpcUrl, str]):
+    def __init__(self,
+                 rpc_url: Union[RpcUrl, str, Sequence[Union[RpcUrl, str]]],
+                 fetch_contracts: bool = False,
+                 timeout: float = 10,
+                 check_interval: float = 30):
         """
         A class for interacting with tron networks.
 
-        :param network: the address to connect to the RPC. By default, the test network is selected
+        The client does not use the network until the first request. With several addresses, requests go to the
+        fastest healthy endpoint and fail over to the others, broadcasts stick to one endpoint.
+
+        :param network: the address to connect to the RPC, or a list of addresses of the same network
+        :param fetch_contracts: if True, TRC20 contracts are requested from the network, otherwise they are built from
+            the bundled TRC20 ABI. Contracts and their decimals are cached by the client either way.
+        :param timeout: timeout of one HTTP request in seconds
+        :param check_interval: seconds between background health checks of the endpoints
         """
-        self._client = Tron(HTTPProvider(endpoint_uri=rpc_url))
-        if not self.is_connected():
-            raise ConnectionError('Error connecting')
+        urls = [rpc_url] if isinstance(rpc_url, (RpcUrl, str)) else list(rpc_url)
+        self._pool = EndpointPool(urls, tron_probe(timeout), check_interval)
+        self._client = Tron(PooledTronProvider(self._pool, timeout))
+
+        self._fetch_contracts = fetch_contracts
+        self._contracts: Dict[str, TRC20] = {}
 
     def is_connected(self) -> bool:
         """
@@ -32,6 +103,12 @@ class TronJsonRPC:
         except:
             return False
 
+    def close(self) -> None:
+        """
+        Stop the background health checks of the endpoints
+        """
+        self._pool.close()
+
     def get_trc20_balance(self,
                           address: str,
                           contract_address: str,
@@ -44,7 +121,7 @@ class TronJsonRPC:
         :param raw: if True, the function returns the balance in the minimum unit of measurement of the currency
         :return: float: the balance of the selected wallet
         """
-        trc20 = TRC20(self._client, contract_address)
+        trc20 = self._get_trc20(contract_address)
         balance = trc20.balance_of(address)
 
         if not raw:
@@ -66,6 +143,47 @@ class TronJsonRPC:
             balance = int(balance * 10 ** 6)
         return balance
 
+    def get_block_number(self) -> int:
+        """
+        :return: the number of the latest block
+        """
+        return self._client.get_latest_block_number()
+
+    def get_blocks(self, from_block: int, to_block: int) -> List[dict]:
+        """
+        Get a range of blocks in one request, addresses in the blocks are in hex
+
+        :param from_block: the first block
+        :param to_block: the last block, at most 100 blocks are returned by one request
+        :return: the blocks in the order of their numbers
+        """
+        result = self._client.provider.make_request(
+            'wallet/getblockbylimitnext', {'startNum': from_block, 'endNum': to_block + 1}
+        )
+        blocks = result.get('block', [])
+        blocks.sort(key=lambda block: block['block_header']['raw_data'].get('number', 0))
+        return blocks
+
+    def get_transaction(self, txid: str) -> Optional[dict]:
+        """
+        :param txid: transaction id
+        :return: the transaction, or None if the node does not know it
+        """
+        try:
+            return self._client.get_transaction(txid)
+        except TransactionNotFound:
+            return None
+
+    def get_transaction_info(self, txid: str) -> Optional[dict]:
+        """
+        :param txid: transaction id
+        :return: the receipt of the transaction, or None if it is not in a block yet
+        """
+        try:
+            return self._client.get_transaction_info(txid)
+        except TransactionNotFound:
+            return None
+
     def send_trc20_token(self,
                          private_key: str,
                          from_address: str,
@@ -83,7 +201,7 @@ class TronJsonRPC:
         :return: address transaction
         """
 
-        trc20 = TRC20(self._client, contract_address)
+        trc20 = self._get_trc20(contract_address)
         send = trc20.transfer(private_key, from_address, to_address, amount)
         return send
 
@@ -102,12 +220,146 @@ class TronJsonRPC:
         :param amount: the amount of currency being transferred
         :return: address transaction
         """
-        transaction = (
-            self._client.trx.transfer(from_address, to_address, amount)
-            .build()
-            .sign(PrivateKey(
-                bytes.fromhex(private_key.replace('0x', ''))))
-        )
-
+        transaction = self._sign_native(private_key, from_address, to_address, amount)
         send = transaction.broadcast()
         return send['txid']
+
+    def send_many(self, transfers: List[Transfer], max_workers: int = 8) -> Iterator[TransferResult]:
+        """
+        Send many native and TRC20 transfers. Every token contract and the reference block are fetched once for the
+        whole batch, every transaction is signed before the first broadcast, then they are broadcast concurrently. A
+        failed transfer does not stop the others.
+
+        :param transfers: transfers to send, a transfer with a contract_address sends the TRC20 token
+        :param max_workers: the maximum number of concurrent requests
+        :return: an iterator over the results of the transfers in the order they complete
+        """
+        tokens = self._get_tokens(transfers)
+        ref_block_id = self._get_ref_block_id()
+
+        def sign(transfer: Transfer) -> Union[Transaction, Exception]:
+            try:
+                return self._sign_transfer(transfer, tokens, ref_block_id=ref_block_id)
+            except Exception as error:
+                return error
+
+        with ThreadPoolExecutor(max_workers) as executor:
+            pending = {}
+            for transfer, transaction in zip(transfers, list(executor.map(sign, transfers))):
+                if isinstance(transaction, Exception):
+                    yield TransferResult(transfer, None, str(transaction))
+                else:
+                    pending[executor.submit(self._client.broadcast, transaction)] = transfer
+
+            for future in as_completed(pending):
+                transfer = pending[future]
+                try:
+                    yield TransferResult(transfer, future.result()['txid'])
+                except Exception as error:
+                    yield TransferResult(transfer, None, str(error))
+
+    def sign_many(self,
+                  transfers: List[Transfer],
+                  expiration: Optional[int] = None,
+                  max_workers: int = 8) -> List[SignedTransfer]:
+        """
+        Build and sign many native and TRC20 transfers without broadcasting them, for example to store them in a
+        TransactionOutbox. Tron transactions have no nonce but expire, the raw transaction is the JSON of the signed
+        transaction.
+
+        :param transfers: transfers to sign, a transfer with a contract_address transfers the TRC20 token
+        :param expiration: milliseconds the transactions stay valid, 60 seconds by default and at most 24 hours
+        :param max_workers: the maximum number of concurrent requests, without protobuf the node builds every
+            transaction
+        :return: the signed transfer of every transfer in the order of the transfers, a failed transfer has the error
+            field set
+        """
+        tokens = self._get_tokens(transfers)
+        ref_block_id = self._get_ref_block_id()
+
+        def sign(transfer: Transfer) -> SignedTransfer:
+            try:
+                transaction = self._sign_transfer(transfer, tokens, expiration, ref_block_id)
+            except Exception as error:
+                return SignedTransfer(transfer, None, None, transfer.from_address, error=str(error))
+            data = transaction.to_json()
+            return SignedTransfer(
+                transfer,
+                transaction.txid,
+                json.dumps(data),
+                transfer.from_address,
+                expires=data['raw_data']['expiration'] / 1000,
+            )
+
+        with ThreadPoolExecutor(max_workers) as executor:
+            return list(executor.map(sign, transfers))
+
+    def broadcast(self, raw_transaction: str) -> str:
+        """
+        Broadcast a transaction signed by sign_many
+
+        :param raw_transaction: JSON of the signed transaction
+        :return: transaction id
+        """
+        transaction = Transaction.from_json(json.loads(raw_transaction), client=self._client)
+        return self._client.broadcast(transaction)['txid']
+
+    def _sign_transfer(self,
+                       transfer: Transfer,
+                       tokens: Dict[str, Union[TRC20, Exception]],
+                       expiration: Optional[int] = None,
+                       ref_block_id: Optional[str] = None) -> Transaction:
+        if transfer.contract_address is None:
+            return self._sign_native(
+                transfer.private_key, transfer.from_address, transfer.to_address, transfer.amount, expiration,
+                ref_block_id,
+            )
+
+        token = tokens[transfer.contract_address]
+        if isinstance(token, Exception):
+            raise token
+        return token.sign_transfer(
+            transfer.private_key, transfer.from_address, transfer.to_address, transfer.amount, expiration,
+            ref_block_id,
+        )
+
+    def _get_ref_block_id(self) -> Optional[str]:
+        try:
+            return self._client.get_latest_solid_block_id()
+        except Exception:
+            # Every transaction reads the reference block itself
+            return None
+
+    def _get_tokens(self, transfers: List[Transfer]) -> Dict[str, Union[TRC20, Exception]]:
+        tokens: Dict[str, Union[TRC20, Exception]] = {}
+        for contract_address in dict.fromkeys(transfer.contract_address for transfer in transfers):
+            if contract_address is None:
+                continue
+            try:
+                tokens[contract_address] = self._get_trc20(contract_address)
+            except Exception as error:
+                tokens[contract_address] = error
+        return tokens
+
+    def _get_trc20(self, contract_address: str) -> TRC20:
+        trc20 = self._contracts.get(contract_address)
+        if trc20 is None:
+            trc20 = TRC20(self._client, contract_address, self._fetch_contracts)
+            self._contracts[contract_address] = trc20
+        return trc20
+
+    def _sign_native(self,
+                     private_key: str,
+                     from_address: str,
+                     to_address: str,
+                     amount: int,
+                     expiration: Optional[int] = None,
+                     ref_block_id: Optional[str] = None) -> Transaction:
+        builder = self._client.trx.transfer(from_address, to_address, amount)
+        if expiration is not None:
+            builder = builder.expiration(expiration)
+        transaction = build_transaction(builder, ref_block_id)
+        return observe(
+            'tron', 'sign', None,
+            lambda: transaction.sign(PrivateKey(bytes.fromhex(private_key.replace('0x', ''))))
+        )
@@ -0,0 +1,24 @@
+import asyncio
+from typing import Awaitable, Iterable, List, TypeVar
+
+T = TypeVar('T')
+
+
+async def gather_limited(awaitables: Iterable[Awaitable[T]],
+                         limit: int = 32,
+                         return_exceptions: bool = False) -> List[T]:
+    """
+    Run awaitables concurrently like asyncio.gather, but at most limit of them at the same time
+
+    :param awaitables: coroutines or futures to run
+    :param limit: the maximum number of awaitables running at the same time
+    :param return_exceptions: if True, exceptions are returned in place of the results instead of being raised
+    :return: the results in the order of the awaitables
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(awaitable: Awaitable[T]) -> T:
+        async with semaphore:
+            return await awaitable
+
+    return await asyncio.gather(*(run(awaitable) for awaitable in awaitables), return_exceptions=return_exceptions)
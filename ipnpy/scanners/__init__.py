@@ -0,0 +1,15 @@
+__all__ = [
+    'ConfirmationTracker',
+    'EvmTransferScanner',
+    'TronTransferScanner',
+    'FileCheckpoint'
+]
+
+from ipnpy._lazy import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'ConfirmationTracker': 'ipnpy.scanners.confirmations',
+    'EvmTransferScanner': 'ipnpy.scanners.evm',
+    'TronTransferScanner': 'ipnpy.scanners.tron',
+    'FileCheckpoint': 'ipnpy.scanners.checkpoint',
+})
@@ -0,0 +1,32 @@
+import json
+import os
+from typing import Optional
+
+
+class FileCheckpoint:
+    def __init__(self, path: str) -> None:
+        """
+        The number of the last fully processed block, stored in a JSON file. The file is replaced atomically, so a
+        crash never leaves a partial checkpoint.
+
+        :param path: path of the file, created on the first save
+        """
+        self.path = path
+
+    def load(self) -> Optional[int]:
+        """
+        :return: the last saved block number, or None if nothing was saved yet
+        """
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as file:
+            return json.load(file)['block']
+
+    def save(self, block: int) -> None:
+        """
+        :param block: the number of the last fully processed block
+        """
+        temporary_path = f'{self.path}.tmp'
+        with open(temporary_path, 'w') as file:
+            json.dump({'block': block}, file)
+        os.replace(temporary_path, self.path)
@@ -0,0 +1,368 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from ipnpy.schemes.enums import TransactionStatus
+from ipnpy.schemes.rpc import TransactionEvent
+
+logger = logging.getLogger(__name__)
+
+EventCallback = Callable[[TransactionEvent], Any]
+# Called with the id of a transaction stuck past the timeout, returns the id of its replacement or None
+Resubmit = Callable[[str], Optional[str]]
+# Block number and success of included transactions, success is None when the block does not tell it
+Inclusions = Dict[str, Tuple[int, Optional[bool]]]
+
+
+class _Pending:
+    def __init__(self, txid: str, future: Future) -> None:
+        self.txid = txid
+        self.future = future
+        self.added = time.monotonic()
+        self.block_number: Optional[int] = None
+        self.success: Optional[bool] = None
+        self.looked_up = False
+        self.stuck_since: Optional[float] = None
+
+
+class _EvmSource:
+    # Blocks may be reorganized, the receipt is read again when a transaction reaches its confirmations
+    verify_on_confirm = True
+
+    def __init__(self, rpc: Any) -> None:
+        self.rpc = rpc
+
+    @staticmethod
+    def normalize(txid: str) -> str:
+        txid = txid.lower()
+        return txid if txid.startswith('0x') else f'0x{txid}'
+
+    def head(self) -> int:
+        return self.rpc.get_block_number()
+
+    def lookup(self, txids: List[str]) -> Inclusions:
+        results = self.rpc.call_many([('eth_getTransactionReceipt', [txid]) for txid in txids])
+        inclusions = {}
+        for txid, receipt in zip(txids, results):
+            if isinstance(receipt, dict) and receipt.get('blockNumber'):
+                inclusions[txid] = (int(receipt['blockNumber'], 16), receipt.get('status') == '0x1')
+        return inclusions
+
+    def scan(self, start: int, end: int, txids: Set[str]) -> Tuple[Inclusions, int]:
+        results = self.rpc.call_many([('eth_getBlockByNumber', [hex(block), False]) for block in range(start, end + 1)])
+        inclusions = {}
+        last_block = start - 1
+        for block in results:
+            if not isinstance(block, dict):
+                break
+            last_block = int(block['number'], 16)
+            for txid in block.get('transactions', []):
+                if txid.lower() in txids:
+                    inclusions[txid.lower()] = (last_block, None)
+        return inclusions, last_block
+
+    def known(self, txids: List[str]) -> Set[str]:
+        results = self.rpc.call_many([('eth_getTransactionByHash', [txid]) for txid in txids])
+        return {txid for txid, transaction in zip(txids, results) if isinstance(transaction, dict)}
+
+
+class _TronSource:
+    # Blocks carry the result of every transaction and are not reorganized after solidification
+    verify_on_confirm = False
+
+    def __init__(self, rpc: Any, max_block_range: int = 100) -> None:
+        self.rpc = rpc
+        self.max_block_range = max_block_range
+
+    @staticmethod
+    def normalize(txid: str) -> str:
+        txid = txid.lower()
+        return txid[2:] if txid.startswith('0x') else txid
+
+    def head(self) -> int:
+        return self.rpc.get_block_number()
+
+    def lookup(self, txids: List[str]) -> Inclusions:
+        inclusions = {}
+        for txid in txids:
+            info = self.rpc.get_transaction_info(txid)
+            if info and 'blockNumber' in info:
+                failed = info.get('result') == 'FAILED' or info.get('receipt', {}).get('result', 'SUCCESS') != 'SUCCESS'
+                inclusions[txid] = (info['blockNumber'], not failed)
+        return inclusions
+
+    def scan(self, start: int, end: int, txids: Set[str]) -> Tuple[Inclusions, int]:
+        inclusions = {}
+        last_block = start - 1
+        for range_start in range(start, end + 1, self.max_block_range):
+            blocks = self.rpc.get_blocks(range_start, min(range_start + self.max_block_range - 1, end))
+            for block in blocks:
+                number = block['block_header']['raw_data'].get('number', 0)
+                if number != last_block + 1:
+                    return inclusions, last_block
+                last_block = number
+                for transaction in block.get('transactions', []):
+                    if transaction['txID'] in txids:
+                        result = (transaction.get('ret') or [{}])[0].get('contractRet', 'SUCCESS')
+                        inclusions[transaction['txID']] = (number, result == 'SUCCESS')
+            if last_block < min(range_start + self.max_block_range - 1, end):
+                break
+        return inclusions, last_block
+
+    def known(self, txids: List[str]) -> Set[str]:
+        return {txid for txid in txids if self.rpc.get_transaction(txid)}
+
+
+class ConfirmationTracker:
+    def __init__(self,
+                 rpc: Any,
+                 confirmations: int = 12,
+                 timeout: float = 600,
+                 poll_interval: float = 3,
+                 resubmit: Optional[Resubmit] = None,
+                 on_event: Optional[EventCallback] = None,
+                 max_blocks_per_poll: int = 100,
+                 stuck_timeout: float = 3600) -> None:
+        """
+        Tracks many sent transactions by following new blocks once for all of them. Every block is matched against
+        the set of pending transaction ids, instead of requesting the receipt of every transaction on every block.
+
+        Every tracked transaction ends with one final event: confirmed or failed after the given number of
+        confirmations, or dropped when it is past the timeout and the node no longer knows it. A transaction past the
+        timeout that is still known is reported as stuck once, or replaced if resubmit returns a new transaction id. A
+        stuck transaction still out of blocks after stuck_timeout is dropped.
+
+        :param rpc: EvmJsonRPC or TronJsonRPC client of the network
+        :param confirmations: the number of blocks, including the block of the transaction, before it is final
+        :param timeout: seconds a transaction may stay out of blocks before it is dropped, stuck or resubmitted
+        :param poll_interval: seconds between polls of the background thread
+        :param resubmit: called with the id of a transaction past the timeout, returns the id of its replacement or
+            None. The future and the callbacks of the transaction move to the replacement.
+        :param on_event: called with every event, in the polling thread
+        :param max_blocks_per_poll: the maximum number of blocks read by one poll, the rest is read by the next polls
+        :param stuck_timeout: seconds a stuck transaction is tracked before it is dropped
+        """
+        # TronJsonRPC reads blocks in ranges, EvmJsonRPC in batches of single blocks
+        self._source = _TronSource(rpc) if hasattr(rpc, 'get_blocks') else _EvmSource(rpc)
+        self.confirmations = confirmations
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.resubmit = resubmit
+        self.max_blocks_per_poll = max_blocks_per_poll
+        self.stuck_timeout = stuck_timeout
+        self._callbacks: List[EventCallback] = [on_event] if on_event is not None else []
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self._pending: Dict[str, _Pending] = {}
+        self._last_block: Optional[int] = None
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def track(self, txid: str) -> Future:
+        """
+        Start tracking the transaction
+
+        :param txid: transaction id returned by a send method
+        :return: a future resolved with the final event of the transaction, use asyncio.wrap_future to await it
+        """
+        txid = self._source.normalize(txid)
+        with self._lock:
+            pending = self._pending.get(txid)
+            if pending is None:
+                pending = self._pending[txid] = _Pending(txid, Future())
+            return pending.future
+
+    def track_many(self, txids: Iterable[str]) -> List[Future]:
+        """
+        :param txids: transaction ids returned by send methods
+        :return: a future of every transaction
+        """
+        return [self.track(txid) for txid in txids]
+
+    def add_callback(self, callback: EventCallback) -> None:
+        """
+        :param callback: called with every event, in the polling thread
+        """
+        self._callbacks.append(callback)
+
+    async def events(self) -> AsyncIterator[TransactionEvent]:
+        """
+        Iterate over the events emitted after the iteration started, the tracker must be polled by start or poll
+
+        :return: an endless async iterator over the events
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        subscriber = (asyncio.get_running_loop(), queue)
+        self._subscribers.append(subscriber)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers.remove(subscriber)
+
+    def start(self) -> None:
+        """
+        Poll in a background thread until stop is called
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='ipnpy-confirmation-tracker', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def poll(self) -> List[TransactionEvent]:
+        """
+        Read the new blocks once and emit the events of the pending transactions
+
+        :return: the emitted events
+        """
+        events: List[TransactionEvent] = []
+        try:
+            with self._poll_lock:
+                self._poll(events)
+        finally:
+            # Finished transactions are no longer pending, their events are emitted even if a later step failed
+            for event in events:
+                self._emit(event)
+        return events
+
+    def _poll(self, events: List[TransactionEvent]) -> None:
+        head = self._source.head()
+        with self._lock:
+            new = [pending.txid for pending in self._pending.values() if not pending.looked_up]
+
+        # Transactions may be in blocks read before they were tracked
+        inclusions = self._source.lookup(new) if new else {}
+        with self._lock:
+            for txid in new:
+                if txid in self._pending:
+                    self._pending[txid].looked_up = True
+
+        if self._last_block is None:
+            self._last_block = head
+        elif head > self._last_block:
+            with self._lock:
+                waiting = {txid for txid, pending in self._pending.items() if pending.block_number is None}
+            end = min(head, self._last_block + self.max_blocks_per_poll)
+            scanned, self._last_block = self._source.scan(self._last_block + 1, end, waiting)
+            inclusions.update(scanned)
+
+        with self._lock:
+            for txid, (block_number, success) in inclusions.items():
+                pending = self._pending.get(txid)
+                if pending is not None:
+                    pending.block_number, pending.success = block_number, success
+
+        events.extend(self._confirm(head))
+        events.extend(self._check_timeouts())
+
+    def _confirm(self, head: int) -> List[TransactionEvent]:
+        with self._lock:
+            ready = [pending for pending in self._pending.values()
+                     if pending.block_number is not None and head - pending.block_number + 1 >= self.confirmations]
+        if not ready:
+            return []
+
+        if self._source.verify_on_confirm or any(pending.success is None for pending in ready):
+            receipts = self._source.lookup([pending.txid for pending in ready])
+            for pending in ready:
+                pending.block_number, pending.success = receipts.get(pending.txid, (None, None))
+                if pending.block_number is None:
+                    # Reorganized out of its block, it may come back in a block already read, so look it up again
+                    pending.looked_up = False
+
+        events = []
+        for pending in ready:
+            if pending.block_number is None or head - pending.block_number + 1 < self.confirmations:
+                continue
+            status = TransactionStatus.CONFIRMED if pending.success else TransactionStatus.FAILED
+            events.append(self._finish(pending, status, head))
+        return events
+
+    def _check_timeouts(self) -> List[TransactionEvent]:
+        now = time.monotonic()
+        with self._lock:
+            waiting = [pending for pending in self._pending.values() if pending.block_number is None]
+        expired = [pending for pending in waiting if pending.stuck_since is None and now - pending.added > self.timeout]
+        abandoned = [pending for pending in waiting
+                     if pending.stuck_since is not None and now - pending.stuck_since > self.stuck_timeout]
+
+        events = [self._finish(pending, TransactionStatus.DROPPED, None) for pending in abandoned]
+        if not expired:
+            return events
+
+        try:
+            known = self._source.known([pending.txid for pending in expired])
+        except Exception as error:
+            # Checked again by the next poll
+            logger.warning('Lookup of %d transactions past the timeout failed: %r', len(expired), error)
+            return events
+
+        for pending in expired:
+            try:
+                replacement = self.resubmit(pending.txid) if self.resubmit is not None else None
+            except Exception:
+                logger.exception('Resubmit of %s failed, retried by the next poll', pending.txid)
+                continue
+
+            if replacement is not None:
+                events.append(self._replace(pending, self._source.normalize(replacement)))
+            elif pending.txid not in known:
+                events.append(self._finish(pending, TransactionStatus.DROPPED, None))
+            else:
+                pending.stuck_since = now
+                events.append(TransactionEvent(pending.txid, TransactionStatus.STUCK))
+        return events
+
+    def _finish(self, pending: _Pending, status: TransactionStatus, head: Optional[int]) -> TransactionEvent:
+        confirmations = head - pending.block_number + 1 if head is not None and pending.block_number is not None else 0
+        event = TransactionEvent(pending.txid, status, pending.block_number, confirmations)
+        with self._lock:
+            self._pending.pop(pending.txid, None)
+        # The caller may have cancelled the future while waiting for it
+        if not pending.future.done():
+            pending.future.set_result(event)
+        return event
+
+    def _replace(self, pending: _Pending, replacement: str) -> TransactionEvent:
+        with self._lock:
+            self._pending.pop(pending.txid, None)
+            self._pending[replacement] = _Pending(replacement, pending.future)
+        return TransactionEvent(pending.txid, TransactionStatus.REPLACED, replaced_by=replacement)
+
+    def _emit(self, event: TransactionEvent) -> None:
+        # A failing callback or a closed loop does not take the event from the others
+        for callback in self._callbacks:
+            try:
+                callback(event)
+            except Exception:
+                logger.exception('Callback failed for the event of the transaction %s', event.txid)
+        for loop, queue in list(self._subscribers):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                logger.warning('Event of the transaction %s not delivered to a closed event loop', event.txid)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as error:
+                # Network errors are retried by the next poll
+                logger.warning('Polling the confirmations failed: %r', error)
+            self._stop.wait(self.poll_interval)
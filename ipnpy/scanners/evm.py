@@ -0,0 +1,206 @@
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ipnpy.contracts.eth.abi import TRANSFER_TOPIC
+from ipnpy.exceptions import ConnectionError
+from ipnpy.rpc.evm import EvmJsonRPC
+from ipnpy.scanners.checkpoint import FileCheckpoint
+from ipnpy.schemes.webhook import LogERC20, LogNative, ScannedLog
+
+
+class EvmTransferScanner:
+    def __init__(self,
+                 rpc: EvmJsonRPC,
+                 network: str,
+                 addresses: Iterable[str],
+                 contract_addresses: Optional[Iterable[str]] = None,
+                 native: bool = False,
+                 checkpoint: Optional[FileCheckpoint] = None,
+                 block_range: int = 1000,
+                 min_block_range: int = 1,
+                 max_block_range: int = 10_000,
+                 target_logs: int = 2000,
+                 topic_chunk_size: int = 500,
+                 confirmations: int = 0,
+                 native_batch_size: int = 20) -> None:
+        """
+        Scans blocks for ERC20 Transfer events and native transfers of the watched addresses. Logs are read with
+        eth_getLogs filtered by the sender and recipient topics, all filters of a block range go in one batch request.
+        The range shrinks when the provider rejects a request or returns too many logs and grows while results are
+        small. Blocks read for native transfers are fetched in separate batches of native_batch_size, so a large range
+        does not hold the transactions of all its blocks at once.
+
+        :param rpc: client of the network
+        :param network: network name put in the scanned logs, as in webhooks
+        :param addresses: watched wallet addresses
+        :param contract_addresses: if set, only transfers of these tokens are scanned
+        :param native: if True, the transactions of every block are read to find native transfers, which costs a
+            full block read per block
+        :param checkpoint: if set, the last scanned block is saved after every range and scanning resumes after it
+        :param block_range: the initial number of blocks per eth_getLogs request
+        :param min_block_range: the smallest block range before a failing request is raised
+        :param max_block_range: the largest block range
+        :param target_logs: ranges returning more logs than this are shrunk
+        :param topic_chunk_size: the maximum number of addresses in one topic filter
+        :param confirmations: blocks behind the latest one that are not scanned yet
+        :param native_batch_size: the number of blocks with transactions read in one batch request
+        """
+        self.rpc = rpc
+        self.network = network
+        self.addresses = {address.lower() for address in addresses}
+        self.contract_addresses = [address.lower() for address in contract_addresses] if contract_addresses else None
+        self.native = native
+        self.checkpoint = checkpoint
+        self.block_range = block_range
+        self.min_block_range = min_block_range
+        self.max_block_range = max_block_range
+        self.target_logs = target_logs
+        self.topic_chunk_size = topic_chunk_size
+        self.confirmations = confirmations
+        self.native_batch_size = native_batch_size
+        self._topics = self._address_topics()
+
+    def scan(self, from_block: Optional[int] = None, to_block: Optional[int] = None) -> Iterator[ScannedLog]:
+        """
+        Scan the blocks in order. The checkpoint is saved once all logs of a range were consumed, so a restart
+        repeats at most one range.
+
+        :param from_block: the first block, the block after the checkpoint takes precedence if it is saved
+        :param to_block: the last block, the latest block minus confirmations by default
+        :return: an iterator over the transfers in the order of the blocks
+        """
+        start = self._start_block(from_block)
+        if to_block is None:
+            to_block = self.rpc.get_block_number() - self.confirmations
+
+        while start <= to_block:
+            end = min(start + self.block_range - 1, to_block)
+            try:
+                logs = self._scan_range(start, end)
+            except ConnectionError:
+                if end == start or self.block_range <= self.min_block_range:
+                    raise
+                self.block_range = max(self.min_block_range, self.block_range // 2)
+                continue
+
+            yield from logs
+            if self.checkpoint is not None:
+                self.checkpoint.save(end)
+            self._adapt_range(len(logs))
+            start = end + 1
+
+    def follow(self, from_block: Optional[int] = None, poll_interval: float = 5) -> Iterator[ScannedLog]:
+        """
+        Scan the blocks and keep scanning new ones as they are produced
+
+        :param from_block: the first block, the block after the checkpoint takes precedence if it is saved
+        :param poll_interval: seconds between checks for new blocks
+        :return: an endless iterator over the transfers
+        """
+        start = self._start_block(from_block)
+        while True:
+            to_block = self.rpc.get_block_number() - self.confirmations
+            if to_block >= start:
+                for log in self.scan(start, to_block):
+                    yield log
+                start = to_block + 1
+            time.sleep(poll_interval)
+
+    def _start_block(self, from_block: Optional[int]) -> int:
+        saved = self.checkpoint.load() if self.checkpoint is not None else None
+        if saved is not None:
+            return saved + 1
+        if from_block is None:
+            raise ValueError('from_block is required without a saved checkpoint')
+        return from_block
+
+    def _scan_range(self, start: int, end: int) -> List[ScannedLog]:
+        calls = [('eth_getLogs', [log_filter]) for log_filter in self._filters(start, end)]
+        logs: Dict[Tuple[int, int], ScannedLog] = {}
+        for raw_logs in self._call_many(start, end, calls):
+            for raw_log in raw_logs:
+                scanned = self._parse_log(raw_log)
+                if scanned is not None:
+                    # A transfer between two watched addresses matches both the sender and the recipient filters
+                    logs[(scanned.block_number, scanned.log_index)] = scanned
+
+        scanned_logs = [logs[key] for key in sorted(logs)]
+        if self.native:
+            for batch_start in range(start, end + 1, self.native_batch_size):
+                batch_end = min(batch_start + self.native_batch_size - 1, end)
+                numbers = list(range(batch_start, batch_end + 1))
+                calls = [('eth_getBlockByNumber', [hex(number), True]) for number in numbers]
+                for number, block in zip(numbers, self._call_many(start, end, calls, numbers)):
+                    if block is None:
+                        raise ConnectionError(f'Block {number} is not available yet')
+                    scanned_logs.extend(self._parse_block(block))
+
+        scanned_logs.sort(key=lambda scanned: scanned.block_number)
+        return scanned_logs
+
+    def _call_many(self,
+                   start: int,
+                   end: int,
+                   calls: List[Tuple[str, list]],
+                   blocks: Optional[List[int]] = None) -> List[Any]:
+        results = self.rpc.call_many(calls)
+        for index, result in enumerate(results):
+            if isinstance(result, Exception):
+                # Calls of one block report the block, log queries cover the whole range
+                if blocks is not None:
+                    raise ConnectionError(f'Block {blocks[index]} could not be scanned: {result}')
+                raise ConnectionError(f'Blocks {start}-{end} could not be scanned: {result}')
+        return results
+
+    def _filters(self, start: int, end: int) -> List[Dict[str, Any]]:
+        filters = []
+        for topics in self._topics:
+            for position in (1, 2):
+                log_filter = {
+                    'fromBlock': hex(start),
+                    'toBlock': hex(end),
+                    'topics': [TRANSFER_TOPIC, topics, None] if position == 1 else [TRANSFER_TOPIC, None, topics],
+                }
+                if self.contract_addresses:
+                    log_filter['address'] = self.contract_addresses
+                filters.append(log_filter)
+        return filters
+
+    def _parse_log(self, raw_log: Dict[str, Any]) -> Optional[ScannedLog]:
+        topics = raw_log.get('topics', [])
+        # Transfer events of ERC721 index the token id as the fourth topic and have no data
+        if raw_log.get('removed') or len(topics) != 3 or topics[0] != TRANSFER_TOPIC:
+            return None
+
+        data = raw_log.get('data') or '0x'
+        log = LogERC20.model_validate({
+            'from': '0x' + topics[1][-40:],
+            'to': '0x' + topics[2][-40:],
+            'value': str(int(data, 16) if data != '0x' else 0),
+            'address': raw_log['address'].lower(),
+            'topic': TRANSFER_TOPIC,
+        })
+        return ScannedLog(self.network, int(raw_log['blockNumber'], 16), raw_log['transactionHash'],
+                          int(raw_log['logIndex'], 16), log)
+
+    def _parse_block(self, block: Dict[str, Any]) -> List[ScannedLog]:
+        scanned_logs = []
+        block_number = int(block['number'], 16)
+        for transaction in block.get('transactions', []):
+            from_address = (transaction.get('from') or '').lower()
+            to_address = (transaction.get('to') or '').lower()
+            value = int(transaction.get('value') or '0x0', 16)
+            if value and (from_address in self.addresses or to_address in self.addresses):
+                log = LogNative.model_validate({'from': from_address, 'to': to_address, 'value': str(value)})
+                scanned_logs.append(ScannedLog(self.network, block_number, transaction['hash'], None, log))
+        return scanned_logs
+
+    def _address_topics(self) -> List[List[str]]:
+        topics = ['0x' + address[2:].rjust(64, '0') for address in sorted(self.addresses)]
+        return [topics[start:start + self.topic_chunk_size] for start in range(0, len(topics), self.topic_chunk_size)]
+
+    def _adapt_range(self, log_count: int) -> None:
+        if log_count > self.target_logs:
+            self.block_range = max(self.min_block_range, self.block_range // 2)
+        elif log_count < self.target_logs // 4:
+            self.block_range = min(self.max_block_range, self.block_range * 2)
@@ -0,0 +1,183 @@
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ipnpy.contracts.eth.abi import TRANSFER_TOPIC
+from ipnpy.exceptions import ConnectionError
+from ipnpy.rpc.tron import TronJsonRPC
+from ipnpy.scanners.checkpoint import FileCheckpoint
+from ipnpy.schemes.webhook import LogERC20, LogNative, ScannedLog
+from ipnpy.utils.address import to_tron_base58, to_tron_hex_many
+
+# The largest range returned by wallet/getblockbylimitnext
+MAX_BLOCK_RANGE = 100
+
+TRANSFER_SELECTOR = 'a9059cbb'
+TRANSFER_FROM_SELECTOR = '23b872dd'
+
+
+class TronTransferScanner:
+    def __init__(self,
+                 rpc: TronJsonRPC,
+                 addresses: Iterable[str],
+                 contract_addresses: Optional[Iterable[str]] = None,
+                 network: str = 'tron',
+                 checkpoint: Optional[FileCheckpoint] = None,
+                 block_range: int = MAX_BLOCK_RANGE,
+                 fetch_workers: int = 4,
+                 prefetch: int = 8,
+                 confirmations: int = 0) -> None:
+        """
+        Scans tron blocks for TRX transfers and TRC20 transfer and transferFrom calls of the watched addresses. Block
+        ranges are fetched ahead on a thread pool while the blocks already fetched are decoded, so the network and the
+        decoding overlap.
+
+        :param rpc: client of the network
+        :param addresses: watched wallet addresses, base58 or hex
+        :param contract_addresses: if set, only calls of these TRC20 contracts are decoded
+        :param network: network name put in the scanned logs, as in webhooks
+        :param checkpoint: if set, the last scanned block is saved after every range and scanning resumes after it
+        :param block_range: the number of blocks per request, at most 100
+        :param fetch_workers: the number of ranges fetched concurrently
+        :param prefetch: the maximum number of fetched ranges waiting to be decoded
+        :param confirmations: blocks behind the latest one that are not scanned yet
+        """
+        self.rpc = rpc
+        self.network = network
+        self.addresses = set(to_tron_hex_many(addresses))
+        self.contract_addresses = set(to_tron_hex_many(contract_addresses)) if contract_addresses else None
+        self.checkpoint = checkpoint
+        self.block_range = min(block_range, MAX_BLOCK_RANGE)
+        self.fetch_workers = fetch_workers
+        self.prefetch = max(prefetch, fetch_workers)
+        self.confirmations = confirmations
+
+    def scan(self, from_block: Optional[int] = None, to_block: Optional[int] = None) -> Iterator[ScannedLog]:
+        """
+        Scan the blocks in order. The checkpoint is saved once all transfers of a range were consumed, so a restart
+        repeats at most one range.
+
+        :param from_block: the first block, the block after the checkpoint takes precedence if it is saved
+        :param to_block: the last block, the latest block minus confirmations by default
+        :return: an iterator over the transfers in the order of the blocks
+        """
+        start = self._start_block(from_block)
+        if to_block is None:
+            to_block = self.rpc.get_block_number() - self.confirmations
+
+        ranges = iter([(block, min(block + self.block_range - 1, to_block))
+                       for block in range(start, to_block + 1, self.block_range)])
+        with ThreadPoolExecutor(self.fetch_workers, thread_name_prefix='ipnpy-tron-scanner') as executor:
+            in_flight: Deque[Tuple[int, int, Future]] = deque()
+            try:
+                for range_start, range_end in ranges:
+                    in_flight.append((range_start, range_end, executor.submit(self._fetch, range_start, range_end)))
+                    if len(in_flight) >= self.prefetch:
+                        break
+
+                while in_flight:
+                    range_start, range_end, future = in_flight.popleft()
+                    blocks = future.result()
+                    next_range = next(ranges, None)
+                    if next_range is not None:
+                        in_flight.append((*next_range, executor.submit(self._fetch, *next_range)))
+
+                    for block in blocks:
+                        yield from self.decode_block(block)
+                    if self.checkpoint is not None:
+                        self.checkpoint.save(range_end)
+            finally:
+                for _, _, future in in_flight:
+                    future.cancel()
+
+    def follow(self, from_block: Optional[int] = None, poll_interval: float = 3) -> Iterator[ScannedLog]:
+        """
+        Scan the blocks and keep scanning new ones as they are produced
+
+        :param from_block: the first block, the block after the checkpoint takes precedence if it is saved
+        :param poll_interval: seconds between checks for new blocks
+        :return: an endless iterator over the transfers
+        """
+        start = self._start_block(from_block)
+        while True:
+            to_block = self.rpc.get_block_number() - self.confirmations
+            if to_block >= start:
+                yield from self.scan(start, to_block)
+                start = to_block + 1
+            time.sleep(poll_interval)
+
+    def decode_block(self, block: Dict[str, Any]) -> List[ScannedLog]:
+        """
+        Find the transfers of the watched addresses in a block returned by the node with hex addresses
+
+        :param block: the block
+        :return: the transfers in the order of the transactions
+        """
+        scanned_logs = []
+        block_number = block['block_header']['raw_data'].get('number', 0)
+        for transaction in block.get('transactions', []):
+            result = transaction.get('ret') or [{}]
+            if result[0].get('contractRet', 'SUCCESS') != 'SUCCESS':
+                continue
+
+            for contract in transaction['raw_data'].get('contract', []):
+                value = contract['parameter']['value']
+                if contract['type'] == 'TransferContract':
+                    log = self._decode_native(value)
+                elif contract['type'] == 'TriggerSmartContract':
+                    log = self._decode_trc20(value)
+                else:
+                    continue
+                if log is not None:
+                    scanned_logs.append(ScannedLog(self.network, block_number, transaction['txID'], None, log))
+        return scanned_logs
+
+    def _fetch(self, start: int, end: int) -> List[dict]:
+        blocks = self.rpc.get_blocks(start, end)
+        if len(blocks) != end - start + 1:
+            raise ConnectionError(f'Blocks {start}-{end} are not available yet, got {len(blocks)}')
+        return blocks
+
+    def _decode_native(self, value: Dict[str, Any]) -> Optional[LogNative]:
+        from_address, to_address = value.get('owner_address', ''), value.get('to_address', '')
+        if from_address not in self.addresses and to_address not in self.addresses:
+            return None
+        return LogNative.model_validate({
+            'from': to_tron_base58(from_address),
+            'to': to_tron_base58(to_address),
+            'value': str(value.get('amount', 0)),
+        })
+
+    def _decode_trc20(self, value: Dict[str, Any]) -> Optional[LogERC20]:
+        data = value.get('data', '')
+        contract_address = value.get('contract_address', '')
+        if self.contract_addresses is not None and contract_address not in self.contract_addresses:
+            return None
+
+        selector = data[:8]
+        if selector == TRANSFER_SELECTOR and len(data) >= 136:
+            from_address, to_address, amount = value.get('owner_address', ''), '41' + data[32:72], data[72:136]
+        elif selector == TRANSFER_FROM_SELECTOR and len(data) >= 200:
+            from_address, to_address, amount = '41' + data[32:72], '41' + data[96:136], data[136:200]
+        else:
+            return None
+
+        if from_address not in self.addresses and to_address not in self.addresses:
+            return None
+        return LogERC20.model_validate({
+            'from': to_tron_base58(from_address),
+            'to': to_tron_base58(to_address),
+            'value': str(int(amount, 16)),
+            'address': to_tron_base58(contract_address),
+            'topic': TRANSFER_TOPIC,
+        })
+
+    def _start_block(self, from_block: Optional[int]) -> int:
+        saved = self.checkpoint.load() if self.checkpoint is not None else None
+        if saved is not None:
+            return saved + 1
+        if from_block is None:
+            raise ValueError('from_block is required without a saved checkpoint')
+        return from_block
+
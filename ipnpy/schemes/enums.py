@@ -11,3 +11,25 @@ class WebhookEventType(Enum):
 
     def __str__(self) -> str:
         return self.value
+
+
+class TransactionStatus(Enum):
+    CONFIRMED = "confirmed"
+    FAILED = "failed"
+    DROPPED = "dropped"
+    STUCK = "stuck"
+    REPLACED = "replaced"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+class OutboxStatus(Enum):
+    QUEUED = "queued"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+    EXPIRED = "expired"
+
+    def __str__(self) -> str:
+        return self.value
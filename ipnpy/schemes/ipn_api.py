@@ -1,10 +1,10 @@
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 
 
 @dataclass
 class Wallet:
-    private_key: str
+    private_key: Optional[str]
     tron_address: str
     eth_address: str
 
@@ -13,3 +13,13 @@ class Wallet:
 class AddressList:
     name: str
     addresses: List[str]
+
+
+@dataclass
+class SyncReport:
+    added: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    replaced: bool = False
+    requests: int = 0
+    bytes_sent: int = 0
+    errors: Dict[str, str] = field(default_factory=dict)
@@ -0,0 +1,168 @@
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from ipnpy.schemes.enums import OutboxStatus, TransactionStatus
+
+
+@dataclass
+class Balance:
+    address: str
+    contract_address: Optional[str]
+    balance: Optional[Union[int, float]]
+    error: Optional[str] = None
+
+
+@dataclass
+class Transfer:
+    private_key: str
+    from_address: str
+    to_address: str
+    amount: int
+    contract_address: Optional[str] = None
+
+
+@dataclass
+class TransferResult:
+    transfer: Transfer
+    txid: Optional[str]
+    error: Optional[str] = None
+
+
+@dataclass
+class SignedTransfer:
+    transfer: Transfer
+    txid: Optional[str]
+    raw_transaction: Optional[str]
+    sender: Optional[str] = None
+    nonce: Optional[int] = None
+    expires: Optional[float] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class OutboxEntry:
+    id: int
+    network: str
+    txid: str
+    raw_transaction: str
+    sender: Optional[str]
+    nonce: Optional[int]
+    status: OutboxStatus
+    attempts: int = 0
+    error: Optional[str] = None
+    created: float = 0.0
+    updated: float = 0.0
+    expires: Optional[float] = None
+    reference: Optional[str] = None
+
+
+@dataclass
+class TransactionEvent:
+    txid: str
+    status: TransactionStatus
+    block_number: Optional[int] = None
+    confirmations: int = 0
+    replaced_by: Optional[str] = None
+
+
+@dataclass
+class FeeData:
+    chain_id: int
+    base_fee: Optional[int] = None
+    max_priority_fee: Optional[int] = None
+    max_fee: Optional[int] = None
+    gas_price: Optional[int] = None
+
+
+@dataclass
+class CallRecord:
+    client: str
+    method: str
+    endpoint: Optional[str] = None
+    started: float = 0.0
+    duration: float = 0.0
+    request_bytes: int = 0
+    response_bytes: int = 0
+    error: Optional[BaseException] = None
+
+
+# Size in bytes of one raw amount in PortfolioSnapshot.amounts, big-endian uint256
+AMOUNT_SIZE = 32
+
+
+@dataclass
+class PortfolioSnapshot:
+    """
+    Balances of the wallets (rows) in the assets (columns), stored by column: the cell of row r in column c is
+    number c * len(wallets) + r. Raw amounts are exact 32-byte big-endian integers in amounts, the time of the last
+    successful read of every cell is in updated, 0 for cells never read.
+    """
+    wallets: List[str]
+    assets: List[Tuple[str, Optional[str]]]
+    amounts: bytearray
+    updated: array
+    errors: Dict[Tuple[int, int], str] = field(default_factory=dict)
+
+    @classmethod
+    def empty(cls, wallets: List[str], assets: List[Tuple[str, Optional[str]]]) -> 'PortfolioSnapshot':
+        cells = len(wallets) * len(assets)
+        return cls(wallets, assets, bytearray(cells * AMOUNT_SIZE), array('d', bytes(cells * 8)))
+
+    def column_index(self, network: str, token: Optional[str] = None) -> int:
+        """
+        :return: the column of the asset, the native currency if the token is None
+        """
+        return self.assets.index((network, token))
+
+    def get(self, row: int, column: int) -> Optional[int]:
+        """
+        :return: the raw amount of the cell, None if it was never read
+        """
+        cell = column * len(self.wallets) + row
+        if not self.updated[cell]:
+            return None
+        return int.from_bytes(self.amounts[cell * AMOUNT_SIZE:(cell + 1) * AMOUNT_SIZE], 'big')
+
+    def set(self, row: int, column: int, amount: int, updated: float) -> None:
+        cell = column * len(self.wallets) + row
+        self.amounts[cell * AMOUNT_SIZE:(cell + 1) * AMOUNT_SIZE] = amount.to_bytes(AMOUNT_SIZE, 'big')
+        self.updated[cell] = updated
+        self.errors.pop((row, column), None)
+
+    def column(self, network: str, token: Optional[str] = None) -> List[Optional[int]]:
+        """
+        :return: the raw amounts of every wallet in the asset, None for cells never read
+        """
+        column = self.column_index(network, token)
+        return [self.get(row, column) for row in range(len(self.wallets))]
+
+    def total(self, network: str, token: Optional[str] = None) -> int:
+        """
+        :return: the sum of the raw amounts of the wallets in the asset
+        """
+        return sum(amount or 0 for amount in self.column(network, token))
+
+    def stale_rows(self, column: int, max_age: Optional[float], now: float) -> List[int]:
+        """
+        :return: rows of the column never read, failed on the last read or read before now - max_age, every row if
+            max_age is None
+        """
+        rows = len(self.wallets)
+        if max_age is None:
+            return list(range(rows))
+        limit = now - max_age
+        return [
+            row for row in range(rows)
+            if self.updated[column * rows + row] <= limit or (row, column) in self.errors
+        ]
+
+    def to_numpy(self) -> Any:
+        """
+        :return: a NumPy uint8 array of shape (assets, wallets, 32) sharing the memory of amounts, the raw amounts
+            stay exact. Requires numpy.
+        """
+        import numpy
+
+        return numpy.frombuffer(self.amounts, dtype=numpy.uint8).reshape(len(self.assets), len(self.wallets),
+                                                                         AMOUNT_SIZE)
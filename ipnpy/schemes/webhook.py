@@ -1,6 +1,8 @@
-from typing import List, Union
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Annotated, Any, Dict, Iterable, List, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Discriminator, Field, Tag, TypeAdapter, ValidationError
 
 from ipnpy.schemes.enums import WebhookEventType
 
@@ -19,6 +21,18 @@ class LogNative(BaseModel):
     value: str
 
 
+def _log_kind(value: Any) -> str:
+    if isinstance(value, dict):
+        return 'erc20' if 'address' in value else 'native'
+    return 'erc20' if isinstance(value, LogERC20) else 'native'
+
+
+# Logs tagged by the presence of the contract address, so every log is validated by one model
+Log = Annotated[
+    Union[Annotated[LogERC20, Tag('erc20')], Annotated[LogNative, Tag('native')]],
+    Discriminator(_log_kind),
+]
+
 class Info(BaseModel):
     project: str
     type: WebhookEventType
@@ -29,11 +43,85 @@ class Info(BaseModel):
     telegram: bool
 
 
-class WebhookData(BaseModel):
+class _WebhookFields(BaseModel):
+    # Without a custom constructor pydantic-core builds the model directly, WebhookData overrides __init__ and
+    # is validated through this class
+    model_config = ConfigDict(title='WebhookData')
+
     hash: str
     network: str
     info: Info
-    logs: List[Union[LogERC20, LogNative]]
+    logs: List[Log]
+
+
+class WebhookData(_WebhookFields):
+    def __init__(self, data: Optional[dict] = None, **kwargs) -> None:
+        super().__init__(**(data or {}), **kwargs)
+
+    @classmethod
+    def model_validate(cls, obj: Any, **kwargs) -> 'WebhookData':
+        return cls._from_fields(_WebhookFields.model_validate(obj, **kwargs))
+
+    @classmethod
+    def model_validate_json(cls, json_data: Union[str, bytes, bytearray], **kwargs) -> 'WebhookData':
+        return cls._from_fields(_WebhookFields.model_validate_json(json_data, **kwargs))
+
+    @classmethod
+    def _from_fields(cls, fields: _WebhookFields) -> 'WebhookData':
+        # WebhookData adds only the constructor, so the validated instance is retyped instead of copied
+        fields.__class__ = cls
+        return fields
+
+    @classmethod
+    def from_json(cls, raw: Union[str, bytes]) -> 'WebhookData':
+        """
+        Parse the webhook straight from the request body, without json.loads
+
+        :param raw: JSON body of the webhook request
+        :return: the parsed webhook
+        """
+        return cls.model_validate_json(raw)
+
+    @classmethod
+    def from_json_list(cls, raw: Union[str, bytes]) -> List['WebhookData']:
+        """
+        Parse a JSON array of webhooks in one pass
+
+        :param raw: JSON array of webhook bodies
+        :return: the parsed webhooks
+        """
+        return [cls._from_fields(fields) for fields in _batch_adapter().validate_json(raw)]
+
+    @classmethod
+    def parse_many(
+            cls, payloads: Iterable[Union[str, bytes, Dict[str, Any]]]) -> List[Union['WebhookData', ValidationError]]:
+        """
+        Parse many webhooks, one invalid payload does not fail the others
+
+        :param payloads: raw JSON bodies or already decoded dicts
+        :return: the parsed webhooks, or the validation errors of invalid payloads, in the order of the payloads
+        """
+        results = []
+        for payload in payloads:
+            try:
+                if isinstance(payload, dict):
+                    results.append(cls.model_validate(payload))
+                else:
+                    results.append(cls.model_validate_json(payload))
+            except ValidationError as error:
+                results.append(error)
+        return results
+
+
+@dataclass
+class ScannedLog:
+    network: str
+    block_number: int
+    transaction_hash: str
+    log_index: Optional[int]
+    log: Union[LogERC20, LogNative]
+
 
-    def __init__(self, data: dict, **kwargs) -> None:
-        super().__init__(**data, **kwargs)
+@lru_cache(maxsize=None)
+def _batch_adapter() -> TypeAdapter:
+    return TypeAdapter(List[_WebhookFields])
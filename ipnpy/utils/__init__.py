@@ -0,0 +1,23 @@
+__all__ = [
+    'to_checksum',
+    'to_checksum_many',
+    'to_tron_base58',
+    'to_tron_base58_many',
+    'to_tron_hex',
+    'to_tron_hex_many',
+    'to_evm',
+    'to_evm_many',
+]
+
+from ipnpy._lazy import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'to_checksum': 'ipnpy.utils.address',
+    'to_checksum_many': 'ipnpy.utils.address',
+    'to_tron_base58': 'ipnpy.utils.address',
+    'to_tron_base58_many': 'ipnpy.utils.address',
+    'to_tron_hex': 'ipnpy.utils.address',
+    'to_tron_hex_many': 'ipnpy.utils.address',
+    'to_evm': 'ipnpy.utils.address',
+    'to_evm_many': 'ipnpy.utils.address',
+})
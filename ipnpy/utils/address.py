@@ -0,0 +1,182 @@
+import hashlib
+import re
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List
+
+from Crypto.Hash import keccak
+
+from ipnpy.exceptions import ValidationError
+
+# The number of addresses every converter remembers
+CACHE_SIZE = 1 << 17
+
+TRON_PREFIX = 0x41
+BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+# Two base58 digits at a time halve the number of divisions
+_BASE58_PAIRS = tuple(first + second for first in BASE58_ALPHABET for second in BASE58_ALPHABET)
+_BASE58_INDEX = {char: index for index, char in enumerate(BASE58_ALPHABET)}
+# 0x20 for the hex digits of 8 or more and for the hex letters, 0 for the other characters
+_HIGH_NIBBLE = bytes(0x20 if chr(code) in '89abcdef' else 0 for code in range(256))
+_HEX_LETTER = bytes(0x20 if chr(code) in 'abcdef' else 0 for code in range(256))
+_EVM_ADDRESS = re.compile('(?:0x)?([0-9a-fA-F]{40})')
+_TRON_HEX_ADDRESS = re.compile('(?:41|0x)([0-9a-fA-F]{40})')
+
+
+def _checksum(address: str) -> str:
+    match = _EVM_ADDRESS.fullmatch(address)
+    if match is None:
+        raise ValidationError(f'Invalid EVM address {address!r}')
+
+    lower = match.group(1).lower().encode()
+    digest = keccak.new(data=lower, digest_bits=256).digest().hex()[:40].encode()
+    # Letters with a hash nibble of 8 or more are uppercased, by clearing the 0x20 bit of all of them at once
+    mask = int.from_bytes(digest.translate(_HIGH_NIBBLE), 'big') & int.from_bytes(lower.translate(_HEX_LETTER), 'big')
+    return '0x' + (int.from_bytes(lower, 'big') ^ mask).to_bytes(40, 'big').decode()
+
+
+def _base58check_encode(payload: bytes) -> str:
+    data = payload + hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4]
+    number = int.from_bytes(data, 'big')
+    digits = []
+    while number:
+        number, pair = divmod(number, 3364)
+        digits.append(_BASE58_PAIRS[pair])
+    encoded = ''.join(reversed(digits)).lstrip('1')
+    return '1' * (len(data) - len(data.lstrip(b'\0'))) + encoded
+
+
+def _tron_payload(address: str) -> bytes:
+    """
+    :param address: TRON address in base58 or hex with the 41 prefix, or EVM address in hex with the 0x prefix
+    :return: the 21 bytes of the address with the 41 prefix
+    """
+    if address.startswith('T'):
+        try:
+            number = 0
+            for char in address:
+                number = number * 58 + _BASE58_INDEX[char]
+            data = number.to_bytes(25, 'big')
+        except (KeyError, OverflowError):
+            raise ValidationError(f'Invalid TRON address {address!r}') from None
+        if data[0] != TRON_PREFIX or hashlib.sha256(hashlib.sha256(data[:21]).digest()).digest()[:4] != data[21:]:
+            raise ValidationError(f'Invalid TRON address {address!r}')
+        return data[:21]
+
+    match = _TRON_HEX_ADDRESS.fullmatch(address)
+    if match is None:
+        raise ValidationError(f'Invalid TRON address {address!r}')
+    return bytes.fromhex('41' + match.group(1))
+
+
+def _tron_base58(address: str) -> str:
+    if address.startswith('T'):
+        _tron_payload(address)
+        return address
+    return _base58check_encode(_tron_payload(address))
+
+
+def _tron_hex(address: str) -> str:
+    return _tron_payload(address).hex()
+
+
+def _evm(address: str) -> str:
+    if address.startswith('0x'):
+        return _checksum(address)
+    return _checksum(_tron_payload(address)[1:].hex())
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def to_checksum(address: str) -> str:
+    """
+    Checksum the EVM address as in EIP-55, the results of the recent addresses are cached
+
+    :param address: hex address, with or without the 0x prefix
+    :return: checksum address
+    """
+    return _checksum(address)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def to_tron_base58(address: str) -> str:
+    """
+    Convert the address to the base58check TRON form, the results of the recent addresses are cached
+
+    :param address: TRON address in base58 or hex with the 41 prefix, or EVM address of the same key
+    :return: TRON address in base58
+    """
+    return _tron_base58(address)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def to_tron_hex(address: str) -> str:
+    """
+    Convert the address to the hex TRON form used by the node API, the results of the recent addresses are cached
+
+    :param address: TRON address in base58 or hex with the 41 prefix, or EVM address of the same key
+    :return: lowercase TRON address in hex with the 41 prefix
+    """
+    return _tron_hex(address)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def to_evm(address: str) -> str:
+    """
+    Convert the address to the EVM address of the same key, the results of the recent addresses are cached
+
+    :param address: EVM address in hex, or TRON address in base58 or hex with the 41 prefix
+    :return: checksum EVM address
+    """
+    return _evm(address)
+
+
+def _convert_many(convert: Callable[[str], str], addresses: Iterable[str]) -> List[str]:
+    # Bulk conversions skip the caches, so converting a large list does not evict the hot addresses
+    converted: Dict[str, str] = {}
+    results = []
+    for address in addresses:
+        result = converted.get(address)
+        if result is None:
+            result = converted[address] = convert(address)
+        results.append(result)
+    return results
+
+
+def to_checksum_many(addresses: Iterable[str]) -> List[str]:
+    """
+    Checksum many EVM addresses at once, every distinct address is hashed once
+
+    :param addresses: hex addresses, a list or any iterable such as an array of strings
+    :return: checksum addresses in the order of the input
+    """
+    return _convert_many(_checksum, addresses)
+
+
+def to_tron_base58_many(addresses: Iterable[str]) -> List[str]:
+    """
+    Convert many addresses to the base58check TRON form at once
+
+    :param addresses: TRON addresses in base58 or hex, or EVM addresses, a list or any iterable
+    :return: TRON addresses in base58 in the order of the input
+    """
+    return _convert_many(_tron_base58, addresses)
+
+
+def to_tron_hex_many(addresses: Iterable[str]) -> List[str]:
+    """
+    Convert many addresses to the hex TRON form at once
+
+    :param addresses: TRON addresses in base58 or hex, or EVM addresses, a list or any iterable
+    :return: lowercase TRON addresses in hex with the 41 prefix in the order of the input
+    """
+    return _convert_many(_tron_hex, addresses)
+
+
+def to_evm_many(addresses: Iterable[str]) -> List[str]:
+    """
+    Convert many addresses to EVM addresses at once
+
+    :param addresses: EVM addresses, or TRON addresses in base58 or hex, a list or any iterable
+    :return: checksum EVM addresses in the order of the input
+    """
+    return _convert_many(_evm, addresses)
@@ -0,0 +1,25 @@
+__all__ = [
+    'IdempotencyStore',
+    'MemoryIdempotencyStore',
+    'SQLiteIdempotencyStore',
+    'BloomFilter',
+    'idempotency_key',
+    'webhook_keys',
+    'WebhookReceiver',
+    'ReceiverMetrics',
+    'HandlerMetrics'
+]
+
+from ipnpy._lazy import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'IdempotencyStore': 'ipnpy.webhooks.idempotency',
+    'MemoryIdempotencyStore': 'ipnpy.webhooks.idempotency',
+    'SQLiteIdempotencyStore': 'ipnpy.webhooks.idempotency',
+    'BloomFilter': 'ipnpy.webhooks.idempotency',
+    'idempotency_key': 'ipnpy.webhooks.idempotency',
+    'webhook_keys': 'ipnpy.webhooks.idempotency',
+    'WebhookReceiver': 'ipnpy.webhooks.receiver',
+    'ReceiverMetrics': 'ipnpy.webhooks.receiver',
+    'HandlerMetrics': 'ipnpy.webhooks.receiver',
+})
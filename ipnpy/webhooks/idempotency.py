@@ -0,0 +1,268 @@
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    from ipnpy.schemes.webhook import WebhookData
+
+
+def idempotency_key(network: str, tx_hash: str, log_index: int) -> str:
+    """
+    :param network: network of the webhook
+    :param tx_hash: transaction hash of the webhook
+    :param log_index: index of the log in the webhook
+    :return: the key identifying one log of one webhook
+    """
+    return f'{network}:{tx_hash.lower()}:{log_index}'
+
+
+def webhook_keys(data: 'WebhookData') -> List[str]:
+    """
+    :param data: parsed webhook
+    :return: the keys of every log of the webhook, a webhook without logs has a single key with index 0
+    """
+    return [idempotency_key(data.network, data.hash, index) for index in range(max(len(data.logs), 1))]
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        """
+        A fixed-size Bloom filter. It answers "definitely not added" or "maybe added", items can not be removed.
+
+        :param capacity: the number of items the filter is sized for
+        :param error_rate: the false positive rate at full capacity
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def clear(self) -> None:
+        self._bits = bytearray(len(self._bits))
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # Double hashing, the k positions are derived from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((first + index * second) % self.size for index in range(self.hash_count))
+
+
+class IdempotencyStore(ABC):
+    """
+    Base class of the stores of processed webhook keys. Subclasses implement add_many, seen and discard.
+    """
+
+    def add(self, key: str) -> bool:
+        """
+        Mark the key as processed
+
+        :param key: idempotency key
+        :return: True if the key was not seen before or has expired, False for a duplicate
+        """
+        return self.add_many([key])[0]
+
+    @abstractmethod
+    def add_many(self, keys: List[str]) -> List[bool]:
+        """
+        Mark the keys as processed
+
+        :param keys: idempotency keys
+        :return: for every key, True if it was not seen before or has expired, False for a duplicate
+        """
+
+    @abstractmethod
+    def seen(self, key: str) -> bool:
+        """
+        :param key: idempotency key
+        :return: True if the key was processed and has not expired
+        """
+
+    @abstractmethod
+    def discard(self, key: str) -> None:
+        """
+        Forget the key, so the next webhook with it is processed again
+
+        :param key: idempotency key
+        """
+
+    def add_webhook(self, data: 'WebhookData') -> List[int]:
+        """
+        Mark the logs of the webhook as processed
+
+        :param data: parsed webhook
+        :return: indexes of the logs that were not seen before, empty for a duplicate webhook
+        """
+        return [index for index, new in enumerate(self.add_many(webhook_keys(data))) if new]
+
+    def __contains__(self, key: str) -> bool:
+        return self.seen(key)
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    def __init__(self, max_size: int = 100_000, ttl: float = 86400, bloom: bool = True) -> None:
+        """
+        An in-process store of processed keys with a bounded size. The oldest keys are evicted when they expire or
+        when the store is full. A Bloom filter in front of the dictionary answers most checks of new keys without
+        touching it.
+
+        :param max_size: the maximum number of keys kept
+        :param ttl: seconds a key is remembered
+        :param bloom: if True, new keys are recognized by the Bloom filter first
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._keys: 'OrderedDict[str, float]' = OrderedDict()
+        self._bloom = BloomFilter(max_size) if bloom else None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add_many(self, keys: List[str]) -> List[bool]:
+        now = time.monotonic()
+        results = []
+        with self._lock:
+            self._evict(now)
+            for key in keys:
+                new = not self._contains(key, now)
+                if new:
+                    self._keys[key] = now + self.ttl
+                    self._keys.move_to_end(key)
+                    if self._bloom is not None:
+                        self._bloom.add(key)
+                results.append(new)
+            self._evict(now)
+        return results
+
+    def seen(self, key: str) -> bool:
+        with self._lock:
+            return self._contains(key, time.monotonic())
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._keys.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys.clear()
+            if self._bloom is not None:
+                self._bloom.clear()
+
+    def _contains(self, key: str, now: float) -> bool:
+        if self._bloom is not None and key not in self._bloom:
+            return False
+        expires = self._keys.get(key)
+        return expires is not None and expires > now
+
+    def _evict(self, now: float) -> None:
+        # Every key lives for the same ttl, so the insertion order is also the expiry order
+        while self._keys:
+            key, expires = next(iter(self._keys.items()))
+            if expires > now and len(self._keys) <= self.max_size:
+                break
+            del self._keys[key]
+
+        if self._bloom is not None and self._bloom.count > 2 * self.max_size:
+            # Evicted keys stay in the filter and raise its false positive rate, rebuild it from the live keys
+            self._bloom.clear()
+            for key in self._keys:
+                self._bloom.add(key)
+
+
+class SQLiteIdempotencyStore(IdempotencyStore):
+    def __init__(self, path: str, ttl: float = 86400, purge_interval: float = 60, timeout: float = 30) -> None:
+        """
+        A store of processed keys in a local SQLite database, shared by the worker processes of one host. Checks are
+        primary key lookups, expired keys are purged periodically.
+
+        :param path: path of the database file, created if missing
+        :param ttl: seconds a key is remembered
+        :param purge_interval: seconds between deletions of expired keys
+        :param timeout: seconds to wait for a lock held by another process
+        """
+        self.path = path
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self.timeout = timeout
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+        with self._connection() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS idempotency_keys (key TEXT PRIMARY KEY, expires REAL NOT NULL) '
+                'WITHOUT ROWID'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS idempotency_keys_expires ON idempotency_keys (expires)')
+
+    def add_many(self, keys: List[str]) -> List[bool]:
+        now = time.time()
+        results = []
+        with self._connection() as connection:
+            for key in keys:
+                # Insert a new key or take over an expired one, the row is changed only for new keys
+                cursor = connection.execute(
+                    'INSERT INTO idempotency_keys (key, expires) VALUES (?, ?) '
+                    'ON CONFLICT (key) DO UPDATE SET expires = excluded.expires WHERE expires <= ?',
+                    (key, now + self.ttl, now),
+                )
+                results.append(cursor.rowcount > 0)
+        self._purge(now)
+        return results
+
+    def seen(self, key: str) -> bool:
+        row = self._connection().execute(
+            'SELECT 1 FROM idempotency_keys WHERE key = ? AND expires > ?', (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def discard(self, key: str) -> None:
+        with self._connection() as connection:
+            connection.execute('DELETE FROM idempotency_keys WHERE key = ?', (key,))
+
+    def purge(self) -> int:
+        """
+        Delete the expired keys
+
+        :return: the number of deleted keys
+        """
+        with self._connection() as connection:
+            return connection.execute('DELETE FROM idempotency_keys WHERE expires <= ?', (time.time(),)).rowcount
+
+    def close(self) -> None:
+        connection: Optional[sqlite3.Connection] = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _purge(self, now: float) -> None:
+        if now - self._last_purge >= self.purge_interval:
+            self._last_purge = now
+            self.purge()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can not be shared between threads, and must not be inherited by forked processes
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
@@ -0,0 +1,291 @@
+import asyncio
+import copy
+import json
+import logging
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+
+from ipnpy.schemes.enums import WebhookEventType
+from ipnpy.schemes.webhook import WebhookData
+from ipnpy.webhooks.idempotency import IdempotencyStore, webhook_keys
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[WebhookData], Union[Any, Awaitable[Any]]]
+ErrorHandler = Callable[[WebhookData, Exception], Any]
+
+# Key of the handlers called for every event type without its own handlers
+ANY_EVENT = '*'
+
+
+@dataclass
+class HandlerMetrics:
+    calls: int = 0
+    failures: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+
+    @property
+    def average_time(self) -> float:
+        return self.total_time / self.calls if self.calls else 0.0
+
+
+@dataclass
+class ReceiverMetrics:
+    queue_depth: int = 0
+    queue_size: int = 0
+    received: int = 0
+    rejected: int = 0
+    invalid: int = 0
+    duplicates: int = 0
+    unhandled: int = 0
+    handlers: Dict[str, HandlerMetrics] = field(default_factory=dict)
+
+
+class WebhookReceiver:
+    def __init__(self,
+                 workers: int = 8,
+                 queue_size: int = 1000,
+                 path: str = '/',
+                 idempotency: Optional[IdempotencyStore] = None,
+                 executor: Optional[Executor] = None,
+                 max_body_size: int = 1024 * 1024,
+                 on_error: Optional[ErrorHandler] = None) -> None:
+        """
+        An ASGI application receiving IPN webhooks. A request is parsed and queued, and answered with 200 before any
+        handler runs, so slow handlers do not make IPN time out and retry. When the queue is full the request is
+        answered with 503 and IPN delivers it again later. Run it with any ASGI server, for example
+        uvicorn module:receiver.
+
+        :param workers: the number of webhooks handled concurrently
+        :param queue_size: the maximum number of parsed webhooks waiting for a worker
+        :param path: the path accepting webhooks, other paths are answered with 404
+        :param idempotency: if set, webhooks whose logs were all seen before are answered with 200 and not queued
+        :param executor: executor running synchronous handlers, a thread pool with one thread per worker by default
+        :param max_body_size: the maximum size of a request body in bytes
+        :param on_error: called with the webhook and the exception raised by a handler
+        """
+        self.workers = workers
+        self.queue_size = queue_size
+        self.path = path
+        self.idempotency = idempotency
+        self.max_body_size = max_body_size
+        self.on_error = on_error
+        self._executor = executor
+        self._own_executor = executor is None
+        self._handlers: Dict[Union[WebhookEventType, str], List[Handler]] = {}
+        self._metrics = ReceiverMetrics(queue_size=queue_size)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def on(self, *event_types: WebhookEventType) -> Callable[[Handler], Handler]:
+        """
+        Decorator registering a handler of the event types, or of every event type without its own handlers if no
+        type is given. Handlers may be coroutine functions or plain functions, plain ones run in the executor.
+
+        :param event_types: event types routed to the handler
+        :return: the decorator
+        """
+        def decorator(handler: Handler) -> Handler:
+            self.add_handler(handler, *event_types)
+            return handler
+
+        return decorator
+
+    def add_handler(self, handler: Handler, *event_types: WebhookEventType) -> None:
+        """
+        Register the handler of the event types, or of every event type without its own handlers if no type is given
+
+        :param handler: a coroutine function or a plain function taking the webhook
+        :param event_types: event types routed to the handler
+        """
+        for event_type in event_types or (ANY_EVENT,):
+            self._handlers.setdefault(event_type, []).append(handler)
+
+    def metrics(self) -> ReceiverMetrics:
+        """
+        :return: a snapshot of the queue depth and the counters of requests and handlers
+        """
+        metrics = copy.deepcopy(self._metrics)
+        metrics.queue_depth = self._queue.qsize() if self._queue is not None else 0
+        return metrics
+
+    async def start(self) -> None:
+        """
+        Start the workers, called by the ASGI lifespan startup or by the first request
+        """
+        if self._queue is not None:
+            return
+
+        self._queue = asyncio.Queue(self.queue_size)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='ipnpy-webhook')
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self, drain: bool = True) -> None:
+        """
+        Stop the workers
+
+        :param drain: if True, the queued webhooks are handled first
+        """
+        if self._queue is None:
+            return
+
+        if drain:
+            await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        if self._own_executor and self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def enqueue(self, data: WebhookData) -> bool:
+        """
+        Queue a parsed webhook without going through HTTP
+
+        :param data: parsed webhook
+        :return: False if the queue is full
+        """
+        await self.start()
+        try:
+            self._queue.put_nowait(data)
+        except asyncio.QueueFull:
+            self._metrics.rejected += 1
+            return False
+        return True
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        if scope['path'] != self.path:
+            await self._respond(send, 404, {'error': 'not found'})
+            return
+        if scope['method'] != 'POST':
+            await self._respond(send, 405, {'error': 'method not allowed'})
+            return
+
+        body = await self._read_body(receive)
+        if body is None:
+            await self._respond(send, 413, {'error': 'payload too large'})
+            return
+
+        status, response = await self.handle_body(body)
+        headers = [(b'retry-after', b'1')] if status == 503 else []
+        await self._respond(send, status, response, headers)
+
+    async def handle_body(self, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        """
+        Parse and queue a raw webhook body
+
+        :param body: JSON body of the webhook request
+        :return: HTTP status and JSON response
+        """
+        self._metrics.received += 1
+        try:
+            data = WebhookData.from_json(body)
+        except ValidationError as error:
+            self._metrics.invalid += 1
+            return 400, {'error': error.errors(include_url=False, include_context=False, include_input=False)}
+
+        claimed = []
+        if self.idempotency is not None:
+            keys = webhook_keys(data)
+            # The store may block on its database, which must not stall the event loop
+            added = await asyncio.to_thread(self.idempotency.add_many, keys)
+            claimed = [key for key, new in zip(keys, added) if new]
+            if not claimed:
+                self._metrics.duplicates += 1
+                return 200, {'status': 'duplicate'}
+
+        if not await self.enqueue(data):
+            # Let the retry of the rejected webhook through
+            for key in claimed:
+                await asyncio.to_thread(self.idempotency.discard, key)
+            return 503, {'error': 'queue is full'}
+        return 200, {'status': 'queued'}
+
+    async def _work(self) -> None:
+        while True:
+            data = await self._queue.get()
+            try:
+                await self._dispatch(data)
+            except Exception:
+                # Nothing raised here may stop the worker
+                logger.exception('Dispatching the webhook %s failed', data.hash)
+            finally:
+                self._queue.task_done()
+
+    async def _dispatch(self, data: WebhookData) -> None:
+        handlers = self._handlers.get(data.info.type) or self._handlers.get(ANY_EVENT)
+        if not handlers:
+            self._metrics.unhandled += 1
+            return
+
+        for handler in handlers:
+            name = getattr(handler, '__qualname__', repr(handler))
+            metrics = self._metrics.handlers.setdefault(name, HandlerMetrics())
+            started = time.perf_counter()
+            try:
+                if asyncio.iscoroutinefunction(handler):
+                    await handler(data)
+                else:
+                    await asyncio.get_running_loop().run_in_executor(self._executor, handler, data)
+            except Exception as error:
+                metrics.failures += 1
+                if self.on_error is not None:
+                    try:
+                        self.on_error(data, error)
+                    except Exception:
+                        # A failing on_error callback must not skip the other handlers
+                        logger.exception('The on_error callback of the webhook %s failed', data.hash)
+            finally:
+                elapsed = time.perf_counter() - started
+                metrics.calls += 1
+                metrics.total_time += elapsed
+                metrics.max_time = max(metrics.max_time, elapsed)
+
+    async def _lifespan(self, receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.stop()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _read_body(self, receive: Callable) -> Optional[bytes]:
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body_size:
+                return None
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    @staticmethod
+    async def _respond(send: Callable, status: int, body: Dict[str, Any], headers: Optional[list] = None) -> None:
+        payload = json.dumps(body).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(payload)).encode())]
+            + (headers or []),
+        })
+        await send({'type': 'http.response.body', 'body': payload})
@@ -14,6 +14,7 @@ dependencies = [
     'web3',
     'base58',
     'tronpy',
+    'pycryptodome',
 ]
 
 setup(